@@ -1,5 +1,22 @@
 import struct
 import os
+import re
+import sys
+import operator
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: solo lo usan as_array() / load_array()
+    np = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from record_schema import Schema, decode_str
+from wal import WriteAheadLog, replay, GROUP_SIZE, GROUP_INTERVAL
+from rwlock import make_lock, shared, exclusive
+from block_reader import BLOCK_SIZE, advise_sequential, scan_blocks
+from io_stats import STATS, operation, raw_file, record_io, tracked_open
 
 class Alumno:
     def __init__(self, codigo, nombre, apellidos, carrera, ciclo, mensualidad):
@@ -14,226 +31,1437 @@ class Alumno:
         print(self.codigo, self.nombre, self.apellidos, self.carrera, self.ciclo, self.mensualidad)
 
 
+ALUMNO_SCHEMA = Schema([('codigo', '5s'), ('nombre', '11s'), ('apellidos', '20s'),
+                        ('carrera', '15s'), ('ciclo', 'i'), ('mensualidad', 'i')])
+ALUMNO_FIELDS = ALUMNO_SCHEMA.names
+
+
+def make_alumno(codigo, nombre, apellidos, carrera, ciclo, mensualidad):
+    # Construye un Alumno a partir de los campos empaquetados (bytes con padding).
+    return Alumno(*ALUMNO_SCHEMA.decode((codigo, nombre, apellidos, carrera, ciclo, mensualidad)))
+
+
+class AlumnoView(ALUMNO_SCHEMA.view("AlumnoRecord")):
+    # Vista perezosa de un registro leído (mismos atributos que Alumno): readRecord() y
+    # get_by_codigo() solo decodifican los campos que se usan.
+    __slots__ = ()
+    print = Alumno.print
+
+
+def alumno_values(alumno: Alumno):
+    return (alumno.codigo, alumno.nombre, alumno.apellidos, alumno.carrera, alumno.ciclo, alumno.mensualidad)
+
+
+def field_layout(fmt):
+    # (offset, código) de cada campo de un formato de struct, con el padding nativo.
+    codes = re.findall(r'\d*[a-zA-Z?]', fmt)
+    return [(struct.calcsize(''.join(codes[:i + 1])) - struct.calcsize(code), code) for i, code in enumerate(codes)]
+
+
+def struct_dtype(fmt, names):
+    # dtype estructurado de numpy con el mismo layout (offsets y padding nativos) que un formato de struct.
+    layout = field_layout(fmt)
+    offsets = [offset for offset, _ in layout]
+    formats = ['S' + code[:-1] if code.endswith('s') else code for _, code in layout]
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': struct.calcsize(fmt)})
+
+
+def check_numpy():
+    if np is None:
+        raise ImportError("as_array()/load_array() requieren numpy (pip install numpy)")
+
+
+# ---------------------------------------------------------
+# Proyección, filtro y agregados sobre los bloques leídos (scan() / aggregate()).
+# Solo se extraen los bytes de los campos pedidos: el resto del registro se salta con 'x'
+# en el formato, y solo se decodifican los strings proyectados o usados en el filtro.
+# ---------------------------------------------------------
+WHERE_OPS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+             '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+             'in': lambda value, values: value in values}
+
+# Por cada agregado: paso (estado, valor), combinación de dos estados parciales y resultado final
+AGGREGATES = {
+    'count': (lambda state, value: 1 if state is None else state + 1, operator.add, lambda state: state),
+    'sum': (lambda state, value: value if state is None else state + value, operator.add, lambda state: state),
+    'min': (lambda state, value: value if state is None else min(state, value), min, lambda state: state),
+    'max': (lambda state, value: value if state is None else max(state, value), max, lambda state: state),
+    'avg': (lambda state, value: (value, 1) if state is None else (state[0] + value, state[1] + 1),
+            lambda a, b: (a[0] + b[0], a[1] + b[1]), lambda state: state[0] / state[1]),
+}
+
+
+def compile_projection(fmt, names, fields):
+    # Struct que extrae solo los campos pedidos (en orden de offset) y los nombres en ese orden.
+    layout = dict(zip(names, field_layout(fmt)))
+    for name in fields:
+        if name not in layout:
+            raise ValueError(f"Campo desconocido: {name}")
+    wanted = sorted(set(fields), key=lambda name: layout[name][0])
+    parts, cursor = ['='], 0
+    for name in wanted:
+        offset, code = layout[name]
+        if offset > cursor:
+            parts.append(f'{offset - cursor}x')
+        parts.append(code)
+        cursor = offset + struct.calcsize(code)
+    if struct.calcsize(fmt) > cursor:
+        parts.append(f'{struct.calcsize(fmt) - cursor}x')
+    return struct.Struct(''.join(parts)), wanted
+
+
+def project_chunks(chunks, fmt, names, fields, where=(), live_field=None, tombstone_field=None):
+    # Genera tuplas con los campos de 'fields' de cada registro que cumple todas las
+    # condiciones (campo, operador, valor) de 'where'. Con live_field se descartan los
+    # registros con live_field != -2 y con tombstone_field los que tienen ese string marcado
+    # con TOMBSTONE, antes de decodificar cualquier string.
+    needed = (list(fields) + [field for field, _, _ in where] + ([live_field] if live_field else [])
+              + ([tombstone_field] if tombstone_field else []))
+    projection, wanted = compile_projection(fmt, names, needed)
+    index = {name: i for i, name in enumerate(wanted)}
+    codes = dict(zip(names, (code for _, code in field_layout(fmt))))
+    strings = [i for i, name in enumerate(wanted) if codes[name].endswith('s')]
+    for field, op, _ in where:
+        if op not in WHERE_OPS:
+            raise ValueError(f"Operador desconocido: {op}")
+    conditions = [(index[field], WHERE_OPS[op], value) for field, op, value in where]
+    output = [index[name] for name in fields]
+    live = index[live_field] if live_field else None
+    tombstone = index[tombstone_field] if tombstone_field else None
+    for _, chunk in chunks:
+        for values in projection.iter_unpack(memoryview(chunk)):
+            if live is not None and values[live] != -2:
+                continue
+            if tombstone is not None and values[tombstone][:1] == TOMBSTONE:
+                continue
+            if strings:
+                values = list(values)
+                for i in strings:
+                    values[i] = decode_str(values[i])
+            if all(op(values[i], value) for i, op, value in conditions):
+                yield tuple(values[i] for i in output)
+
+
+def encode_where(where, dictionary):
+    # Las condiciones sobre columnas codificadas (dictionary = {columna: valores por código})
+    # se evalúan una sola vez sobre el diccionario: '==' pasa a comparar el código (un entero,
+    # -1 si el valor no existe) y el resto a pertenencia a un conjunto de códigos.
+    encoded = []
+    for field, op, value in where:
+        if op not in WHERE_OPS:
+            raise ValueError(f"Operador desconocido: {op}")
+        if field in dictionary:
+            values = dictionary[field]
+            if op == '==':
+                value = values.index(value) if value in values else -1
+            else:
+                op, value = 'in', frozenset(code for code, v in enumerate(values) if WHERE_OPS[op](v, value))
+        encoded.append((field, op, value))
+    return encoded
+
+
+def decode_codes(rows, fields, dictionary):
+    # Reemplaza los códigos de las columnas codificadas de cada tupla por sus valores
+    columns = [(i, dictionary[name]) for i, name in enumerate(fields) if name in dictionary]
+    if not columns:
+        yield from rows
+        return
+    for row in rows:
+        row = list(row)
+        for i, values in columns:
+            row[i] = values[row[i]]
+        yield tuple(row)
+
+
+def aggregate_partial(rows, func):
+    # Estados parciales {grupo: estado} a partir de tuplas (grupo, valor)
+    if func not in AGGREGATES:
+        raise ValueError(f"Agregado desconocido: {func}")
+    step = AGGREGATES[func][0]
+    partial = {}
+    for key, value in rows:
+        partial[key] = step(partial.get(key), value)
+    return partial
+
+
+def merge_partials(partials, func):
+    merge = AGGREGATES[func][1]
+    result = {}
+    for partial in partials:
+        for key, state in partial.items():
+            result[key] = state if key not in result else merge(result[key], state)
+    return result
+
+
+def finish_aggregate(partial, func, grouped):
+    # Con group_by devuelve {grupo: valor}; sin group_by un único valor (0 o None si no hay filas)
+    finish = AGGREGATES[func][2]
+    if grouped:
+        return {key: finish(state) for key, state in partial.items()}
+    if None not in partial:
+        return 0 if func == 'count' else None
+    return finish(partial[None])
+
+
+def aggregate_fields(field, group_by):
+    # Columnas que necesita un agregado: (grupo, valor) o solo (valor,)
+    return [field] if group_by is None else [group_by, field]
+
+
+def aggregate_rows(func, grouped, rows):
+    # Estado parcial de un agregado sobre las filas de aggregate_fields()
+    return aggregate_partial(rows if grouped else ((None, value) for value, in rows), func)
+
+
+def aggregate_scan(scan, func, field, where=(), group_by=None):
+    # scan(fields, where) es el scan() del archivo; el valor va en la última columna
+    partial = aggregate_rows(func, group_by is not None, scan(aggregate_fields(field, group_by), where))
+    return finish_aggregate(partial, func, group_by is not None)
+
+
 # ---------------------------------------------------------
 # Constantes y definiciones para la estrategia MOVE_THE_LAST.
 # ---------------------------------------------------------
-FORMAT_MOVE = '5s11s20s15sii'     # Formato: 5s (código), 11s (nombre), 20s (apellidos), 15s (carrera), i (ciclo), i (mensualidad)
-RECORD_SIZE_MOVE = struct.calcsize(FORMAT_MOVE)
-HEADER_SIZE = 4  # Se usan 4 bytes para el header (número de registros)
+FORMAT_MOVE = ALUMNO_SCHEMA.format     # Formato: 5s (código), 11s (nombre), 20s (apellidos), 15s (carrera), i (ciclo), i (mensualidad)
+RECORD_SIZE_MOVE = ALUMNO_SCHEMA.size
+DTYPE_MOVE = struct_dtype(FORMAT_MOVE, ALUMNO_FIELDS) if np is not None else None
+HEADER_SIZE = 4  # Header antiguo: 4 bytes (número de registros)
+# Header: número de registros y cantidad de registros marcados (modo "tombstone").
+HEADER_FORMAT_MOVE = 'ii'
+HEADER_SIZE_MOVE = struct.calcsize(HEADER_FORMAT_MOVE)
+BATCH_SIZE = BLOCK_SIZE // RECORD_SIZE_MOVE  # Registros leídos por llamada en los recorridos (bloques de ~1 MiB)
+TOMBSTONE = b'\x00'  # primer byte del codigo de un registro eliminado en modo "tombstone"
+
+# ---------------------------------------------------------
+# Lectura/escritura posicionada sobre un descriptor ya abierto.
+# Con pread/pwrite cada operación es una única llamada al sistema (no hace falta seek).
+# En plataformas sin pread/pwrite (Windows) se usa seek + read/write.
+# ---------------------------------------------------------
+# Las llamadas se informan a io_stats igual en los dos casos: una lectura o escritura por
+# llamada, sin seeks (el seek + read/write se hace sobre el archivo sin TrackedFile).
+if hasattr(os, "pread"):
+    def read_at(file, offset, size):
+        data = os.pread(file.fileno(), size, offset)
+        if STATS.enabled:
+            record_io('read', len(data))
+        return data
+
+    def write_at(file, offset, data):
+        os.pwrite(file.fileno(), data, offset)
+        if STATS.enabled:
+            record_io('write', len(data))
+else:
+    def read_at(file, offset, size):
+        file = raw_file(file)
+        file.seek(offset)
+        data = file.read(size)
+        if STATS.enabled:
+            record_io('read', len(data))
+        return data
+
+    def write_at(file, offset, data):
+        file = raw_file(file)
+        file.seek(offset)
+        file.write(data)
+        if STATS.enabled:
+            record_io('write', len(data))
+
+# ---------------------------------------------------------
+# Índice secundario codigo -> posición para MoveTheLast, guardado en un archivo aparte (.idx).
+# El archivo es un log de asignaciones (codigo, pos): "el slot pos contiene codigo".
+# Al abrir se reproduce el log (la última asignación de cada slot gana); los slots más allá
+# del header se ignoran. Los primeros 8 bytes guardan el mtime del archivo de datos al cerrar
+# (0 mientras está abierto): si no coincide (caída, o cambios hechos sin índice) o falta algún
+# slot, se reconstruye recorriendo los datos. Se asume que codigo es único (es la llave del alumno).
+# ---------------------------------------------------------
+INDEX_HEADER_FORMAT = 'q'
+INDEX_HEADER_SIZE = struct.calcsize(INDEX_HEADER_FORMAT)
+INDEX_FORMAT = '5si'  # codigo (tal como está guardado, con padding), pos
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_FORMAT)
+
+
+class CodigoIndex:
+    def __init__(self, filename):
+        self.filename = filename
+        self.positions = {}  # codigo -> pos
+        self.codigos = []    # pos -> codigo
+        self.entries = 0     # entradas escritas en el log
+
+    def open(self, header, data_stamp, scan_codigos):
+        if os.path.exists(self.filename):
+            with tracked_open(self.filename, "rb") as file:
+                data = file.read()
+            if len(data) >= INDEX_HEADER_SIZE and struct.unpack_from(INDEX_HEADER_FORMAT, data)[0] == data_stamp:
+                self.entries = (len(data) - INDEX_HEADER_SIZE) // INDEX_ENTRY_SIZE
+                entries = memoryview(data)[INDEX_HEADER_SIZE:INDEX_HEADER_SIZE + self.entries * INDEX_ENTRY_SIZE]
+                codigos = [None] * header
+                for codigo, pos in struct.iter_unpack(INDEX_FORMAT, entries):
+                    if pos < header:
+                        codigos[pos] = codigo
+                if None not in codigos:
+                    self.codigos = codigos
+                    self.positions = {codigo: pos for pos, codigo in enumerate(codigos)}
+                    self.file = tracked_open(self.filename, "rb+", buffering=0)
+                    write_at(self.file, 0, struct.pack(INDEX_HEADER_FORMAT, 0))  # abierto
+                    return
+        # No hay índice o está desactualizado: se reconstruye a partir de los datos
+        self.codigos = list(scan_codigos())
+        self.positions = {codigo: pos for pos, codigo in enumerate(self.codigos)}
+        self.rewrite()
+
+    def rewrite(self):
+        # Deja el log con una sola entrada por slot
+        with tracked_open(self.filename, "wb") as file:
+            file.write(struct.pack(INDEX_HEADER_FORMAT, 0))
+            file.write(b"".join(struct.pack(INDEX_FORMAT, codigo, pos) for pos, codigo in enumerate(self.codigos)))
+        self.entries = len(self.codigos)
+        self.file = tracked_open(self.filename, "rb+", buffering=0)
+
+    def close(self, data_stamp):
+        if not self.file.closed:
+            if self.entries > 2 * len(self.codigos) + 1024:
+                self.file.close()
+                self.rewrite()
+            write_at(self.file, 0, struct.pack(INDEX_HEADER_FORMAT, data_stamp))
+            self.file.close()
+
+    def get(self, codigo):
+        return self.positions.get(codigo)
+
+    def assign(self, pos, codigo):
+        self.assign_many(pos, [codigo])
+
+    def assign_many(self, first, codigos):
+        entries = []
+        for pos, codigo in enumerate(codigos, first):
+            if pos < len(self.codigos):
+                old = self.codigos[pos]
+                if self.positions.get(old) == pos:
+                    del self.positions[old]
+                self.codigos[pos] = codigo
+            else:
+                self.codigos.append(codigo)
+            self.positions[codigo] = pos
+            entries.append(struct.pack(INDEX_FORMAT, codigo, pos))
+        # una sola escritura al final del log
+        write_at(self.file, INDEX_HEADER_SIZE + self.entries * INDEX_ENTRY_SIZE, b"".join(entries))
+        self.entries += len(entries)
+
+    def truncate(self, size):
+        # Los slots desde size en adelante dejan de existir (no hace falta escribir en el log)
+        for pos in range(size, len(self.codigos)):
+            if self.positions.get(self.codigos[pos]) == pos:
+                del self.positions[self.codigos[pos]]
+        del self.codigos[size:]
+
+
+# ---------------------------------------------------------
+# Diccionario de las columnas codificadas de MoveTheLast (archivo filename + ".dict").
+# En el layout codificado las columnas de pocos valores distintos (carrera, apellidos) se
+# guardan como un código 'H' en lugar del string con padding: el registro pasa de 60 a 28
+# bytes con las dos columnas. El archivo empieza con la máscara de columnas codificadas
+# (así el layout se reconoce al abrir) y sigue con un log de entradas (columna, código, valor).
+# Un valor nuevo se agrega al log antes de escribir el registro que lo usa.
+# codigo no se puede codificar: es la llave y su primer byte es la marca TOMBSTONE.
+# ---------------------------------------------------------
+DICT_HEADER_FORMAT = '=H'  # bit i = el campo i de ALUMNO_FIELDS está codificado
+DICT_HEADER_SIZE = struct.calcsize(DICT_HEADER_FORMAT)
+DICT_ENTRY_FORMAT = '=BHB'  # índice del campo, código, largo del valor en bytes
+DICT_ENTRY_SIZE = struct.calcsize(DICT_ENTRY_FORMAT)
+MAX_CODES = 1 << 16
+
+
+def encoded_schema(columns):
+    return Schema([(name, 'H' if name in columns else code) for name, code in ALUMNO_SCHEMA.fields])
+
+
+class ColumnDictionary:
+    def __init__(self, filename, columns=()):
+        self.filename = filename
+        if not os.path.exists(self.filename):
+            for name in columns:
+                if name not in ALUMNO_FIELDS or not ALUMNO_SCHEMA.string_sizes[ALUMNO_SCHEMA.index[name]]:
+                    raise ValueError(f"Solo se pueden codificar campos string: {name}")
+            mask = sum(1 << ALUMNO_SCHEMA.index[name] for name in columns)
+            with tracked_open(self.filename, "wb") as file:
+                file.write(struct.pack(DICT_HEADER_FORMAT, mask))
+        self.file = tracked_open(self.filename, "rb+", buffering=0)
+        data = self.file.read()
+        mask = struct.unpack_from(DICT_HEADER_FORMAT, data)[0]
+        self.columns = [name for i, name in enumerate(ALUMNO_FIELDS) if mask >> i & 1]
+        if 'codigo' in self.columns:
+            self.file.close()
+            raise ValueError(f"{self.filename} codifica codigo: no es un layout válido")
+        self.values = {name: [] for name in self.columns}  # columna -> valor de cada código
+        self.codes = {name: {} for name in self.columns}  # columna -> {valor: código}
+        pos = DICT_HEADER_SIZE
+        while pos + DICT_ENTRY_SIZE <= len(data):
+            field, code, length = struct.unpack_from(DICT_ENTRY_FORMAT, data, pos)
+            value = data[pos + DICT_ENTRY_SIZE:pos + DICT_ENTRY_SIZE + length]
+            name = ALUMNO_FIELDS[field]
+            if len(value) < length or code != len(self.values[name]):
+                break  # entrada incompleta (caída mientras se escribía): ningún registro la usa
+            self.values[name].append(decode_str(value))
+            self.codes[name][self.values[name][-1]] = code
+            pos += DICT_ENTRY_SIZE + length
+        self.size = pos
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def encode(self, name, value):
+        # Código del valor; si es nuevo se agrega al diccionario
+        if isinstance(value, bytes):
+            value = decode_str(value)
+        value = decode_str(ALUMNO_SCHEMA.encode_field(name, value))  # mismo corte que el string original
+        code = self.codes[name].get(value)
+        if code is None:
+            code = len(self.values[name])
+            if code >= MAX_CODES:
+                raise ValueError(f"La columna {name} superó los {MAX_CODES} valores distintos")
+            data = value.encode('utf-8')
+            entry = struct.pack(DICT_ENTRY_FORMAT, ALUMNO_SCHEMA.index[name], code, len(data)) + data
+            write_at(self.file, self.size, entry)
+            self.size += len(entry)
+            self.values[name].append(value)
+            self.codes[name][value] = code
+        return code
+
+    def encode_values(self, values):
+        values = list(values)
+        for name in self.columns:
+            i = ALUMNO_SCHEMA.index[name]
+            values[i] = self.encode(name, values[i])
+        return values
+
+    def decode(self, name, code):
+        return self.values[name][code]
+
+    def decode_values(self, values):
+        values = list(values)
+        for name in self.columns:
+            i = ALUMNO_SCHEMA.index[name]
+            values[i] = self.values[name][values[i]]
+        return values
+
 
 # ---------------------------------------------------------
 # Clase para la estrategia MOVE_THE_LAST.
 # Al eliminar, se mueve el último registro a la posición eliminada.
+# El archivo se mantiene abierto (un solo handle) y el header se guarda en memoria;
+# flush_every indica cada cuántas modificaciones se escribe el header a disco
+# (1 = write-through, N > 1 = write-back cada N cambios, 0 = solo en flush()/close()).
+# Se puede usar como context manager: with MoveTheLast("data.dat") as f: ...
+# Con index=True se mantiene un índice codigo -> posición (archivo filename + ".idx")
+# que remove() actualiza cuando mueve el último registro; get_by_codigo() es O(1).
+# Con wal=True las escrituras pasan por un write-ahead log con group commit (ver wal.py):
+# cada group_size operaciones, o a más tardar group_interval segundos después de la primera
+# escritura del grupo (un Timer llama a commit(); sin concurrency se usa el lock "thread"),
+# se hace un fsync del log. Con group_interval=None solo cuenta group_size y commit()
+# confirma el grupo actual a mano.
+# concurrency="thread" | "process" agrega un lock de lectura/escritura (ver rwlock.py):
+# get()/readRecord()/get_by_codigo() y cada bloque de los recorridos toman el lock compartido,
+# las modificaciones el exclusivo.
+# delete_mode="tombstone" difiere el movimiento: remove() solo marca el registro (primer byte
+# del codigo = TOMBSTONE) y las posiciones no cambian; los recorridos saltan los marcados.
+# compact() rellena los huecos con los registros activos del final en una pasada y escribe
+# el header una sola vez; con compact_threshold (ej. 0.3) se ejecuta solo cuando la
+# proporción de marcados supera ese valor después de un remove.
+# La cantidad de marcados se guarda en el header: un archivo con marcas se abre (y se
+# recarga, con concurrency="process") en modo "tombstone" aunque se pida "move".
+# Un archivo con el header antiguo de 4 bytes se convierte al abrirlo.
+# encoded=("carrera", "apellidos") crea el archivo con el layout codificado (ver
+# ColumnDictionary); un archivo que ya tiene diccionario se abre siempre con ese layout.
+# Los filtros sobre columnas codificadas comparan códigos, sin decodificar strings.
+# Como el índice y el WAL, el diccionario no se puede usar con concurrency="process".
 # ---------------------------------------------------------
 class MoveTheLast:
-    def __init__(self, filename):
+    def __init__(self, filename, flush_every=1, index=False, wal=False,
+                 group_size=GROUP_SIZE, group_interval=GROUP_INTERVAL, concurrency=None,
+                 delete_mode="move", compact_threshold=None, encoded=()):
+        if delete_mode not in ("move", "tombstone"):
+            raise ValueError('delete_mode debe ser "move" o "tombstone"')
+        if index and concurrency == "process":
+            raise ValueError('El índice se mantiene en memoria: no se puede usar con concurrency="process"')
+        if wal and concurrency == "process":
+            raise ValueError('El WAL es de un solo proceso: no se puede usar con concurrency="process"')
+        if concurrency == "process" and (encoded or os.path.exists(filename + ".dict")):
+            raise ValueError('El diccionario se mantiene en memoria: no se puede usar con concurrency="process"')
+        if 'codigo' in encoded:
+            raise ValueError("codigo no se puede codificar: es la llave y su primer byte es la marca TOMBSTONE")
         self.filename = filename
+        replay(self.filename)  # grupos confirmados del WAL que no llegaron al archivo antes de una caída
         # Si el archivo no existe o está vacío, se inicializa (se escribe un header con valor 0).
-        if not os.path.exists(self.filename):
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
             self.initialize_file()
-        else:
-            with open(self.filename, "rb+") as file:
-                file.seek(0, 2)
-                if file.tell() == 0:
-                    self.initialize_file()
+        self.dictionary = None
+        if encoded or os.path.exists(self.filename + ".dict"):
+            if encoded and self.stored_count() and not os.path.exists(self.filename + ".dict"):
+                raise ValueError(f"{self.filename} ya tiene registros con el layout sin codificar")
+            self.dictionary = ColumnDictionary(self.filename + ".dict", encoded)
+            if encoded and set(encoded) != set(self.dictionary.columns):
+                raise ValueError(f"{self.filename} está codificado con las columnas {self.dictionary.columns}")
+        self.schema = encoded_schema(self.dictionary.columns) if self.dictionary is not None else ALUMNO_SCHEMA
+        self.record_size = self.schema.size
+        self.view = AlumnoView if self.dictionary is None else self.encoded_view()
+        if (os.path.getsize(self.filename) - HEADER_SIZE) % self.record_size == 0:
+            self.upgrade_legacy_file()  # archivo con el header antiguo de 4 bytes
+        self.file = tracked_open(self.filename, "rb+", buffering=0)
+        self.wal = WriteAheadLog(self.filename, self.file, write_at, group_size, group_interval,
+                                 on_interval=self.commit) if wal else None
+        self.flush_every = flush_every
+        self.pending = 0  # modificaciones del header aún no escritas en disco
+        self.delete_mode = delete_mode
+        # Registros marcados; el header (número de registros) los sigue contando.
+        self.reload_header()
+        # El Timer del WAL confirma desde otro hilo: sin concurrency se usa el lock entre hilos
+        if wal and group_interval is not None and concurrency is None:
+            concurrency = "thread"
+        self.lock = make_lock(concurrency, self.file, HEADER_SIZE_MOVE, self.reload_header, self.commit)
+        self.compact_threshold = compact_threshold
+        self.index = None
+        if index:
+            self.index = CodigoIndex(self.filename + ".idx")
+            self.index.open(self.header, os.stat(self.filename).st_mtime_ns, self._scan_codigos)
 
     def initialize_file(self):
-        with open(self.filename, "wb") as file:
-            header = 0  # 0 registros
-            file.write(struct.pack("i", header))
+        with tracked_open(self.filename, "wb") as file:
+            # 0 registros, 0 marcados
+            file.write(struct.pack(HEADER_FORMAT_MOVE, 0, 0))
+
+    def stored_count(self):
+        # Número de registros leído del archivo (primer campo en los dos formatos de header)
+        with tracked_open(self.filename, "rb") as file:
+            return struct.unpack("i", file.read(HEADER_SIZE))[0]
+
+    def upgrade_legacy_file(self):
+        # Convierte un archivo con header de 4 bytes al header con la cantidad de marcados,
+        # contándolos en un recorrido. Se escribe en un archivo temporal y se reemplaza.
+        tmp_filename = self.filename + ".tmp"
+        tombstones = 0
+        with tracked_open(self.filename, "rb") as old, tracked_open(tmp_filename, "wb") as new:
+            header = struct.unpack("i", old.read(HEADER_SIZE))[0]
+            new.write(struct.pack(HEADER_FORMAT_MOVE, header, 0))
+            for _, chunk in scan_blocks(old, HEADER_SIZE, header, self.record_size):
+                tombstones += sum(chunk[offset:offset + 1] == TOMBSTONE
+                                  for offset in range(0, len(chunk), self.record_size))
+                new.write(chunk)
+            new.seek(0)
+            new.write(struct.pack(HEADER_FORMAT_MOVE, header, tombstones))
+        os.replace(tmp_filename, self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if not self.file.closed:
+            with self.lock.write():
+                self.flush()
+                if self.wal is not None:
+                    self.wal.close()
+                self.file.close()
+            if self.index is not None:
+                self.index.close(os.stat(self.filename).st_mtime_ns)
+            if self.dictionary is not None:
+                self.dictionary.close()
+
+    def encoded_view(self):
+        # Vista perezosa del layout codificado: las columnas codificadas se traducen con el diccionario
+        decoders = {name: functools.partial(self.dictionary.decode, name) for name in self.dictionary.columns}
+        record = self.schema.view("EncodedAlumnoRecord", decoders)
+        return type("EncodedAlumnoView", (record,), {'__slots__': (), 'print': Alumno.print})
+
+    def flush(self):
+        # Escribe el header cacheado si tiene cambios pendientes.
+        if self.pending:
+            self._write_at(0, struct.pack(HEADER_FORMAT_MOVE, self.header, self.tombstones))
+            self.pending = 0
+
+    def reload_header(self):
+        # Al abrir y en modo "process" (otro proceso pudo modificar el archivo desde que se
+        # soltó el lock). Con registros marcados se pasa a modo "tombstone".
+        self.header, self.tombstones = struct.unpack(HEADER_FORMAT_MOVE, self._read_at(0, HEADER_SIZE_MOVE))
+        if self.tombstones:
+            self.delete_mode = "tombstone"
+
+    @operation()
+    @exclusive
+    def commit(self):
+        # Con WAL confirma el grupo actual (header incluido) con un fsync; sin WAL es flush().
+        self.flush()
+        if self.wal is not None:
+            self.wal.commit()
+
+    def end_operation(self):
+        if self.wal is not None and self.wal.end_operation():
+            self.commit()
+
+    def _read_at(self, offset, size):
+        data = read_at(self.file, offset, size)
+        if self.wal is not None and self.wal.pending:
+            data = self.wal.overlay(offset, size, data)
+        return data
+
+    def _write_at(self, offset, data):
+        if self.wal is not None:
+            self.wal.log(offset, data)
+        else:
+            write_at(self.file, offset, data)
 
     def readHeader(self):
-        with open(self.filename, "rb") as file:
-            file.seek(0)
-            header = struct.unpack("i", file.read(HEADER_SIZE))[0]
-        return header
+        return self.header
 
     def writeHeader(self, value):
-        with open(self.filename, "rb+") as file:
-            file.seek(0)
-            file.write(struct.pack("i", value))
+        # Cada operación termina actualizando el header: en modo WAL cierra la operación
+        self.header = value
+        self.pending += 1
+        if self.flush_every and self.pending >= self.flush_every:
+            self.flush()
+        self.end_operation()
+
+    def values(self, alumno: Alumno):
+        # Valores a empaquetar: en el layout codificado, con los códigos del diccionario
+        values = alumno_values(alumno)
+        return values if self.dictionary is None else self.dictionary.encode_values(values)
 
     def packAlumno(self, alumno: Alumno):
-        return struct.pack(FORMAT_MOVE,
-                           alumno.codigo.ljust(5)[:5].encode('utf-8'),
-                           alumno.nombre.ljust(11)[:11].encode('utf-8'),
-                           alumno.apellidos.ljust(20)[:20].encode('utf-8'),
-                           alumno.carrera.ljust(15)[:15].encode('utf-8'),
-                           alumno.ciclo,
-                           alumno.mensualidad)
+        return self.schema.pack(*self.values(alumno))
 
     def unpackRecord(self, record):
-        if not record:
+        if not record or record[:1] == TOMBSTONE:
             return None
-        codigo, nombre, apellidos, carrera, ciclo, mensualidad = struct.unpack(FORMAT_MOVE, record)
-        return Alumno(codigo.decode('utf-8').strip(),
-                      nombre.decode('utf-8').strip(),
-                      apellidos.decode('utf-8').strip(),
-                      carrera.decode('utf-8').strip(),
-                      ciclo,
-                      mensualidad)
+        return self.view(record)
 
+    @operation()
+    @exclusive
     def add(self, alumno: Alumno):
         header = self.readHeader()
-        with open(self.filename, "rb+") as file:
-            # Se posiciona al final del bloque de registros
-            file.seek(HEADER_SIZE + header * RECORD_SIZE_MOVE)
-            file.write(self.packAlumno(alumno))
+        record = self.packAlumno(alumno)
+        # Se escribe al final del bloque de registros con una sola escritura posicionada
+        self._write_at(HEADER_SIZE_MOVE + header * self.record_size, record)
+        if self.index is not None:
+            self.index.assign(header, record[:5])
         self.writeHeader(header + 1)
+        return header
 
+    @operation()
+    @exclusive
+    def add_many(self, alumnos):
+        # Todos los registros se empaquetan en un solo buffer contiguo:
+        # una única escritura al final del archivo y un solo cambio del header.
+        header = self.readHeader()
+        data = self.schema.pack_many(self.values(alumno) for alumno in alumnos)
+        if not data:
+            return
+        self._write_at(HEADER_SIZE_MOVE + header * self.record_size, data)
+        if self.index is not None:
+            self.index.assign_many(header, [bytes(data[i:i + 5]) for i in range(0, len(data), self.record_size)])
+        self.writeHeader(header + len(data) // self.record_size)
+
+    def _iter_chunks(self, batch_size):
+        # Recorre la zona de datos en bloques de batch_size registros: (posición inicial, bloque).
+        # El lock de lectura se toma por bloque (no durante todo el recorrido).
+        advise_sequential(self.file, HEADER_SIZE_MOVE)
+        first = 0
+        while True:
+            with self.lock.read():
+                count = min(batch_size, self.readHeader() - first)
+                if count <= 0:
+                    return
+                chunk = self._read_at(HEADER_SIZE_MOVE + first * self.record_size, count * self.record_size)
+            yield first, chunk
+            first += count
+
+    def iter_records(self, batch_size=BATCH_SIZE):
+        # Recorrido perezoso: se lee un bloque grande y se decodifica con iter_unpack
+        # sobre un memoryview (sin copiar cada registro).
+        for _, chunk in self._iter_chunks(batch_size):
+            if self.delete_mode == "move" and self.dictionary is None:
+                for fields in ALUMNO_SCHEMA.iter_unpack(memoryview(chunk)):
+                    yield Alumno(*fields)
+                continue
+            # Los marcados se descartan antes de decodificar los strings
+            for fields in self.schema.iter_unpack(memoryview(chunk), decode=False):
+                if fields[0][:1] != TOMBSTONE:
+                    fields = self.schema.decode(fields)
+                    yield Alumno(*(fields if self.dictionary is None else self.dictionary.decode_values(fields)))
+
+    @operation()
     def load(self):
+        return list(self.iter_records())
+
+    def scan(self, fields=ALUMNO_FIELDS, where=(), batch_size=BATCH_SIZE):
+        # Ej: scan(['carrera', 'mensualidad'], where=[('ciclo', '>=', 5)]) -> tuplas (carrera, mensualidad)
+        dictionary = self.dictionary.values if self.dictionary is not None else {}
+        rows = project_chunks(self._iter_chunks(batch_size), self.schema.format, ALUMNO_FIELDS, fields,
+                              encode_where(where, dictionary),
+                              tombstone_field='codigo' if self.delete_mode == "tombstone" else None)
+        return decode_codes(rows, fields, dictionary)
+
+    @operation()
+    def aggregate(self, func, field, where=(), group_by=None):
+        # Ej: aggregate('sum', 'mensualidad', where=[('ciclo', '>=', 5)], group_by='carrera')
+        return aggregate_scan(self.scan, func, field, where, group_by)
+
+    def parallel_scan(self, func, workers=None, combine=None, fields=None, where=()):
+        # func(filas) se ejecuta en otro proceso sobre cada rango de registros (tiene que poder
+        # serializarse con pickle: función de módulo o functools.partial). Las filas son Alumno,
+        # o tuplas si se pasa fields. Devuelve combine(resultados parciales) o la lista de parciales.
+        self.commit()  # los procesos leen el archivo directamente
+        layout = (self.schema.format, self.record_size) + PARALLEL_LAYOUTS[self.delete_mode][2:]
+        dictionary = self.dictionary.values if self.dictionary is not None else {}
+        return parallel_scan_file(self.filename, layout, self.readHeader(), func, workers, combine, fields,
+                                  encode_where(where, dictionary), dictionary)
+
+    def parallel_aggregate(self, func, field, where=(), group_by=None, workers=None):
+        return parallel_aggregate_file(self.parallel_scan, func, field, where, group_by, workers)
+
+    def _scan_codigos(self):
+        # codigo (bytes con padding) de cada posición, para reconstruir el índice
+        for _, chunk in self._iter_chunks(BATCH_SIZE):
+            for offset in range(0, len(chunk), self.record_size):
+                yield chunk[offset:offset + 5]
+
+    @operation()
+    @shared
+    def get_by_codigo(self, codigo):
+        # Búsqueda por codigo con el índice: una consulta al diccionario y una lectura.
+        if self.index is None:
+            raise ValueError("get_by_codigo() requiere abrir el archivo con index=True")
+        pos = self.index.get(ALUMNO_SCHEMA.encode_field('codigo', codigo))
+        if pos is None:
+            return None
+        return self.unpackRecord(self._read_at(HEADER_SIZE_MOVE + pos * self.record_size, self.record_size))
+
+    def as_array(self):
+        # Memory-map de solo lectura de la zona de datos como arreglo estructurado de numpy:
+        # permite filtrar/agregar (ciclo, mensualidad, ...) vectorizado sin construir objetos Alumno.
+        check_numpy()
+        self.commit()
         header = self.readHeader()
-        alumnos = []
-        with open(self.filename, "rb") as file:
-            file.seek(HEADER_SIZE)
-            for _ in range(header):
-                record = file.read(RECORD_SIZE_MOVE)
-                alumnos.append(self.unpackRecord(record))
-        # Imprime todos los registros cargados
-        for alumno in alumnos:
-            alumno.print()
-        return alumnos
+        # En el layout codificado las columnas codificadas quedan como códigos (ver self.dictionary)
+        dtype = DTYPE_MOVE if self.dictionary is None else struct_dtype(self.schema.format, ALUMNO_FIELDS)
+        if header == 0:
+            return np.empty(0, dtype=dtype)
+        array = np.memmap(self.filename, dtype=dtype, mode="r", offset=HEADER_SIZE_MOVE, shape=(header,))
+        if self.delete_mode == "tombstone":
+            # Se devuelve una copia sin los registros marcados
+            # (astype('S1') deja el primer byte; numpy lo lee como b'' si es TOMBSTONE)
+            return array[array['codigo'].astype('S1') != b'']
+        return array
+
+    def load_array(self):
+        # Igual que as_array() pero copiado a memoria (no depende del archivo abierto).
+        return np.array(self.as_array())
+
+    @operation()
+    @shared
+    def get(self, pos: int):
+        # Lectura sin imprimir: None si la posición no existe
+        if pos < 0 or pos >= self.readHeader():
+            return None
+        return self.unpackRecord(self._read_at(HEADER_SIZE_MOVE + pos * self.record_size, self.record_size))
+
+    @shared
+    def get_range(self, first: int, count: int):
+        # Lee [first, first + count) con una sola lectura: una vista por posición (None si está marcada)
+        count = max(0, min(count, self.readHeader() - first))
+        data = self._read_at(HEADER_SIZE_MOVE + first * self.record_size, count * self.record_size)
+        return [self.unpackRecord(data[i * self.record_size:(i + 1) * self.record_size]) for i in range(count)]
 
+    @operation()
     def readRecord(self, pos: int):
-        with open(self.filename, "rb") as file:
-            file.seek(HEADER_SIZE + pos * RECORD_SIZE_MOVE)
-            record = file.read(RECORD_SIZE_MOVE)
-            if not record or len(record) < RECORD_SIZE_MOVE:
-                print("Record not found")
-                return None
-            alumno = self.unpackRecord(record)
-            alumno.print()
-            return alumno
+        alumno = self.get(pos)
+        if alumno is None:
+            print("Record not found")
+            return None
+        alumno.print()
+        return alumno
 
+    def _mark(self, pos):
+        # Modo "tombstone": una escritura de un byte, el registro no se mueve
+        offset = HEADER_SIZE_MOVE + pos * self.record_size
+        if self._read_at(offset, 1) == TOMBSTONE:
+            print("No record in position:", pos)
+            return False
+        self._write_at(offset, TOMBSTONE)
+        if self.index is not None:
+            self.index.assign(pos, TOMBSTONE + self.index.codigos[pos][1:])
+        self.tombstones += 1
+        return True
+
+    def _maybe_compact(self):
+        if (self.compact_threshold is not None and self.readHeader()
+                and self.tombstones / self.readHeader() > self.compact_threshold):
+            return self.compact()
+
+    @operation()
+    @exclusive
     def remove(self, pos: int):
         header = self.readHeader()
-        if pos >= header:
+        if pos < 0 or pos >= header:
             print("No record in position:", pos)
             return
-        with open(self.filename, "rb+") as file:
-            # Ubica el último registro
-            file.seek(HEADER_SIZE + (header - 1) * RECORD_SIZE_MOVE)
-            last_record = file.read(RECORD_SIZE_MOVE)
+        if self.delete_mode == "tombstone":
+            if self._mark(pos):
+                self.writeHeader(header)  # guarda la cantidad de marcados
+                return self._maybe_compact()
+            return
+        if pos != header - 1:
             # Sobrescribe el registro a eliminar con el último registro
-            file.seek(HEADER_SIZE + pos * RECORD_SIZE_MOVE)
-            file.write(last_record)
+            last_record = self._read_at(HEADER_SIZE_MOVE + (header - 1) * self.record_size, self.record_size)
+            self._write_at(HEADER_SIZE_MOVE + pos * self.record_size, last_record)
+            if self.index is not None:
+                self.index.assign(pos, last_record[:5])  # el registro movido cambia de posición
+        if self.index is not None:
+            self.index.truncate(header - 1)
         self.writeHeader(header - 1)
 
+    @operation()
+    @exclusive
+    def remove_many(self, positions):
+        header = self.readHeader()
+        removed = set()
+        for pos in sorted(set(positions), reverse=True):
+            if pos < 0 or pos >= header:
+                print("No record in position:", pos)
+            else:
+                removed.add(pos)
+        if not removed:
+            return
+        if self.delete_mode == "tombstone":
+            if sum(self._mark(pos) for pos in sorted(removed)):
+                self.writeHeader(header)  # guarda la cantidad de marcados
+                return self._maybe_compact()
+            return
+        return self._fill_holes(header, removed)
+
+    @operation()
+    @exclusive
+    def compact(self):
+        # Modo "tombstone": una pasada secuencial para ubicar los marcados y después cada hueco
+        # dentro de los activos recibe uno de los registros activos del final (como remove_many).
+        # El header se escribe una sola vez. Devuelve {posición antigua: posición nueva} de los
+        # registros que se movieron; el resto conserva su posición.
+        removed = {first + i
+                   for first, chunk in self._iter_chunks(BATCH_SIZE)
+                   for i, offset in enumerate(range(0, len(chunk), self.record_size))
+                   if chunk[offset:offset + 1] == TOMBSTONE}
+        marked, self.tombstones = self.tombstones, 0
+        if not removed:
+            if marked:
+                self.writeHeader(self.readHeader())
+            return {}
+        return self._fill_holes(self.readHeader(), removed)
+
+    def _fill_holes(self, header, removed):
+        # Elimina las posiciones de 'removed' con el mismo resultado que remove() en orden
+        # descendente (cada una recibe el último registro actual). Devuelve el remap
+        # {posición antigua: posición nueva} de los registros que quedaron en otro lugar.
+        new_header = header - len(removed)
+        # La cola [new_header, header) se simula en memoria: origins[i] es la posición
+        # original del registro que está en new_header + i. Un registro puede moverse a la
+        # cola y de ahí otra vez a un hueco; solo se escriben los huecos bajo new_header.
+        origins = list(range(new_header, header))
+        placed = {}
+        last = header - 1
+        for pos in sorted(removed, reverse=True):
+            origin = origins[last - new_header]
+            if pos >= new_header:
+                origins[pos - new_header] = origin
+            else:
+                placed[pos] = origin
+            last -= 1
+        remap = {origin: hole for hole, origin in placed.items()}
+        holes = sorted(placed)
+        if holes:
+            # La cola se lee una sola vez
+            tail = self._read_at(HEADER_SIZE_MOVE + new_header * self.record_size, (header - new_header) * self.record_size)
+            movers = [placed[hole] - new_header for hole in holes]
+            # Huecos consecutivos se escriben con una sola escritura
+            run_start = 0
+            for i in range(1, len(holes) + 1):
+                if i == len(holes) or holes[i] != holes[i - 1] + 1:
+                    data = b"".join(tail[m * self.record_size:(m + 1) * self.record_size] for m in movers[run_start:i])
+                    self._write_at(HEADER_SIZE_MOVE + holes[run_start] * self.record_size, data)
+                    if self.index is not None:
+                        self.index.assign_many(holes[run_start], [data[j:j + 5] for j in range(0, len(data), self.record_size)])
+                    run_start = i
+        if self.index is not None:
+            self.index.truncate(new_header)
+        self.writeHeader(new_header)
+        return remap
+
 
 # ---------------------------------------------------------
 # Constantes y definiciones para la estrategia FREE_LIST.
 # ---------------------------------------------------------
-FORMAT_FREE = '5s11s20s15siii'     # Formato: añade un campo extra 'i' (nextDel)
-RECORD_SIZE_FREE = struct.calcsize(FORMAT_FREE)
+FREE_SCHEMA = ALUMNO_SCHEMA.extend([('nextDel', 'i')])
+FORMAT_FREE = FREE_SCHEMA.format     # Formato: añade un campo extra 'i' (nextDel)
+RECORD_SIZE_FREE = FREE_SCHEMA.size
+NEXT_DEL_OFFSET = RECORD_SIZE_FREE - 4  # nextDel son los últimos 4 bytes del registro
+DTYPE_FREE = struct_dtype(FORMAT_FREE, ALUMNO_FIELDS + ['nextDel']) if np is not None else None
+# Header extendido: primer espacio libre, cantidad de registros activos y de slots libres.
+# Así la fragmentación (libres / total) se conoce sin recorrer el archivo.
+HEADER_FORMAT_FREE = 'iii'
+HEADER_SIZE_FREE = struct.calcsize(HEADER_FORMAT_FREE)
 
 # ---------------------------------------------------------
 # Clase para la estrategia FREE_LIST.
 # En la eliminación se marca el registro como eliminado actualizando el campo nextDel.
 # Se utiliza el header para apuntar al primer espacio libre.
 # Se asume que un valor de nextDel igual a -2 indica que el registro está activo.
+# Igual que MoveTheLast: un solo handle abierto, header en memoria y flush_every
+# como política de escritura del header.
+# vacuum() compacta el archivo; con vacuum_threshold (ej. 0.5) se ejecuta solo cuando
+# la proporción libres / total supera ese valor después de un remove.
+# wal / group_size / group_interval y concurrency: igual que en MoveTheLast.
 # ---------------------------------------------------------
 class FreeList:
-    def __init__(self, filename):
+    def __init__(self, filename, flush_every=1, vacuum_threshold=None, wal=False,
+                 group_size=GROUP_SIZE, group_interval=GROUP_INTERVAL, concurrency=None):
+        if wal and concurrency == "process":
+            raise ValueError('El WAL es de un solo proceso: no se puede usar con concurrency="process"')
         self.filename = filename
-        if not os.path.exists(self.filename):
+        replay(self.filename)
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
             self.initialize_file()
+        elif (os.path.getsize(self.filename) - HEADER_SIZE) % RECORD_SIZE_FREE == 0:
+            self.upgrade_legacy_file()  # archivo con el header antiguo de 4 bytes
+        self.file = tracked_open(self.filename, "rb+", buffering=0)
+        self.wal = WriteAheadLog(self.filename, self.file, write_at, group_size, group_interval,
+                                 on_interval=self.commit) if wal else None
+        self.flush_every = flush_every
+        self.vacuum_threshold = vacuum_threshold
+        self.pending = 0
+        self.header, self.live, self.free = struct.unpack(HEADER_FORMAT_FREE, self._read_at(0, HEADER_SIZE_FREE))
+        # Cantidad de slots (activos + libres) en el archivo, para añadir al final sin seek.
+        self.slots = (os.fstat(self.file.fileno()).st_size - HEADER_SIZE_FREE) // RECORD_SIZE_FREE
+        if wal and group_interval is not None and concurrency is None:
+            concurrency = "thread"  # ver MoveTheLast: el Timer del WAL confirma desde otro hilo
+        self.lock = make_lock(concurrency, self.file, HEADER_SIZE_FREE, self.reload_header, self.commit)
 
     def initialize_file(self):
-        with open(self.filename, "wb") as file:
-            # Se inicializa el header con -1, lo que indica que no hay espacios libres.
-            file.write(struct.pack("i", -1))
+        with tracked_open(self.filename, "wb") as file:
+            # Se inicializa el header con -1 (no hay espacios libres), 0 activos y 0 libres.
+            file.write(struct.pack(HEADER_FORMAT_FREE, -1, 0, 0))
+
+    def upgrade_legacy_file(self):
+        # Convierte un archivo con header de 4 bytes (solo el primer libre) al header extendido,
+        # contando activos y libres en un recorrido. Se escribe en un archivo temporal y se reemplaza.
+        tmp_filename = self.filename + ".tmp"
+        live = free = 0
+        with tracked_open(self.filename, "rb") as old, tracked_open(tmp_filename, "wb") as new:
+            first_free = struct.unpack("i", old.read(HEADER_SIZE))[0]
+            new.write(struct.pack(HEADER_FORMAT_FREE, first_free, 0, 0))
+            for _, chunk in scan_blocks(old, HEADER_SIZE, None, RECORD_SIZE_FREE):
+                for offset in range(NEXT_DEL_OFFSET, len(chunk), RECORD_SIZE_FREE):
+                    if struct.unpack_from("i", chunk, offset)[0] == -2:
+                        live += 1
+                    else:
+                        free += 1
+                new.write(chunk)
+            new.seek(0)
+            new.write(struct.pack(HEADER_FORMAT_FREE, first_free, live, free))
+        os.replace(tmp_filename, self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if not self.file.closed:
+            with self.lock.write():
+                self.flush()
+                if self.wal is not None:
+                    self.wal.close()
+                self.file.close()
+
+    def flush(self):
+        if self.pending:
+            self._write_at(0, struct.pack(HEADER_FORMAT_FREE, self.header, self.live, self.free))
+            self.pending = 0
+
+    def reload_header(self):
+        self.header, self.live, self.free = struct.unpack(HEADER_FORMAT_FREE, self._read_at(0, HEADER_SIZE_FREE))
+        self.slots = (os.fstat(self.file.fileno()).st_size - HEADER_SIZE_FREE) // RECORD_SIZE_FREE
+
+    @operation()
+    @exclusive
+    def commit(self):
+        self.flush()
+        if self.wal is not None:
+            self.wal.commit()
+
+    def end_operation(self):
+        if self.wal is not None and self.wal.end_operation():
+            self.commit()
+
+    def _read_at(self, offset, size):
+        data = read_at(self.file, offset, size)
+        if self.wal is not None and self.wal.pending:
+            data = self.wal.overlay(offset, size, data)
+        return data
+
+    def _write_at(self, offset, data):
+        if self.wal is not None:
+            self.wal.log(offset, data)
+        else:
+            write_at(self.file, offset, data)
+
+    def _truncate(self, size):
+        # Con WAL el truncate se registra en el mismo grupo que las escrituras previas
+        if self.wal is not None:
+            self.flush()
+            self.wal.log_truncate(size)
+            self.wal.commit()
+        else:
+            self.file.truncate(size)
 
     def readHeader(self):
-        with open(self.filename, "rb") as file:
-            file.seek(0)
-            header = struct.unpack("i", file.read(HEADER_SIZE))[0]
-        return header
+        return self.header
 
     def writeHeader(self, value):
-        with open(self.filename, "rb+") as file:
-            file.seek(0)
-            file.write(struct.pack("i", value))
+        self.header = value
+        self.header_changed()
+
+    def header_changed(self):
+        self.pending += 1
+        if self.flush_every and self.pending >= self.flush_every:
+            self.flush()
+        self.end_operation()
+
+    def fragmentation(self):
+        # Proporción de slots libres sobre el total (0 si el archivo está vacío)
+        total = self.live + self.free
+        return self.free / total if total else 0.0
 
     def packAlumno(self, alumno: Alumno, nextDel: int):
-        return struct.pack(FORMAT_FREE,
-                           alumno.codigo.ljust(5)[:5].encode('utf-8'),
-                           alumno.nombre.ljust(11)[:11].encode('utf-8'),
-                           alumno.apellidos.ljust(20)[:20].encode('utf-8'),
-                           alumno.carrera.ljust(15)[:15].encode('utf-8'),
-                           alumno.ciclo,
-                           alumno.mensualidad,
-                           nextDel)
+        return FREE_SCHEMA.pack(*alumno_values(alumno), nextDel)
 
     def unpackRecord(self, record):
         if not record:
             return None
-        codigo, nombre, apellidos, carrera, ciclo, mensualidad, nextDel = struct.unpack(FORMAT_FREE, record)
-        alumno = Alumno(codigo.decode('utf-8').strip(),
-                        nombre.decode('utf-8').strip(),
-                        apellidos.decode('utf-8').strip(),
-                        carrera.decode('utf-8').strip(),
-                        ciclo,
-                        mensualidad)
-        return alumno, nextDel
+        return AlumnoView(record), FREE_SCHEMA.get(record, 'nextDel')
 
+    @operation()
+    @exclusive
     def add(self, alumno: Alumno):
         header = self.readHeader()
-        with open(self.filename, "rb+") as file:
-            if header == -1:
-                # No hay espacios libres: se añade al final del archivo.
-                file.seek(0, 2)
-                file.write(self.packAlumno(alumno, -2))  # -2 indica que el registro está activo.
-            else:
-                # Hay un espacio libre: se reutiliza ese registro.
-                pos = header
-                # Se lee el registro libre para obtener su puntero siguiente (nextDel).
-                file.seek(HEADER_SIZE + pos * RECORD_SIZE_FREE)
-                data = file.read(RECORD_SIZE_FREE)
-                _, nextDel = self.unpackRecord(data)
-                # Se escribe el nuevo registro en la posición libre.
-                file.seek(HEADER_SIZE + pos * RECORD_SIZE_FREE)
-                file.write(self.packAlumno(alumno, -2))
-                # Se actualiza el header para que apunte al siguiente espacio libre.
-                self.writeHeader(nextDel)
+        if header == -1:
+            # No hay espacios libres: se añade al final del archivo.
+            pos = self.slots
+            self._write_at(HEADER_SIZE_FREE + pos * RECORD_SIZE_FREE, self.packAlumno(alumno, -2))  # -2 indica que el registro está activo.
+            self.slots += 1
+            self.live += 1
+            self.header_changed()
+        else:
+            # Hay un espacio libre: se reutiliza ese registro.
+            pos = header
+            # Solo se lee el campo nextDel del slot libre para obtener el siguiente espacio libre.
+            nextDel = struct.unpack("i", self._read_at(HEADER_SIZE_FREE + pos * RECORD_SIZE_FREE + NEXT_DEL_OFFSET, 4))[0]
+            # Se escribe el nuevo registro en la posición libre.
+            self._write_at(HEADER_SIZE_FREE + pos * RECORD_SIZE_FREE, self.packAlumno(alumno, -2))
+            # Se actualiza el header para que apunte al siguiente espacio libre.
+            self.live += 1
+            self.free -= 1
+            self.writeHeader(nextDel)
+        return pos
+
+    def _iter_chunks(self, batch_size):
+        advise_sequential(self.file, HEADER_SIZE_FREE)
+        first = 0
+        while True:
+            with self.lock.read():
+                count = min(batch_size, self.slots - first)
+                if count <= 0:
+                    return
+                chunk = self._read_at(HEADER_SIZE_FREE + first * RECORD_SIZE_FREE, count * RECORD_SIZE_FREE)
+            yield first, chunk
+            first += count
+
+    def iter_records(self, batch_size=BATCH_SIZE):
+        for _, chunk in self._iter_chunks(batch_size):
+            for *fields, nextDel in FREE_SCHEMA.iter_unpack(memoryview(chunk), decode=False):
+                if nextDel == -2:  # Solo registros activos, los eliminados se saltan sin decodificar
+                    yield make_alumno(*fields)
 
+    @operation()
     def load(self):
-        alumnos = []
-        with open(self.filename, "rb") as file:
-            file.seek(HEADER_SIZE)
-            while True:
-                data = file.read(RECORD_SIZE_FREE)
-                if not data or len(data) < RECORD_SIZE_FREE:
-                    break
-                alumno, nextDel = self.unpackRecord(data)
-                if nextDel == -2:  # Registro activo
-                    alumnos.append(alumno)
-        for alumno in alumnos:
-            alumno.print()
-        return alumnos
+        return list(self.iter_records())
+
+    def scan(self, fields=ALUMNO_FIELDS, where=(), batch_size=BATCH_SIZE):
+        # Igual que MoveTheLast.scan(); los slots eliminados se descartan mirando solo nextDel
+        return project_chunks(self._iter_chunks(batch_size), FORMAT_FREE, ALUMNO_FIELDS + ['nextDel'],
+                              fields, where, live_field='nextDel')
+
+    @operation()
+    def aggregate(self, func, field, where=(), group_by=None):
+        return aggregate_scan(self.scan, func, field, where, group_by)
+
+    def parallel_scan(self, func, workers=None, combine=None, fields=None, where=()):
+        # Igual que MoveTheLast.parallel_scan(); cada proceso salta los slots eliminados
+        self.commit()
+        return parallel_scan_file(self.filename, PARALLEL_LAYOUTS["free"], self.slots, func, workers, combine, fields, where)
+
+    def parallel_aggregate(self, func, field, where=(), group_by=None, workers=None):
+        return parallel_aggregate_file(self.parallel_scan, func, field, where, group_by, workers)
+
+    def as_array(self):
+        # Devuelve (arreglo, máscara): el arreglo incluye todos los slots y la máscara
+        # booleana indica cuáles están activos (nextDel == -2).
+        check_numpy()
+        self.commit()
+        if self.slots == 0:
+            array = np.empty(0, dtype=DTYPE_FREE)
+        else:
+            array = np.memmap(self.filename, dtype=DTYPE_FREE, mode="r", offset=HEADER_SIZE_FREE, shape=(self.slots,))
+        return array, array['nextDel'] == -2
+
+    def load_array(self):
+        array, mask = self.as_array()
+        return np.array(array), mask
+
+    @operation()
+    @shared
+    def get(self, pos: int):
+        # Lectura sin imprimir: None si la posición no existe o el registro fue eliminado
+        if pos < 0 or pos >= self.slots:
+            return None
+        alumno, nextDel = self.unpackRecord(self._read_at(HEADER_SIZE_FREE + pos * RECORD_SIZE_FREE, RECORD_SIZE_FREE))
+        return alumno if nextDel == -2 else None
 
+    @shared
+    def get_range(self, first: int, count: int):
+        # Lee [first, first + count) con una sola lectura: una vista por posición (None si está eliminada)
+        count = max(0, min(count, self.slots - first))
+        data = self._read_at(HEADER_SIZE_FREE + first * RECORD_SIZE_FREE, count * RECORD_SIZE_FREE)
+        records = (self.unpackRecord(data[i * RECORD_SIZE_FREE:(i + 1) * RECORD_SIZE_FREE]) for i in range(count))
+        return [alumno if nextDel == -2 else None for alumno, nextDel in records]
+
+    @operation()
     def readRecord(self, pos: int):
-        with open(self.filename, "rb") as file:
-            file.seek(HEADER_SIZE + pos * RECORD_SIZE_FREE)
-            data = file.read(RECORD_SIZE_FREE)
-            if not data or len(data) < RECORD_SIZE_FREE:
-                print("Record not found")
-                return None
-            alumno, nextDel = self.unpackRecord(data)
-            if nextDel != -2:
-                print("Record has been deleted")
-                return None
-            alumno.print()
-            return alumno
+        if pos < 0 or pos >= self.slots:
+            print("Record not found")
+            return None
+        alumno = self.get(pos)
+        if alumno is None:
+            print("Record has been deleted")
+            return None
+        alumno.print()
+        return alumno
 
+    @operation()
+    @exclusive
     def remove(self, pos: int):
-        header = self.readHeader()
-        with open(self.filename, "rb+") as file:
-            # Se posiciona en el campo nextDel del registro a eliminar (últimos 4 bytes)
-            file.seek(HEADER_SIZE + ((pos + 1) * RECORD_SIZE_FREE) - 4)
-            # Se escribe el puntero actual del header en ese registro.
-            file.write(struct.pack("i", header))
+        if pos < 0 or pos >= self.slots:
+            print("No record in position:", pos)
+            return
+        offset = HEADER_SIZE_FREE + pos * RECORD_SIZE_FREE + NEXT_DEL_OFFSET
+        if struct.unpack("i", self._read_at(offset, 4))[0] != -2:
+            # Ya eliminado: volver a encadenarlo rompería la lista de libres y los contadores
+            print("No record in position:", pos)
+            return
+        # Se escribe el puntero actual del header en el campo nextDel del registro a eliminar.
+        self._write_at(offset, struct.pack("i", self.readHeader()))
         # Actualiza el header para que apunte al registro eliminado.
+        self.live -= 1
+        self.free += 1
         self.writeHeader(pos)
+        # Si se superó el umbral de fragmentación se compacta y se devuelve el remapeo de posiciones.
+        if self.vacuum_threshold is not None and self.fragmentation() > self.vacuum_threshold:
+            return self.vacuum()
+
+    @operation()
+    @exclusive
+    def vacuum(self):
+        # Reescribe los registros activos de forma contigua al inicio y trunca el archivo.
+        # Devuelve {posición antigua: posición nueva} porque las posiciones cambian.
+        remap = {}
+        write_pos = 0
+        for first, chunk in self._iter_chunks(BATCH_SIZE):
+            live = bytearray()
+            for i, offset in enumerate(range(0, len(chunk), RECORD_SIZE_FREE)):
+                if struct.unpack_from("i", chunk, offset + NEXT_DEL_OFFSET)[0] == -2:
+                    remap[first + i] = write_pos + len(live) // RECORD_SIZE_FREE
+                    live += chunk[offset:offset + RECORD_SIZE_FREE]
+            # Solo se escribe si el bloque se desplazó o tenía huecos (el bloque ya se leyó
+            # y write_pos <= first, así que no se pisa nada que falte leer)
+            if live and (write_pos != first or len(live) != len(chunk)):
+                self._write_at(HEADER_SIZE_FREE + write_pos * RECORD_SIZE_FREE, bytes(live))
+            write_pos += len(live) // RECORD_SIZE_FREE
+        self.slots = write_pos
+        self.header, self.live, self.free = -1, write_pos, 0
+        self.pending += 1
+        # Con WAL los registros compactados, el header y el truncate se confirman juntos
+        self._truncate(HEADER_SIZE_FREE + write_pos * RECORD_SIZE_FREE)
+        self.flush()
+        return remap
+
+
+# ---------------------------------------------------------
+# Recorrido paralelo: la zona de datos se divide en rangos de registros y cada rango se
+# procesa en un proceso del pool, que abre su propio handle del archivo. Los resultados
+# parciales se combinan en el proceso padre.
+# ---------------------------------------------------------
+PARALLEL_LAYOUTS = {
+    # formato, tamaño de registro, tamaño del header, campos, campo que marca los activos
+    # y campo string que marca los eliminados con TOMBSTONE
+    "move": (FORMAT_MOVE, RECORD_SIZE_MOVE, HEADER_SIZE_MOVE, ALUMNO_FIELDS, None, None),
+    "tombstone": (FORMAT_MOVE, RECORD_SIZE_MOVE, HEADER_SIZE_MOVE, ALUMNO_FIELDS, None, 'codigo'),
+    "free": (FORMAT_FREE, RECORD_SIZE_FREE, HEADER_SIZE_FREE, ALUMNO_FIELDS + ['nextDel'], 'nextDel', None),
+}
+MIN_PARALLEL_RANGE = 16384  # registros mínimos por tarea, para que el costo del pool valga la pena
+
+
+def scan_range(filename, layout, first, count, func, fields, where, dictionary):
+    # Se ejecuta en el proceso hijo: lee solo los registros [first, first + count).
+    # dictionary = {columna: valores por código} de las columnas codificadas (o vacío)
+    fmt, record_size, header_size, names, live_field, tombstone_field = layout
+    with open(filename, "rb", buffering=0) as file:
+        chunks = scan_blocks(file, header_size + first * record_size, count, record_size)
+        rows = decode_codes(project_chunks(chunks, fmt, names, fields or ALUMNO_FIELDS, where, live_field, tombstone_field),
+                            fields or ALUMNO_FIELDS, dictionary)
+        if fields is None:
+            rows = (Alumno(*values) for values in rows)
+        return func(rows)
+
+
+def parallel_scan_file(filename, layout, total, func, workers, combine, fields, where, dictionary=None):
+    workers = workers or os.cpu_count() or 1
+    # Varios rangos por proceso para repartir mejor la carga
+    size = max(MIN_PARALLEL_RANGE, -(-total // (workers * 4)))
+    ranges = [(first, min(size, total - first)) for first in range(0, total, size)]
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(ranges), 1))) as pool:
+        futures = [pool.submit(scan_range, filename, layout, first, count, func, fields, where, dictionary or {})
+                   for first, count in ranges]
+        partials = [future.result() for future in futures]
+    return combine(partials) if combine is not None else partials
+
+
+def parallel_aggregate_file(parallel_scan, func, field, where, group_by, workers):
+    if func not in AGGREGATES:
+        raise ValueError(f"Agregado desconocido: {func}")
+    grouped = group_by is not None
+    partials = parallel_scan(functools.partial(aggregate_rows, func, grouped), workers,
+                             fields=aggregate_fields(field, group_by), where=where)
+    return finish_aggregate(merge_partials(partials, func), func, grouped)
+
+
+# ---------------------------------------------------------
+# Variante de FREE_LIST con un bitmap de espacio libre (archivo filename + ".bitmap")
+# en lugar de la lista enlazada de nextDel: el bit i vale 1 si el slot i está activo.
+# El formato de los registros no cambia (nextDel == -2 sigue marcando los activos), así que
+# FreeList puede leer el archivo; el header apunta a -1 mientras se usa el bitmap.
+# - add() no necesita leer el slot libre (solo lo escribe).
+# - add_many() reserva n slots prefiriendo tramos contiguos: una escritura por tramo.
+# - count_live() es el popcount del bitmap.
+# Al abrir un archivo con lista enlazada (o con un bitmap desactualizado) el bitmap se
+# reconstruye recorriendo los nextDel; to_chain() vuelve al formato de lista enlazada.
+# ---------------------------------------------------------
+FREE_BYTE = re.compile(rb'[^\xff]')  # byte del bitmap con al menos un slot libre
+
+
+class BitmapFreeList(FreeList):
+    def __init__(self, filename, flush_every=1, vacuum_threshold=None, wal=False,
+                 group_size=GROUP_SIZE, group_interval=GROUP_INTERVAL, concurrency=None):
+        if concurrency == "process":
+            raise ValueError('El bitmap se mantiene en memoria: no se puede usar con concurrency="process"')
+        super().__init__(filename, flush_every, vacuum_threshold, wal, group_size, group_interval, concurrency)
+        self.bitmap_filename = self.filename + ".bitmap"
+        self.dirty = None  # rango [inicio, fin) de bytes del bitmap pendientes de escribir
+        bitmap = None
+        if os.path.exists(self.bitmap_filename):
+            with tracked_open(self.bitmap_filename, "rb") as file:
+                bitmap = bytearray(file.read())
+        if bitmap is None or not self.bitmap_matches(bitmap):
+            bitmap = self.build_bitmap()
+            with tracked_open(self.bitmap_filename, "wb") as file:
+                file.write(bitmap)
+            self.writeHeader(-1)  # desde ahora los libres solo se registran en el bitmap
+            self.flush()
+        self.bitmap = bitmap
+        self.bitmap_file = tracked_open(self.bitmap_filename, "rb+", buffering=0)
+
+    def bitmap_matches(self, bitmap):
+        # Validación barata: tamaño, cantidad de activos y que nadie haya usado la lista enlazada
+        return (self.header == -1 and len(bitmap) == (self.slots + 7) // 8
+                and int.from_bytes(bitmap, 'little').bit_count() == self.live)
+
+    def build_bitmap(self):
+        bitmap = bytearray((self.slots + 7) // 8)
+        for first, chunk in self._iter_chunks(BATCH_SIZE):
+            for i, offset in enumerate(range(NEXT_DEL_OFFSET, len(chunk), RECORD_SIZE_FREE), first):
+                if struct.unpack_from("i", chunk, offset)[0] == -2:
+                    bitmap[i >> 3] |= 1 << (i & 7)
+        return bitmap
+
+    def close(self):
+        if not self.file.closed:
+            super().close()
+            self.flush_bitmap()
+            self.bitmap_file.close()
+
+    def flush(self):
+        super().flush()
+        # Con WAL el bitmap no puede adelantarse a los datos: se escribe en commit()
+        if self.wal is None:
+            self.flush_bitmap()
+
+    @operation()
+    @exclusive
+    def commit(self):
+        super().commit()
+        self.flush_bitmap()
+
+    def flush_bitmap(self):
+        if self.dirty is not None:
+            start, end = self.dirty
+            write_at(self.bitmap_file, start, bytes(self.bitmap[start:end]))
+            self.dirty = None
+
+    def set_bits(self, start, count, live):
+        # Marca count slots desde start como activos (live=True) o libres, ampliando el bitmap si hace falta
+        end = start + count
+        if (end + 7) // 8 > len(self.bitmap):
+            self.bitmap.extend(bytes((end + 7) // 8 - len(self.bitmap)))
+        for pos in range(start, end):
+            if live:
+                self.bitmap[pos >> 3] |= 1 << (pos & 7)
+            else:
+                self.bitmap[pos >> 3] &= ~(1 << (pos & 7))
+        first_byte, last_byte = start >> 3, ((end - 1) >> 3) + 1
+        if self.dirty is None:
+            self.dirty = (first_byte, last_byte)
+        else:
+            self.dirty = (min(self.dirty[0], first_byte), max(self.dirty[1], last_byte))
+
+    def is_live(self, pos):
+        return bool(self.bitmap[pos >> 3] >> (pos & 7) & 1)
+
+    def count_live(self):
+        return int.from_bytes(self.bitmap, 'little').bit_count()
+
+    def free_runs(self):
+        # (inicio, largo) de cada tramo de slots libres; los bytes llenos (0xFF) se saltan con una regex
+        runs = []
+        for match in FREE_BYTE.finditer(self.bitmap):
+            byte_index = match.start()
+            for pos in range(byte_index * 8, min(byte_index * 8 + 8, self.slots)):
+                if self.is_live(pos):
+                    continue
+                if runs and runs[-1][0] + runs[-1][1] == pos:
+                    runs[-1][1] += 1
+                else:
+                    runs.append([pos, 1])
+        return runs
+
+    def allocate(self, n):
+        # Reserva n slots como lista de tramos (inicio, largo). Si un tramo libre alcanza se usa
+        # el más chico que alcance; si no, se usan los más largos primero y el resto va al final.
+        runs = self.free_runs()
+        fitting = [run for run in runs if run[1] >= n]
+        if fitting:
+            start = min(fitting, key=lambda run: run[1])[0]
+            return [(start, n)]
+        allocation = []
+        for start, length in sorted(runs, key=lambda run: -run[1]):
+            if n == 0:
+                break
+            allocation.append((start, min(length, n)))
+            n -= min(length, n)
+        if n:
+            allocation.append((self.slots, n))
+        return allocation
+
+    @operation()
+    @exclusive
+    def add(self, alumno: Alumno):
+        match = FREE_BYTE.search(self.bitmap)
+        pos = self.slots
+        if match:
+            byte = self.bitmap[match.start()]
+            bit = next(bit for bit in range(8) if not byte >> bit & 1)
+            pos = min(match.start() * 8 + bit, self.slots)
+        self.add_many([alumno], [(pos, 1)])
+        return pos
+
+    @operation()
+    @exclusive
+    def add_many(self, alumnos, allocation=None):
+        alumnos = list(alumnos)
+        if not alumnos:
+            return []
+        if allocation is None:
+            allocation = self.allocate(len(alumnos))
+        data = memoryview(FREE_SCHEMA.pack_many((*alumno_values(alumno), -2) for alumno in alumnos))
+        positions = []
+        written = 0
+        for start, length in allocation:
+            # Una escritura por tramo contiguo
+            self._write_at(HEADER_SIZE_FREE + start * RECORD_SIZE_FREE, data[written:written + length * RECORD_SIZE_FREE])
+            written += length * RECORD_SIZE_FREE
+            reused = max(0, min(start + length, self.slots) - start)
+            self.free -= reused
+            self.slots = max(self.slots, start + length)
+            self.set_bits(start, length, True)
+            positions.extend(range(start, start + length))
+        self.live += len(alumnos)
+        self.header_changed()
+        return positions
+
+    @operation()
+    @exclusive
+    def remove(self, pos: int):
+        if pos < 0 or pos >= self.slots or not self.is_live(pos):
+            print("No record in position:", pos)
+            return
+        self._write_at(HEADER_SIZE_FREE + pos * RECORD_SIZE_FREE + NEXT_DEL_OFFSET, struct.pack("i", -1))
+        self.set_bits(pos, 1, False)
+        self.live -= 1
+        self.free += 1
+        self.header_changed()
+        if self.vacuum_threshold is not None and self.fragmentation() > self.vacuum_threshold:
+            return self.vacuum()
+
+    @operation()
+    @exclusive
+    def vacuum(self):
+        remap = super().vacuum()
+        # Después de compactar todos los slots están activos
+        self.bitmap = bytearray(b'\xff' * (self.slots // 8))
+        if self.slots % 8:
+            self.bitmap.append((1 << (self.slots % 8)) - 1)
+        self.dirty = (0, len(self.bitmap))
+        self.bitmap_file.truncate(len(self.bitmap))
+        self.flush_bitmap()  # los datos ya quedaron escritos (o confirmados) en vacuum()
+        return remap
+
+    @operation()
+    @exclusive
+    def to_chain(self):
+        # Vuelve al formato de lista enlazada: cada slot libre apunta al siguiente libre y el
+        # header al primero. Después el archivo se usa con FreeList (este objeto queda cerrado).
+        free_slots = [pos for start, length in self.free_runs() for pos in range(start, start + length)]
+        next_free = dict(zip(free_slots, free_slots[1:] + [-1]))
+        for first, chunk in self._iter_chunks(BATCH_SIZE):
+            chunk = bytearray(chunk)
+            changed = False
+            for i in range(len(chunk) // RECORD_SIZE_FREE):
+                if first + i in next_free:
+                    struct.pack_into("i", chunk, i * RECORD_SIZE_FREE + NEXT_DEL_OFFSET, next_free[first + i])
+                    changed = True
+            if changed:
+                self._write_at(HEADER_SIZE_FREE + first * RECORD_SIZE_FREE, bytes(chunk))
+        self.writeHeader(free_slots[0] if free_slots else -1)
+        self.close()
+        os.remove(self.bitmap_filename)
 
 
 # ---------------------------------------------------------
@@ -241,7 +1469,8 @@ class FreeList:
 # ---------------------------------------------------------
 def print_records(records):
     for i, alumno in enumerate(records):
-        print(f"Pos {i}: {alumno}")
+        print(f"Pos {i}:", end=" ")
+        alumno.print()
 
 def test_move_the_last():
     print("=== TEST: MOVE_THE_LAST ===")
@@ -287,6 +1516,7 @@ def test_move_the_last():
     # Probar eliminar en posición fuera de rango
     print("\nIntentando eliminar registro en posición 5 (fuera de rango):")
     db_move.remove(5)
+    db_move.close()
     print("Test MOVE_THE_LAST completado.\n")
 
 def test_free_list():
@@ -338,9 +1568,72 @@ def test_free_list():
     print("\nRegistros después de agregar nuevo registro en espacio libre:")
     records = db_free.load()
     print_records(records)
-    
+
+    db_free.close()
     print("Test FREE_LIST completado.\n")
 
+def remove_files(filename):
+    for name in (filename, filename + ".idx", filename + ".wal", filename + ".dict"):
+        if os.path.exists(name):
+            os.remove(name)
+
+def test_remove_many():
+    print("=== TEST: remove_many vs remove ===")
+    alumnos = [Alumno(f"C{30 + i}", "Nombre", "Apellido", "CS", 5, i) for i in range(19)]
+    positions = {6, 11, 16}  # 16 queda en la cola: el registro que recibe se vuelve a mover
+    remove_files("data_batch.dat")
+    remove_files("data_seq.dat")
+    with MoveTheLast("data_batch.dat", index=True) as batch, MoveTheLast("data_seq.dat") as seq:
+        batch.add_many(alumnos)
+        seq.add_many(alumnos)
+        remap = batch.remove_many(positions)
+        for pos in sorted(positions, reverse=True):
+            seq.remove(pos)
+        codigos = [alumno.codigo for alumno in batch.load()]
+        assert codigos == [alumno.codigo for alumno in seq.load()]
+        assert codigos[6] == "C48" and codigos[11] == "C47"
+        assert remap == {18: 6, 17: 11}
+        # El índice sigue a los registros que se movieron
+        assert all(batch.get_by_codigo(codigo).codigo == codigo for codigo in codigos)
+    print("Test remove_many completado.\n")
+
+def test_tombstone_reopen():
+    print("=== TEST: tombstones al reabrir ===")
+    remove_files("data_tomb.dat")
+    with MoveTheLast("data_tomb.dat", delete_mode="tombstone") as db:
+        db.add_many(Alumno(f"C{i}", "Nombre", "Apellido", "CS", 5, i) for i in range(10))
+        db.remove(9)
+        db.remove(3)
+    # La cantidad de marcados está en el header: se abre en modo "tombstone" aunque se pida "move"
+    with MoveTheLast("data_tomb.dat") as db:
+        assert db.delete_mode == "tombstone" and db.tombstones == 2
+        assert len(db.load()) == 8 and db.get(3) is None
+        db.remove(8)  # marca; no mueve el 9 (marcado) a la posición 8
+        assert db.get(8) is None and db.readHeader() == 10
+        assert db.compact() == {7: 3}
+        assert db.tombstones == 0 and db.readHeader() == 7
+    print("Test tombstones completado.\n")
+
+def test_wal_crash():
+    print("=== TEST: WAL con caída ===")
+    remove_files("data_wal.dat")
+    db = MoveTheLast("data_wal.dat", wal=True, group_size=1000, group_interval=None)
+    db.add(Alumno("P-123", "Eduardo", "Aragon", "CS", 5, 500))
+    db.add(Alumno("P-124", "Jorge", "Quenta", "DS", 5, 2000))
+    db.commit()
+    db.add(Alumno("P-125", "Jose", "Quenta", "DS", 5, 2000))  # grupo sin confirmar
+    # Caída: sin close() no hay checkpoint y el grupo pendiente no llegó al archivo
+    db.wal.file.close()
+    db.file.close()
+    assert os.path.exists("data_wal.dat.wal")
+    with MoveTheLast("data_wal.dat") as db:
+        assert [alumno.codigo for alumno in db.load()] == ["P-123", "P-124"]
+    assert not os.path.exists("data_wal.dat.wal")
+    print("Test WAL completado.\n")
+
 if __name__ == "__main__":
     test_move_the_last()
     test_free_list()
+    test_remove_many()
+    test_tombstone_reopen()
+    test_wal_crash()
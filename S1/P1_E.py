@@ -86,6 +86,17 @@ class MoveTheLast:
             file.seek(0)
             file.write(struct.pack("i", header + 1))  # actualize header + 1
     
+    def add_many(self, alumnos):
+        header = self.readHeader()
+        data = b"".join(self.packAlumno(alumno) for alumno in alumnos)  # one contiguous buffer
+        if not data:
+            return
+        with open(self.filename, "rb+") as file:
+            file.seek(HEADER_SIZE + header * RECORD_SIZE)  # pointer at the end
+            file.write(data)
+            file.seek(0)
+            file.write(struct.pack("i", header + len(data) // RECORD_SIZE))  # actualize header once
+    
     def readRecord(self, pos: int):
         with open(self.filename, "rb") as file:
             file.seek(HEADER_SIZE + pos * RECORD_SIZE)  # pointer at record pos
@@ -110,6 +121,28 @@ class MoveTheLast:
                 file.seek(0)
                 file.write(struct.pack("i", header - 1))  # actualize header - 1
 
+    def remove_many(self, positions):
+        header = self.readHeader()
+        positions = [pos for pos in sorted(set(positions), reverse=True) if 0 <= pos < header]
+        if not positions:
+            return
+        new_header = header - len(positions)
+        with open(self.filename, "rb+") as file:
+            file.seek(HEADER_SIZE + new_header * RECORD_SIZE)
+            data = file.read(len(positions) * RECORD_SIZE)  # read the tail once
+            tail = [data[i:i + RECORD_SIZE] for i in range(0, len(data), RECORD_SIZE)]
+            last = header - 1
+            for pos in positions:  # descending order: move the current last into pos
+                record = tail[last - new_header]
+                if pos >= new_header:
+                    tail[pos - new_header] = record  # stays beyond the new header, only in memory
+                else:
+                    file.seek(HEADER_SIZE + pos * RECORD_SIZE)
+                    file.write(record)
+                last -= 1
+            file.seek(0)
+            file.write(struct.pack("i", new_header))  # actualize header once
+
 # Constantes para FREE_LIST
 FORMAT_FREE = '5s11s20s15siii'     # Formato: añade un campo extra 'i' (nextDel)
 RECORD_SIZE_FREE = struct.calcsize(FORMAT_FREE)
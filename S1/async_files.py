@@ -0,0 +1,228 @@
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from P1 import Alumno, MoveTheLast, FreeList, ALUMNO_FIELDS, BATCH_SIZE, RECORD_SIZE_FREE
+
+# ---------------------------------------------------------
+# Fachada asyncio para MoveTheLast / FreeList: ninguna llamada bloquea el event loop.
+#   - Las lecturas corren en un pool de hilos acotado (workers). Lecturas concurrentes de
+#     la misma página (PAGE_BYTES del archivo) se unen en una sola lectura: todas esperan
+#     el mismo future.
+#   - Las escrituras se encolan y las ejecuta una sola tarea escritora, en orden, en un hilo
+#     propio. La tarea toma todas las escrituras pendientes y las ejecuta en una sola
+#     llamada al hilo, así una ráfaga de add() no ocupa el pool de lecturas.
+#   - El archivo se abre con concurrency="thread" (ver rwlock.py): las lecturas del pool y
+#     la escritura en curso no se pisan.
+# Uso:
+#   db = await AsyncMoveTheLast.open("data.dat")
+#   async with db:
+#       pos = await db.add(alumno)
+#       alumno = await db.read_record(pos)
+#       async for alumno in db: ...
+# ---------------------------------------------------------
+PAGE_BYTES = 4096
+WORKERS = 4
+
+
+class AsyncRecordFile:
+    file_class = None
+
+    def __init__(self, db, workers=WORKERS):
+        self.db = db
+        self.readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s1-read")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="s1-write")
+        self.page_records = max(1, PAGE_BYTES // self.record_size())
+        self.pages = {}  # página -> future de la lectura en curso
+        self.queue = None
+        self.writer_task = None
+
+    @classmethod
+    async def open(cls, filename, workers=WORKERS, **options):
+        # El archivo se abre (y el WAL se reproduce) fuera del event loop
+        options.setdefault("concurrency", "thread")
+        loop = asyncio.get_running_loop()
+        db = await loop.run_in_executor(None, lambda: cls.file_class(filename, **options))
+        return cls(db, workers)
+
+    def record_size(self):
+        return self.db.record_size
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self.writer_task is not None:
+            await self.queue.join()
+            self.writer_task.cancel()
+            self.writer_task = None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.writer, self.db.close)
+        self.readers.shutdown()
+        self.writer.shutdown()
+
+    # -----------------------------------------------------
+    # Lecturas
+    # -----------------------------------------------------
+    async def _read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, func, *args)
+
+    async def read_record(self, pos: int):
+        # Devuelve la vista del registro o None (no imprime, a diferencia de readRecord)
+        if pos < 0:
+            return None
+        page, i = divmod(pos, self.page_records)
+        future = self.pages.get(page)
+        if future is None:
+            future = asyncio.ensure_future(self._read(self.db.get_range, page * self.page_records, self.page_records))
+            self.pages[page] = future
+
+            def forget(done):
+                if self.pages.get(page) is done:
+                    del self.pages[page]
+            future.add_done_callback(forget)
+        records = await asyncio.shield(future)
+        return records[i] if i < len(records) else None
+
+    async def get_by_codigo(self, codigo):
+        return await self._read(self.db.get_by_codigo, codigo)
+
+    async def aggregate(self, func, field, where=(), group_by=None):
+        return await self._read(self.db.aggregate, func, field, where, group_by)
+
+    async def _iterate(self, iterator, batch_size):
+        # Los elementos se traen de a bloques desde el pool; el iterador avanza en un solo hilo a la vez
+        while True:
+            batch = await self._read(lambda: list(itertools.islice(iterator, batch_size)))
+            if not batch:
+                return
+            for item in batch:
+                yield item
+
+    def __aiter__(self):
+        return self._iterate(self.db.iter_records(), BATCH_SIZE)
+
+    def scan(self, fields=ALUMNO_FIELDS, where=(), batch_size=BATCH_SIZE):
+        return self._iterate(self.db.scan(fields, where, batch_size), batch_size)
+
+    # -----------------------------------------------------
+    # Escrituras: una sola tarea las ejecuta en orden
+    # -----------------------------------------------------
+    async def _write(self, name, *args):
+        if self.writer_task is None:
+            self.queue = asyncio.Queue()
+            self.writer_task = asyncio.ensure_future(self._writer())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((name, args, future))
+        return await future
+
+    def _run_writes(self, operations):
+        # Corre en el hilo escritor: resultado o excepción de cada operación
+        results = []
+        for name, args, _ in operations:
+            try:
+                results.append((True, getattr(self.db, name)(*args)))
+            except Exception as e:
+                results.append((False, e))
+        return results
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            operations = [await self.queue.get()]
+            while not self.queue.empty():
+                operations.append(self.queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self.writer, self._run_writes, operations)
+                # Las lecturas de página en curso pueden ser anteriores a estas escrituras:
+                # las lecturas nuevas ya no se unen a ellas
+                self.pages.clear()
+                for (_, _, future), (ok, value) in zip(operations, results):
+                    if future.done():
+                        continue
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+            finally:
+                for _ in operations:
+                    self.queue.task_done()
+
+    async def add(self, alumno: Alumno):
+        return await self._write("add", alumno)
+
+    async def remove(self, pos: int):
+        return await self._write("remove", pos)
+
+    async def commit(self):
+        return await self._write("commit")
+
+
+class AsyncMoveTheLast(AsyncRecordFile):
+    file_class = MoveTheLast
+
+    async def add_many(self, alumnos):
+        return await self._write("add_many", list(alumnos))
+
+    async def remove_many(self, positions):
+        return await self._write("remove_many", list(positions))
+
+    async def compact(self):
+        return await self._write("compact")
+
+
+class AsyncFreeList(AsyncRecordFile):
+    file_class = FreeList
+
+    def record_size(self):
+        return RECORD_SIZE_FREE
+
+    async def vacuum(self):
+        return await self._write("vacuum")
+
+
+def test_async_files():
+    import os
+    import time
+
+    async def main():
+        print("=== TEST: AsyncFreeList / AsyncMoveTheLast ===")
+        filename = "data_async.dat"
+        if os.path.exists(filename):
+            os.remove(filename)
+        db = await AsyncFreeList.open(filename, flush_every=0)
+        async with db:
+            positions = await asyncio.gather(*(db.add(Alumno(f"P{i:04d}", "Nombre", "Apellido", "CS", i % 10, 500))
+                                               for i in range(1000)))
+            assert sorted(positions) == list(range(1000))
+            await db.remove(positions[0])
+            start = time.perf_counter()
+            records = await asyncio.gather(*(db.read_record(pos) for pos in positions))
+            print(f"1000 lecturas concurrentes en {time.perf_counter() - start:.4f}s,",
+                  sum(record is not None for record in records), "activos")
+            assert records[0] is None and all(record is not None for record in records[1:])
+            print("Registros:", len([alumno async for alumno in db]))
+            assert len([alumno async for alumno in db]) == 999
+            by_cycle = await db.aggregate('count', 'ciclo', group_by='ciclo')
+            print("Por ciclo:", by_cycle)
+            assert sum(by_cycle.values()) == 999
+        # Las escrituras encoladas se ejecutan en orden: igual que las llamadas síncronas
+        filename = "data_async_move.dat"
+        if os.path.exists(filename):
+            os.remove(filename)
+        db = await AsyncMoveTheLast.open(filename)
+        async with db:
+            await db.add_many(Alumno(f"C{30 + i}", "Nombre", "Apellido", "CS", 5, i) for i in range(19))
+            assert await db.remove_many({6, 11, 16}) == {18: 6, 17: 11}
+            codigos = [alumno.codigo async for alumno in db]
+            assert len(codigos) == 16 and codigos[6] == "C48" and codigos[11] == "C47"
+        print("Test async completado.\n")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_async_files()
@@ -0,0 +1,172 @@
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from block_reader import scan_blocks
+import io_stats
+from P1 import Alumno, MoveTheLast, FreeList, ALUMNO_SCHEMA, HEADER_SIZE_MOVE, RECORD_SIZE_MOVE
+
+# ---------------------------------------------------------
+# Benchmarks de S1. Se ejecutan con: python benchmarks.py [nombre ...]
+# ---------------------------------------------------------
+
+
+def make_alumnos(n, offset=0):
+    return [Alumno(f"P{i + offset:04d}", f"Nombre{i % 100}", f"Apellido{i % 50}", "CS", 1 + i % 10, 500 + i)
+            for i in range(n)]
+
+
+# ---------------------------------------------------------
+# Stress de concurrency="thread": un hilo cargador inserta (y en FreeList elimina) mientras
+# N hilos lectores llaman get() sobre posiciones al azar. Se reporta el throughput de las
+# lecturas según la cantidad de hilos y al final se verifican los invariantes del archivo:
+#   - ninguna posición se asignó dos veces
+#   - el header coincide con los registros que devuelve load()
+# ---------------------------------------------------------
+def stress(cls, filename, readers, inserts=5000, preload=5000):
+    if os.path.exists(filename):
+        os.remove(filename)
+    with cls(filename, flush_every=0, concurrency="thread") as db:
+        for alumno in make_alumnos(preload):
+            db.add(alumno)
+        done = threading.Event()
+        reads = [0] * readers
+        errors = []
+        positions = []
+
+        def loader():
+            try:
+                for i, alumno in enumerate(make_alumnos(inserts, preload)):
+                    pos = db.add(alumno)
+                    if cls is FreeList:
+                        positions.append(pos)
+                        if i % 4 == 3:
+                            db.remove(positions.pop(random.randrange(len(positions))))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        def reader(k):
+            rng = random.Random(k)
+            count = 0
+            try:
+                while not done.is_set():
+                    alumno = db.get(rng.randrange(preload))
+                    if alumno is not None and not alumno.codigo.startswith("P"):
+                        raise AssertionError(f"Registro corrupto: {alumno.codigo!r}")
+                    count += 1
+            except Exception as e:
+                errors.append(e)
+            reads[k] = count
+
+        threads = [threading.Thread(target=reader, args=(k,)) for k in range(readers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        loader_thread = threading.Thread(target=loader)
+        loader_thread.start()
+        loader_thread.join()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        db.commit()
+        records = db.load()
+        live = db.readHeader() if cls is MoveTheLast else db.live
+        assert live == len(records), (live, len(records))
+        if cls is FreeList:
+            assert len(set(positions)) == len(positions), "Posición asignada dos veces"
+    os.remove(filename)
+    return sum(reads) / elapsed, inserts / elapsed
+
+
+def bench_stress(thread_counts=(1, 2, 4, 8, 16)):
+    print("=== BENCH: lecturas concurrentes con un hilo cargador ===")
+    directory = tempfile.mkdtemp()
+    for cls in (MoveTheLast, FreeList):
+        print(f"\n{cls.__name__}")
+        print(f"{'hilos':>6} {'lecturas/s':>12} {'inserciones/s':>14}")
+        for readers in thread_counts:
+            read_rate, write_rate = stress(cls, os.path.join(directory, "stress.dat"), readers)
+            print(f"{readers:>6} {read_rate:>12.0f} {write_rate:>14.0f}")
+    os.rmdir(directory)
+
+
+# ---------------------------------------------------------
+# Recorrido secuencial con block_reader.scan_blocks según el tamaño de bloque. El primer
+# tamaño (un registro por lectura) equivale al recorrido de a un read() por registro.
+# Cada medición decodifica todos los registros para que el costo sea el de un load().
+# ---------------------------------------------------------
+def bench_readahead(records=500000, block_sizes=(RECORD_SIZE_MOVE, 4096, 65536, 1 << 20, 4 << 20)):
+    print("=== BENCH: recorrido por bloques ===")
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "scan.dat")
+    with MoveTheLast(filename, flush_every=0) as db:
+        db.add_many(make_alumnos(records))
+    print(f"{'bloque':>10} {'registros/s':>14}")
+    for block_size in block_sizes:
+        start = time.perf_counter()
+        count = 0
+        with open(filename, "rb", buffering=0) as file:
+            for _, block in scan_blocks(file, HEADER_SIZE_MOVE, records, RECORD_SIZE_MOVE, block_size):
+                for _ in ALUMNO_SCHEMA.iter_unpack(block):
+                    count += 1
+        assert count == records
+        print(f"{block_size:>10} {records / (time.perf_counter() - start):>14.0f}")
+    os.remove(filename)
+    os.rmdir(directory)
+
+
+# ---------------------------------------------------------
+# I/O por operación (io_stats.profile) de una carga mixta en cada estrategia, y costo de
+# la instrumentación en get(): desactivada vs activada.
+# ---------------------------------------------------------
+def bench_io(records=20000, gets=50000):
+    print("=== BENCH: I/O por operación ===")
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "io.dat")
+    for cls in (MoveTheLast, FreeList):
+        with io_stats.profile() as profile:
+            with cls(filename, flush_every=0) as db:
+                for alumno in make_alumnos(records):
+                    db.add(alumno)
+                for pos in range(records - 1, 0, -10):
+                    db.remove(pos)
+                db.readRecord(1)
+                db.load()
+        print(f"\n{cls.__name__}")
+        print(io_stats.format_stats(profile.stats()))
+        os.remove(filename)
+
+    print(f"\n{'get()':>12} {'lecturas/s':>12}")
+    with MoveTheLast(filename, flush_every=0) as db:
+        db.add_many(make_alumnos(records))
+        positions = [random.randrange(records) for _ in range(gets)]
+        for label, enabled in (("desactivada", False), ("activada", True)):
+            io_stats.STATS.enabled = enabled
+            start = time.perf_counter()
+            for pos in positions:
+                db.get(pos)
+            print(f"{label:>12} {gets / (time.perf_counter() - start):>12.0f}")
+        io_stats.disable()
+        io_stats.reset()
+    os.remove(filename)
+    os.rmdir(directory)
+
+
+BENCHMARKS = {
+    "stress": bench_stress,
+    "readahead": bench_readahead,
+    "io": bench_io,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
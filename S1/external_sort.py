@@ -0,0 +1,204 @@
+import heapq
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from block_reader import scan_records
+from P1 import (Alumno, MoveTheLast, FreeList, FREE_SCHEMA, RECORD_SIZE_FREE, HEADER_FORMAT_FREE,
+                HEADER_FORMAT_MOVE, NEXT_DEL_OFFSET, BATCH_SIZE, TOMBSTONE)
+
+# ---------------------------------------------------------
+# Ordenamiento externo de un archivo MoveTheLast / FreeList por uno o varios campos.
+#
+# sort_file(db, output, key, memory_limit) escribe en 'output' los registros activos de db
+# ordenados por key, en el mismo formato de registro de tamaño fijo:
+#   1. Runs: se leen bloques del archivo y se juntan registros hasta llenar memory_limit;
+#      cada grupo se ordena en memoria y se escribe a un archivo temporal (un run).
+#   2. Merge: se mezclan hasta fan_in runs a la vez con heapq.merge, leyendo y escribiendo
+#      con buffers de BUFFER_SIZE bytes. Si hay más runs que fan_in se hacen varias pasadas;
+#      la última escribe directamente el archivo de salida.
+# Si todos los registros entran en un solo run se escribe la salida sin archivos temporales.
+# Los registros se comparan sin construir objetos Alumno: solo se decodifican los campos de key.
+# La salida de un MoveTheLast es un MoveTheLast (sin tombstones, con el mismo diccionario
+# si está codificado) y la de un FreeList es un FreeList sin espacios libres.
+# ---------------------------------------------------------
+MEMORY_LIMIT = 64 * 1024 * 1024  # bytes para los registros de un run
+BUFFER_SIZE = 1024 * 1024  # bytes por lectura/escritura de cada run durante el merge
+RECORD_OVERHEAD = 100  # bytes estimados por registro en memoria además de sus datos (objeto bytes, lista)
+
+
+def print_progress(phase, done, total):
+    print(f"\r{phase}: {done}/{total}", end="\n" if done >= total else "", flush=True)
+
+
+def record_format(db):
+    # (esquema, tamaño de registro, función que indica si un registro está activo, slots en el archivo)
+    if isinstance(db, FreeList):
+        return (FREE_SCHEMA, RECORD_SIZE_FREE,
+                lambda record: struct.unpack_from("i", record, NEXT_DEL_OFFSET)[0] == -2, db.slots)
+    return db.schema, db.record_size, lambda record: record[:1] != TOMBSTONE, db.readHeader()
+
+
+def make_key(db, schema, key):
+    # Función registro (bytes) -> llave de orden; en columnas codificadas se ordena por el valor
+    names = [key] if isinstance(key, str) else list(key)
+    dictionary = getattr(db, 'dictionary', None)
+    getters = []
+    for name in names:
+        if name not in schema.index:
+            raise ValueError(f"Campo desconocido: {name}")
+        getters.append((name, dictionary.values.get(name) if dictionary is not None else None))
+    if len(getters) == 1:
+        name, values = getters[0]
+        if values is None:
+            return lambda record: schema.get(record, name)
+        return lambda record: values[schema.get(record, name)]
+    return lambda record: tuple(schema.get(record, name) if values is None else values[schema.get(record, name)]
+                                for name, values in getters)
+
+
+def read_run(path, record_size, buffer_size=BUFFER_SIZE):
+    with open(path, "rb", buffering=0) as file:
+        yield from scan_records(file, 0, None, record_size, buffer_size)
+
+
+def write_run(path, records, key, reverse):
+    # Ordena en memoria los registros de un run y los escribe en path
+    records.sort(key=key, reverse=reverse)
+    with open(path, "wb", buffering=BUFFER_SIZE) as file:
+        file.write(b"".join(records))
+    return path
+
+
+def write_records(file, records, record_size, progress=None, phase="", total=0):
+    # Escribe los registros con un buffer de BUFFER_SIZE bytes; devuelve cuántos escribió
+    per_write = max(1, BUFFER_SIZE // record_size)
+    buffer = []
+    count = 0
+    for record in records:
+        buffer.append(record)
+        if len(buffer) >= per_write:
+            file.write(b"".join(buffer))
+            count += len(buffer)
+            buffer = []
+            if progress is not None:
+                progress(phase, count, total)
+    if buffer:
+        file.write(b"".join(buffer))
+        count += len(buffer)
+    if progress is not None:
+        progress(phase, count, total)
+    return count
+
+
+def write_output(db, output, records, record_size, progress, phase, total):
+    # Archivo de salida con el header de la estrategia de db
+    for suffix in (".wal", ".idx", ".dict", ".bitmap"):
+        if os.path.exists(output + suffix):
+            os.remove(output + suffix)  # sidecars de un archivo anterior con el mismo nombre
+    free = isinstance(db, FreeList)
+    header = struct.pack(HEADER_FORMAT_FREE, -1, 0, 0) if free else struct.pack(HEADER_FORMAT_MOVE, 0, 0)
+    with open(output, "wb", buffering=BUFFER_SIZE) as file:
+        file.write(header)
+        count = write_records(file, records, record_size, progress, phase, total)
+        file.seek(0)
+        file.write(struct.pack(HEADER_FORMAT_FREE, -1, count, 0) if free else struct.pack(HEADER_FORMAT_MOVE, count, 0))
+    if not free and db.dictionary is not None:
+        shutil.copyfile(db.filename + ".dict", output + ".dict")
+    return count
+
+
+def sort_file(db, output, key, memory_limit=MEMORY_LIMIT, reverse=False, progress=None):
+    # Ordena los registros activos de db (MoveTheLast / FreeList abierto) por key (campo o lista
+    # de campos) en el archivo output. progress(fase, hechos, total) se llama a medida que avanza
+    # (ej: print_progress). Devuelve {'records', 'runs', 'passes'}: passes cuenta la pasada
+    # que genera los runs más cada pasada de merge.
+    schema, record_size, is_live, slots = record_format(db)
+    extract = make_key(db, schema, key)
+    run_records = max(1, memory_limit // (record_size + RECORD_OVERHEAD))
+    fan_in = max(2, memory_limit // BUFFER_SIZE - 1)  # un buffer por run de entrada más el de salida
+    directory = tempfile.mkdtemp(prefix="sort_", dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        # 1. Runs ordenados
+        runs = []
+        buffer = []
+        read = 0
+        for _, chunk in db._iter_chunks(BATCH_SIZE):
+            for offset in range(0, len(chunk), record_size):
+                record = chunk[offset:offset + record_size]
+                if is_live(record):
+                    buffer.append(record)
+                    # El corte se revisa por registro: un run nunca pasa de run_records
+                    if len(buffer) >= run_records:
+                        runs.append(write_run(os.path.join(directory, f"run{len(runs)}"), buffer, extract, reverse))
+                        buffer = []
+            read += len(chunk) // record_size
+            if progress is not None:
+                progress("runs", read, slots)
+        if not runs:
+            # Todo entró en memoria: una sola pasada
+            buffer.sort(key=extract, reverse=reverse)
+            count = write_output(db, output, buffer, record_size, progress, "salida", len(buffer))
+            return {'records': count, 'runs': 1 if count else 0, 'passes': 1}
+        if buffer:
+            runs.append(write_run(os.path.join(directory, f"run{len(runs)}"), buffer, extract, reverse))
+            buffer = []
+        total = sum(os.path.getsize(run) for run in runs) // record_size
+        stats = {'records': total, 'runs': len(runs), 'passes': 1}
+
+        # 2. Merge por pasadas de hasta fan_in runs
+        while len(runs) > fan_in:
+            stats['passes'] += 1
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                group = runs[i:i + fan_in]
+                merged.append(os.path.join(directory, f"pass{stats['passes']}_{len(merged)}"))
+                with open(merged[-1], "wb", buffering=BUFFER_SIZE) as file:
+                    write_records(file, heapq.merge(*(read_run(run, record_size) for run in group),
+                                                    key=extract, reverse=reverse), record_size)
+                for run in group:
+                    os.remove(run)
+            runs = merged
+            if progress is not None:
+                progress(f"merge (pasada {stats['passes']})", total, total)
+        stats['passes'] += 1
+        write_output(db, output, heapq.merge(*(read_run(run, record_size) for run in runs), key=extract, reverse=reverse),
+                     record_size, progress, f"merge (pasada {stats['passes']})", total)
+        return stats
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_sort_file():
+    print("=== TEST: sort_file ===")
+    import random
+    filename, sorted_filename = "data_sort.dat", "data_sorted.dat"
+    for name in (filename, sorted_filename):
+        if os.path.exists(name):
+            os.remove(name)
+    with MoveTheLast(filename, flush_every=0, delete_mode="tombstone") as db:
+        codigos = random.sample(range(100000), 50000)
+        db.add_many(Alumno(f"{codigo:05d}", "Nombre", f"Apellido{codigo % 97}", "CS", codigo % 10, 500)
+                    for codigo in codigos)
+        db.remove_many(range(0, 50000, 10))  # los marcados no pasan a la salida
+        live = sorted((alumno.apellidos, alumno.codigo) for alumno in db.load())
+        # memory_limit chico a propósito para que haya varios runs y más de una pasada de merge
+        stats = sort_file(db, sorted_filename, ['apellidos', 'codigo'], memory_limit=2 * 1024 * 1024,
+                          progress=print_progress)
+    print(stats)
+    assert stats['records'] == len(live) == 45000
+    assert stats['runs'] > 1 and stats['passes'] > 1
+    with MoveTheLast(sorted_filename) as db:
+        records = db.load()
+        print("Ordenado:", all((a.apellidos, a.codigo) <= (b.apellidos, b.codigo) for a, b in zip(records, records[1:])))
+        for alumno in records[:3]:
+            alumno.print()
+        assert [(alumno.apellidos, alumno.codigo) for alumno in records] == live
+    print("Test sort_file completado.\n")
+
+
+if __name__ == "__main__":
+    test_sort_file()
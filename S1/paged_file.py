@@ -0,0 +1,301 @@
+import struct
+import os
+import sys
+import zlib
+import heapq
+from collections import OrderedDict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from block_reader import scan_blocks
+from io_stats import operation, tracked_open
+from P1 import Alumno, AlumnoView, ALUMNO_SCHEMA, RECORD_SIZE_MOVE, alumno_values, read_at, write_at
+
+# ---------------------------------------------------------
+# Archivo de alumnos organizado en páginas de 4 KiB (slotted pages).
+#
+# Página 0: header del archivo (magic, tamaño de página, cantidad de páginas de datos, modo).
+# Páginas de datos (la página p está en el offset (p + 1) * PAGE_SIZE):
+#   [header de página][directorio de slots ->      <- registros]
+#   - header: cantidad de slots del directorio, registros activos, bytes libres, crc32
+#   - directorio: una entrada 'h' por slot con el índice del área donde está el registro
+#     (-1 = slot vacío). Las áreas de registro se llenan desde el final de la página.
+# Un registro se direcciona por (página, slot). Como el directorio separa el slot del área
+# física, los registros se pueden mover dentro de la página sin cambiar su dirección.
+#
+# Modos de eliminación dentro de la página:
+#   - "move": el registro del último área ocupa el área eliminada (como MoveTheLast),
+#     las áreas quedan siempre compactas.
+#   - "free": solo se libera el slot y su área (como FreeList), sin mover datos.
+#
+# Cada página lleva un crc32 que se verifica al leerla, se mantiene una caché LRU de páginas
+# y los recorridos leen varias páginas completas por llamada.
+# Para compatibilidad con la API por posición: pos = página * SLOTS_PER_PAGE + slot.
+# ---------------------------------------------------------
+PAGE_SIZE = 4096
+FILE_HEADER_FORMAT = '4siii'  # magic, tamaño de página, páginas de datos, modo (0 = move, 1 = free)
+MAGIC = b'PGAL'
+PAGE_HEADER_FORMAT = '=HHHI'  # slots en el directorio, registros activos, bytes libres, crc32
+PAGE_HEADER_SIZE = struct.calcsize(PAGE_HEADER_FORMAT)
+SLOT_FORMAT = '=h'
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+SLOTS_PER_PAGE = (PAGE_SIZE - PAGE_HEADER_SIZE) // (RECORD_SIZE_MOVE + SLOT_SIZE)
+DELETE_MODES = {"move": 0, "free": 1}
+PAGES_PER_READ = 64  # páginas leídas por llamada en los recorridos
+
+
+def area_offset(area):
+    # Las áreas de registro se ubican desde el final de la página hacia el inicio
+    return PAGE_SIZE - (area + 1) * RECORD_SIZE_MOVE
+
+
+class Page:
+    def __init__(self, data=None):
+        if data is None:
+            self.directory = []
+            self.data = bytearray(PAGE_SIZE)
+        else:
+            n_slots = struct.unpack_from(PAGE_HEADER_FORMAT, data)[0]
+            self.directory = list(struct.unpack_from('=%dh' % n_slots, data, PAGE_HEADER_SIZE))
+            self.data = bytearray(data)
+        self.live = sum(1 for area in self.directory if area != -1)
+
+    @staticmethod
+    def verify(data, page_number):
+        n_slots, live, free, crc = struct.unpack_from(PAGE_HEADER_FORMAT, data)
+        if zlib.crc32(memoryview(data)[PAGE_HEADER_SIZE:]) != crc:
+            raise IOError(f"Checksum inválido en la página {page_number}")
+
+    def free_space(self):
+        return PAGE_SIZE - PAGE_HEADER_SIZE - len(self.directory) * SLOT_SIZE - self.live * RECORD_SIZE_MOVE
+
+    def is_full(self):
+        return self.live >= SLOTS_PER_PAGE
+
+    def to_bytes(self):
+        struct.pack_into('=%dh' % len(self.directory), self.data, PAGE_HEADER_SIZE, *self.directory)
+        crc = zlib.crc32(memoryview(self.data)[PAGE_HEADER_SIZE:])
+        struct.pack_into(PAGE_HEADER_FORMAT, self.data, 0, len(self.directory), self.live, self.free_space(), crc)
+        return bytes(self.data)
+
+    def read(self, slot):
+        if slot < 0 or slot >= len(self.directory) or self.directory[slot] == -1:
+            return None
+        offset = area_offset(self.directory[slot])
+        return self.data[offset:offset + RECORD_SIZE_MOVE]
+
+    def records(self):
+        # Registros activos de la página en orden de slot
+        for area in self.directory:
+            if area != -1:
+                offset = area_offset(area)
+                yield self.data[offset:offset + RECORD_SIZE_MOVE]
+
+    def insert(self, record, mode):
+        if mode == "move":
+            area = self.live  # las áreas están compactas: la siguiente libre es la última
+        else:
+            used = set(self.directory)
+            area = next(area for area in range(SLOTS_PER_PAGE) if area not in used)
+        offset = area_offset(area)
+        self.data[offset:offset + RECORD_SIZE_MOVE] = record
+        if -1 in self.directory:
+            slot = self.directory.index(-1)
+            self.directory[slot] = area
+        else:
+            slot = len(self.directory)
+            self.directory.append(area)
+        self.live += 1
+        return slot
+
+    def delete(self, slot, mode):
+        area = self.directory[slot]
+        self.directory[slot] = -1
+        self.live -= 1
+        if mode == "move" and area != self.live:
+            # El registro del último área pasa al área liberada; solo cambia su entrada del directorio
+            last = self.directory.index(self.live)
+            self.data[area_offset(area):area_offset(area) + RECORD_SIZE_MOVE] = self.read(last)
+            self.directory[last] = area
+        # Los slots vacíos al final del directorio se descartan
+        while self.directory and self.directory[-1] == -1:
+            self.directory.pop()
+
+
+class PagedFile:
+    def __init__(self, filename, delete_mode="move", cache_pages=64):
+        self.filename = filename
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
+            self.initialize_file(delete_mode)
+        self.file = tracked_open(self.filename, "rb+", buffering=0)
+        magic, page_size, self.num_pages, mode = struct.unpack_from(FILE_HEADER_FORMAT, read_at(self.file, 0, PAGE_SIZE))
+        if magic != MAGIC or page_size != PAGE_SIZE:
+            raise IOError(f"{self.filename} no es un archivo paginado")
+        self.delete_mode = "move" if mode == 0 else "free"
+        self.cache = OrderedDict()  # página -> Page (LRU)
+        self.cache_pages = cache_pages
+        # Mapa de espacio libre: registros activos por página y un heap de páginas con espacio
+        self.live = []
+        for _, page_number, data in self._iter_pages():
+            self.live.append(struct.unpack_from(PAGE_HEADER_FORMAT, data)[1])
+        self.with_space = [p for p, live in enumerate(self.live) if live < SLOTS_PER_PAGE]
+        heapq.heapify(self.with_space)
+
+    def initialize_file(self, delete_mode):
+        with tracked_open(self.filename, "wb") as file:
+            header = struct.pack(FILE_HEADER_FORMAT, MAGIC, PAGE_SIZE, 0, DELETE_MODES[delete_mode])
+            file.write(header.ljust(PAGE_SIZE, b'\x00'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def _iter_pages(self, first=0, pages_per_read=PAGES_PER_READ):
+        # Lee páginas completas de a varias por llamada: (índice en el bloque, página, bytes)
+        for start, block in scan_blocks(self.file, (first + 1) * PAGE_SIZE, self.num_pages - first,
+                                        PAGE_SIZE, pages_per_read * PAGE_SIZE):
+            for i in range(len(block) // PAGE_SIZE):
+                data = memoryview(block)[i * PAGE_SIZE:(i + 1) * PAGE_SIZE]
+                Page.verify(data, first + start + i)
+                yield i, first + start + i, data
+
+    def read_page(self, page_number):
+        page = self.cache.get(page_number)
+        if page is not None:
+            self.cache.move_to_end(page_number)
+            return page
+        data = read_at(self.file, (page_number + 1) * PAGE_SIZE, PAGE_SIZE)
+        Page.verify(data, page_number)
+        page = Page(data)
+        self._cache_page(page_number, page)
+        return page
+
+    def write_page(self, page_number, page):
+        write_at(self.file, (page_number + 1) * PAGE_SIZE, page.to_bytes())
+        self.live[page_number] = page.live
+        self._cache_page(page_number, page)
+
+    def _cache_page(self, page_number, page):
+        self.cache[page_number] = page
+        self.cache.move_to_end(page_number)
+        if len(self.cache) > self.cache_pages:
+            self.cache.popitem(last=False)
+
+    def _new_page(self):
+        page_number = self.num_pages
+        self.num_pages += 1
+        self.live.append(0)
+        write_at(self.file, 0, struct.pack(FILE_HEADER_FORMAT, MAGIC, PAGE_SIZE, self.num_pages, DELETE_MODES[self.delete_mode]))
+        heapq.heappush(self.with_space, page_number)
+        return page_number, Page()
+
+    @operation()
+    def insert(self, alumno: Alumno):
+        # Inserta en la página con espacio de menor número; devuelve (página, slot)
+        while self.with_space and self.live[self.with_space[0]] >= SLOTS_PER_PAGE:
+            heapq.heappop(self.with_space)
+        if self.with_space:
+            page_number = self.with_space[0]
+            page = self.read_page(page_number)
+        else:
+            page_number, page = self._new_page()
+        slot = page.insert(ALUMNO_SCHEMA.pack(*alumno_values(alumno)), self.delete_mode)
+        self.write_page(page_number, page)
+        return page_number, slot
+
+    @operation()
+    def read(self, page_number, slot):
+        if page_number < 0 or page_number >= self.num_pages:
+            return None
+        record = self.read_page(page_number).read(slot)
+        return AlumnoView(bytes(record)) if record else None
+
+    @operation()
+    def delete(self, page_number, slot):
+        if page_number < 0 or page_number >= self.num_pages:
+            return False
+        page = self.read_page(page_number)
+        if page.read(slot) is None:
+            return False
+        was_full = page.is_full()
+        page.delete(slot, self.delete_mode)
+        self.write_page(page_number, page)
+        if was_full:
+            heapq.heappush(self.with_space, page_number)
+        return True
+
+    def iter_records(self, pages_per_read=PAGES_PER_READ):
+        for _, page_number, data in self._iter_pages(0, pages_per_read):
+            for record in Page(data).records():
+                yield Alumno(*ALUMNO_SCHEMA.unpack(record))
+
+    @operation()
+    def load(self):
+        return list(self.iter_records())
+
+    # -----------------------------------------------------
+    # Compatibilidad con la API por posición de MoveTheLast / FreeList
+    # -----------------------------------------------------
+    @staticmethod
+    def address(pos):
+        return divmod(pos, SLOTS_PER_PAGE)
+
+    @staticmethod
+    def position(page_number, slot):
+        return page_number * SLOTS_PER_PAGE + slot
+
+    def add(self, alumno: Alumno):
+        return self.position(*self.insert(alumno))
+
+    def readRecord(self, pos: int):
+        alumno = self.read(*self.address(pos))
+        if alumno is None:
+            print("Record not found")
+            return None
+        alumno.print()
+        return alumno
+
+    def remove(self, pos: int):
+        if not self.delete(*self.address(pos)):
+            print("No record in position:", pos)
+
+
+def test_paged_file():
+    print("=== TEST: PagedFile ===")
+    filename = "data_paged.dat"
+    if os.path.exists(filename):
+        os.remove(filename)
+    with PagedFile(filename) as db:
+        a = Alumno("P-123", "Eduardo", "Aragon", "CS", 5, 500)
+        b = Alumno("P-124", "Jorge", "Quenta", "DS", 5, 2000)
+        c = Alumno("P-125", "Jose", "Quenta", "DS", 5, 2000)
+        positions = [db.add(a), db.add(b), db.add(c)]
+        print("Posiciones:", positions, "direcciones:", [db.address(pos) for pos in positions])
+        assert positions == [0, 1, 2]
+        db.remove(positions[0])
+        print("Después de eliminar", db.address(positions[0]))
+        assert db.read(*db.address(positions[0])) is None
+        for alumno in db.load():
+            alumno.print()
+        assert [alumno.codigo for alumno in db.load()] == ["P-124", "P-125"]
+        # C conserva su dirección aunque se movió dentro de la página
+        assert db.readRecord(positions[2]).codigo == "P-125"
+        # Más de una página: las direcciones no cambian al eliminar en otra página
+        more = [db.add(Alumno(f"Q{i}", "Nombre", "Apellido", "CS", 1, i)) for i in range(SLOTS_PER_PAGE)]
+        assert db.num_pages == 2
+        db.remove(more[0])
+        assert db.read(*db.address(more[-1])).codigo == f"Q{SLOTS_PER_PAGE - 1}"
+    # Al reabrir se verifican las páginas (crc) y se reconstruye el mapa de espacio libre
+    with PagedFile(filename) as db:
+        assert len(db.load()) == SLOTS_PER_PAGE + 1
+        assert db.add(Alumno("P-126", "Maria", "Quenta", "CS", 5, 2000)) in (positions[0], more[0])
+    print("Test PagedFile completado.\n")
+
+
+if __name__ == "__main__":
+    test_paged_file()
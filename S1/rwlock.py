@@ -0,0 +1,211 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:  # fcntl solo existe en sistemas POSIX: sin él no hay modo "process"
+    fcntl = None
+
+# ---------------------------------------------------------
+# Locks de lectura/escritura para MoveTheLast / FreeList (parámetro concurrency).
+#   - None: sin lock (NoLock), el comportamiento de siempre.
+#   - "thread": RWLock entre hilos; las lecturas corren en paralelo y las modificaciones
+#     son exclusivas. El escritor es reentrante (remove() -> vacuum()) y puede leer.
+#   - "process": además un lock advisory de fcntl sobre la región del header, compartido
+#     para lecturas y exclusivo para escrituras. Al tomarlo se recarga el header
+#     cacheado (otro proceso pudo cambiarlo) y antes de soltar una escritura se publica.
+# Se da preferencia a los escritores: una lectura nueva espera si hay un escritor esperando.
+# ---------------------------------------------------------
+CONCURRENCY_MODES = (None, "thread", "process")
+
+
+class NoLock:
+    def read(self):
+        return nullcontext()
+
+    def write(self):
+        return nullcontext()
+
+
+class RWLock:
+    def __init__(self):
+        self.cond = threading.Condition()  # usa un RLock: los hooks pueden volver a escribir
+        self.readers = 0
+        self.writer = None  # hilo que tiene el lock exclusivo
+        self.depth = 0  # reentradas del escritor
+        self.waiting = 0  # escritores esperando
+        self.local = threading.local()  # lecturas anidadas del hilo actual
+
+    # Hooks para el lock entre procesos; se llaman con self.cond tomado
+    def acquire_shared(self):
+        pass
+
+    def release_shared(self):
+        pass
+
+    def acquire_exclusive(self):
+        pass
+
+    def release_exclusive(self):
+        pass
+
+    @contextmanager
+    def read(self):
+        held = getattr(self.local, 'reads', 0)
+        if held or self.writer == threading.get_ident():
+            # Lectura anidada o dentro de una escritura del mismo hilo: no se espera
+            self.local.reads = held + 1
+            try:
+                yield
+            finally:
+                self.local.reads -= 1
+            return
+        with self.cond:
+            while self.writer is not None or self.waiting:
+                self.cond.wait()
+            self.readers += 1
+            if self.readers == 1:
+                self.acquire_shared()
+        self.local.reads = 1
+        try:
+            yield
+        finally:
+            self.local.reads = 0
+            with self.cond:
+                self.readers -= 1
+                if self.readers == 0:
+                    self.release_shared()
+                    self.cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self.cond:
+            if self.writer == me:
+                self.depth += 1
+            else:
+                if getattr(self.local, 'reads', 0):
+                    raise RuntimeError("No se puede pasar de un lock de lectura a uno de escritura")
+                self.waiting += 1
+                while self.writer is not None or self.readers:
+                    self.cond.wait()
+                self.waiting -= 1
+                self.writer = me
+                self.depth = 1
+                self.acquire_exclusive()
+        try:
+            yield
+        finally:
+            with self.cond:
+                if self.depth == 1:
+                    self.release_exclusive()
+                    self.writer = None
+                    self.cond.notify_all()
+                self.depth -= 1
+
+
+class ProcessRWLock(RWLock):
+    def __init__(self, file, length, reload, publish):
+        if fcntl is None:
+            raise ValueError('concurrency="process" requiere fcntl (POSIX)')
+        super().__init__()
+        self.file = file
+        self.length = length  # bytes del header: la región que se bloquea
+        self.reload = reload  # recarga el header cacheado desde el archivo
+        self.publish = publish  # escribe el header cacheado (y confirma el WAL) antes de soltar
+
+    def acquire_shared(self):
+        fcntl.lockf(self.file, fcntl.LOCK_SH, self.length, 0)
+        self.reload()
+
+    def release_shared(self):
+        fcntl.lockf(self.file, fcntl.LOCK_UN, self.length, 0)
+
+    def acquire_exclusive(self):
+        fcntl.lockf(self.file, fcntl.LOCK_EX, self.length, 0)
+        self.reload()
+
+    def release_exclusive(self):
+        if not self.file.closed:
+            self.publish()
+            fcntl.lockf(self.file, fcntl.LOCK_UN, self.length, 0)
+
+
+def make_lock(concurrency, file, length, reload, publish):
+    if concurrency not in CONCURRENCY_MODES:
+        raise ValueError(f"concurrency debe ser uno de {CONCURRENCY_MODES}")
+    if concurrency is None:
+        return NoLock()
+    if concurrency == "thread":
+        return RWLock()
+    return ProcessRWLock(file, length, reload, publish)
+
+
+def shared(method):
+    # Decorador: el método corre con el lock de lectura del objeto
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def exclusive(method):
+    # Decorador: el método corre con el lock de escritura del objeto
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def test_rwlock():
+    print("=== TEST: RWLock ===")
+    lock = RWLock()
+    # Dos lectores dentro del lock a la vez: la barrera solo se pasa si no se excluyen
+    barrier = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.read():
+            barrier.wait()
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    assert not barrier.broken
+    # Escritores exclusivos: ningún incremento se pierde
+    counter = [0]
+
+    def writer():
+        for _ in range(200):
+            with lock.write():
+                value = counter[0]
+                time.sleep(0)  # cede el GIL en medio de la escritura
+                counter[0] = value + 1
+
+    writers = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    assert counter[0] == 800
+    # El escritor es reentrante y puede leer; una lectura no puede pasar a escritura
+    with lock.write():
+        with lock.write(), lock.read():
+            pass
+    with lock.read():
+        try:
+            with lock.write():
+                pass
+            assert False, "la lectura pasó a escritura"
+        except RuntimeError:
+            pass
+    print("Test RWLock completado.\n")
+
+
+if __name__ == "__main__":
+    test_rwlock()
@@ -0,0 +1,254 @@
+import struct
+import os
+import sys
+import threading
+import time
+import zlib
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from io_stats import tracked_open
+
+# ---------------------------------------------------------
+# Write-ahead log con group commit para MoveTheLast / FreeList (archivo filename + ".wal").
+#
+# En modo WAL las escrituras de cada operación (registro movido, slot, header, ...) no van
+# directo al archivo de datos: se acumulan en memoria y se confirman por grupos.
+# Confirmar un grupo = añadir al log un bloque con todas sus escrituras y hacer UN fsync;
+# recién después se aplican al archivo de datos (sin fsync). Si el proceso se cae:
+#   - los grupos confirmados están en el log y se vuelven a aplicar al abrir (replay)
+#   - un grupo que no llegó a confirmarse no tocó el archivo de datos
+# Así remove()/add() no dejan el archivo a medio escribir y el costo del fsync se reparte
+# entre todas las operaciones del grupo.
+#
+# Formato del log: grupos [longitud, crc32][entradas...], cada entrada [offset, tamaño][bytes].
+# Una entrada con offset TRUNCATE trunca el archivo de datos a 'tamaño' bytes.
+# El log se vacía (checkpoint) cuando supera checkpoint_bytes y al cerrar.
+#
+# Un grupo se confirma al llegar a group_size operaciones o, con on_interval, a más tardar
+# group_interval segundos después de su primera escritura: un Timer llama a on_interval
+# (el commit() del dueño, que toma su lock exclusivo y por eso confirma entre operaciones).
+# Sin on_interval (o con group_interval=None) el intervalo solo se revisa al terminar cada
+# operación y una escritura aislada queda pendiente hasta el siguiente commit().
+# ---------------------------------------------------------
+WAL_SUFFIX = ".wal"
+GROUP_FORMAT = '=II'  # longitud del grupo, crc32 del grupo
+GROUP_HEADER_SIZE = struct.calcsize(GROUP_FORMAT)
+ENTRY_FORMAT = '=qq'  # offset en el archivo de datos, tamaño
+ENTRY_SIZE = struct.calcsize(ENTRY_FORMAT)
+TRUNCATE = -1
+GROUP_SIZE = 1000  # operaciones por grupo
+GROUP_INTERVAL = 0.05  # segundos máximos que una operación espera su grupo (con on_interval)
+CHECKPOINT_BYTES = 16 * 1024 * 1024
+
+
+def apply_entry(data_file, write, offset, data):
+    # En las entradas TRUNCATE 'data' es el tamaño nuevo del archivo
+    if offset == TRUNCATE:
+        data_file.truncate(data)
+    else:
+        write(data_file, offset, data)
+
+
+def replay(data_filename):
+    # Vuelve a aplicar los grupos confirmados de un log que quedó sin checkpoint.
+    # Un grupo incompleto o con crc inválido (caída durante la escritura) se descarta.
+    # Devuelve la cantidad de grupos aplicados.
+    log_filename = data_filename + WAL_SUFFIX
+    if not os.path.exists(log_filename):
+        return 0
+    with tracked_open(log_filename, "rb") as log:
+        content = log.read()
+    groups = 0
+    if content and os.path.exists(data_filename):
+        with tracked_open(data_filename, "rb+") as data_file:
+            pos = 0
+            while pos + GROUP_HEADER_SIZE <= len(content):
+                length, crc = struct.unpack_from(GROUP_FORMAT, content, pos)
+                group = content[pos + GROUP_HEADER_SIZE:pos + GROUP_HEADER_SIZE + length]
+                if len(group) < length or zlib.crc32(group) != crc:
+                    break
+                for offset, data in iter_entries(group):
+                    apply_entry(data_file, write_seek, offset, data)
+                pos += GROUP_HEADER_SIZE + length
+                groups += 1
+            data_file.flush()
+            os.fsync(data_file.fileno())
+    os.remove(log_filename)
+    return groups
+
+
+def iter_entries(group):
+    pos = 0
+    while pos < len(group):
+        offset, size = struct.unpack_from(ENTRY_FORMAT, group, pos)
+        pos += ENTRY_SIZE
+        if offset == TRUNCATE:
+            yield offset, size
+        else:
+            yield offset, group[pos:pos + size]
+            pos += size
+
+
+def write_seek(file, offset, data):
+    file.seek(offset)
+    file.write(data)
+
+
+class WriteAheadLog:
+    def __init__(self, data_filename, data_file, write, group_size=GROUP_SIZE,
+                 group_interval=GROUP_INTERVAL, checkpoint_bytes=CHECKPOINT_BYTES, on_interval=None):
+        self.filename = data_filename + WAL_SUFFIX
+        self.data_file = data_file
+        self.write = write  # write(file, offset, data) del dueño (escritura posicionada)
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.checkpoint_bytes = checkpoint_bytes
+        self.on_interval = on_interval if group_interval is not None else None
+        self.timer = None  # confirma el grupo actual al vencer group_interval
+        self.file = tracked_open(self.filename, "ab", buffering=0)
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.pending = []  # (offset, bytes) del grupo actual, en orden
+        self.operations = 0  # operaciones completas en el grupo actual
+        self.started = None  # instante de la primera escritura del grupo actual
+        self.commits = 0
+
+    def start_group(self):
+        self.started = time.monotonic()
+        if self.on_interval is not None:
+            self.timer = threading.Timer(self.group_interval, self.interval_elapsed)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def interval_elapsed(self):
+        # Hilo del Timer: el dueño confirma el grupo con su lock tomado
+        if not self.file.closed and self.pending:
+            self.on_interval()
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def log(self, offset, data):
+        if self.started is None:
+            self.start_group()
+        self.pending.append((offset, bytes(data)))
+
+    def log_truncate(self, size):
+        if self.started is None:
+            self.start_group()
+        self.pending.append((TRUNCATE, size))
+
+    def end_operation(self):
+        # Llamado al terminar cada operación; indica si hay que confirmar el grupo
+        self.operations += 1
+        if self.started is None:
+            return False
+        return (self.operations >= self.group_size or
+                (self.group_interval is not None and time.monotonic() - self.started >= self.group_interval))
+
+    def overlay(self, offset, size, data):
+        # Aplica sobre lo leído del archivo las escrituras del grupo aún no confirmadas
+        end = offset + size
+        hits = [(start, chunk) for start, chunk in self.pending
+                if start != TRUNCATE and start < end and start + len(chunk) > offset]
+        if not hits:
+            return data
+        buffer = bytearray(data)
+        limit = max(min(start + len(chunk), end) - offset for start, chunk in hits)
+        if limit > len(buffer):
+            buffer.extend(bytes(limit - len(buffer)))
+        for start, chunk in hits:
+            lo, hi = max(start, offset), min(start + len(chunk), end)
+            buffer[lo - offset:hi - offset] = chunk[lo - start:hi - start]
+        return bytes(buffer)
+
+    def commit(self):
+        if not self.pending:
+            return
+        self.cancel_timer()
+        group = b"".join(struct.pack(ENTRY_FORMAT, TRUNCATE, data) if offset == TRUNCATE
+                         else struct.pack(ENTRY_FORMAT, offset, len(data)) + data
+                         for offset, data in self.pending)
+        self.file.write(struct.pack(GROUP_FORMAT, len(group), zlib.crc32(group)) + group)
+        os.fsync(self.file.fileno())
+        # El grupo ya es durable: recién ahora se toca el archivo de datos
+        for offset, data in self.pending:
+            apply_entry(self.data_file, self.write, offset, data)
+        self.size += GROUP_HEADER_SIZE + len(group)
+        self.pending = []
+        self.operations = 0
+        self.started = None
+        self.commits += 1
+        if self.size >= self.checkpoint_bytes:
+            self.checkpoint()
+
+    def checkpoint(self):
+        # Con el archivo de datos en disco el log ya no hace falta
+        self.commit()
+        os.fsync(self.data_file.fileno())
+        self.file.truncate(0)
+        self.size = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.checkpoint()
+            self.cancel_timer()
+            self.file.close()
+            os.remove(self.filename)
+
+
+def test_wal_replay():
+    print("=== TEST: WAL replay ===")
+    filename = "data_wal.dat"
+    for name in (filename, filename + WAL_SUFFIX):
+        if os.path.exists(name):
+            os.remove(name)
+    with open(filename, "wb") as f:
+        f.write(bytes(16))
+    data_file = open(filename, "rb+", buffering=0)
+    wal = WriteAheadLog(filename, data_file, write_seek, group_interval=None)
+    wal.log(0, b"AAAA")
+    wal.log(8, b"BBBB")
+    wal.end_operation()
+    wal.commit()  # grupo confirmado: en el log (con fsync) y aplicado
+    wal.log(4, b"CCCC")  # grupo sin confirmar: se pierde con la caída
+    # Caída: sin checkpoint el log queda en disco; el archivo de datos se "pierde"
+    wal.file.close()
+    data_file.close()
+    with open(filename, "wb") as f:
+        f.write(bytes(16))
+    # Un grupo a medio escribir al final del log se descarta
+    with open(filename + WAL_SUFFIX, "ab") as log:
+        log.write(struct.pack(GROUP_FORMAT, 100, 0) + b"xx")
+    assert replay(filename) == 1
+    with open(filename, "rb") as f:
+        assert f.read() == b"AAAA" + bytes(4) + b"BBBB" + bytes(4)
+    assert not os.path.exists(filename + WAL_SUFFIX)
+    print("Test WAL replay completado.\n")
+
+
+def test_group_interval():
+    print("=== TEST: WAL group_interval ===")
+    filename = "data_wal.dat"
+    for name in (filename, filename + WAL_SUFFIX):
+        if os.path.exists(name):
+            os.remove(name)
+    with open(filename, "wb") as f:
+        f.write(bytes(8))
+    with open(filename, "rb+", buffering=0) as data_file:
+        wal = WriteAheadLog(filename, data_file, write_seek, group_interval=0.02,
+                            on_interval=lambda: wal.commit())
+        wal.log(0, b"AAAA")
+        assert not wal.end_operation()  # una sola operación: no se confirma al terminar
+        time.sleep(0.3)  # sin más operaciones, el Timer confirma el grupo
+        assert wal.commits == 1 and not wal.pending
+        wal.close()
+    with open(filename, "rb") as f:
+        assert f.read(4) == b"AAAA"
+    print("Test WAL group_interval completado.\n")
+
+
+if __name__ == "__main__":
+    test_wal_replay()
+    test_group_interval()
@@ -1,3 +1,12 @@
+import struct
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Seq_file_pack_unpack import VENTAS_FORMAT, pack_sale, unpack_sale
+from io_stats import operation, tracked_open
+from block_reader import scan_blocks
+
 AVL_NODE_FORMAT = "=i30sif10siii"
 AVL_NODE_SIZE = struct.calcsize(AVL_NODE_FORMAT)
 AVL_HEADER_SIZE = 4
@@ -27,21 +36,21 @@ class AVLFile:
   def __init__(self, filename="sales_avl.dat"):
         self.filename = filename
         if not os.path.exists(self.filename) or os.path.getsize(self.filename) < AVL_HEADER_SIZE:
-            with open(self.filename, "wb") as f:
+            with tracked_open(self.filename, "wb") as f:
                 f.write(struct.pack("i", -1))
 
   def _read_root(self):
-    with open(self.filename, "rb") as f:
+    with tracked_open(self.filename, "rb") as f:
       f.seek(0)
       return struct.unpack("i", f.read(AVL_HEADER_SIZE))[0]
 
   def _write_root(self, root_index):
-    with open(self.filename, "rb+") as f:
+    with tracked_open(self.filename, "rb+") as f:
       f.seek(0)
       f.write(struct.pack("i", root_index))
 
   def _read_node(self,index):
-    with open(self.filename, "rb") as f:
+    with tracked_open(self.filename, "rb") as f:
       pos = AVL_HEADER_SIZE + index* AVL_NODE_SIZE
       f.seek(pos)
       data = f.read(AVL_NODE_SIZE)
@@ -50,33 +59,32 @@ class AVLFile:
       return AVLNode.unpack(data)
 
   def _write_node(self, index, node):
-    with open(self.filename, "rb+") as f:
+    with tracked_open(self.filename, "rb+") as f:
       pos = AVL_HEADER_SIZE + index * AVL_NODE_SIZE
       f.seek(pos)
       f.write(node.pack())
 
   def _append_node(self, node):
-        with open(self.filename, "ab") as f:
+        with tracked_open(self.filename, "ab") as f:
             f.write(node.pack())
         size = os.path.getsize(self.filename)
         new_index = (size - AVL_HEADER_SIZE) // AVL_NODE_SIZE
         return new_index
 
+  @operation()
   def load_tree(self):
+        # Raíz y nodos con un solo open; los nodos se leen por bloques, no un read() por nodo
         nodes = []
-        root_index = self._read_root()
-        with open(self.filename, "rb") as f:
-            f.seek(AVL_HEADER_SIZE)
-            while True:
-                data = f.read(AVL_NODE_SIZE)
-                if not data or len(data) < AVL_NODE_SIZE:
-                    break
-                node = AVLNode.unpack(data)
-                nodes.append(node)
+        with tracked_open(self.filename, "rb") as f:
+            root_index = struct.unpack("i", f.read(AVL_HEADER_SIZE))[0]
+            for _, block in scan_blocks(f, AVL_HEADER_SIZE, None, AVL_NODE_SIZE):
+                for start in range(0, len(block), AVL_NODE_SIZE):
+                    nodes.append(AVLNode.unpack(block[start:start + AVL_NODE_SIZE]))
         return root_index, nodes
 
+  @operation()
   def rebuild_file(self, root_index, nodes):
-    with open(self.filename, "wb") as f:
+    with tracked_open(self.filename, "wb") as f:
       f.write(struct.pack("i", root_index))
       for node in nodes:
         f.write(node.pack())
@@ -143,6 +151,7 @@ class AVLFile:
         return self._left_rotate(idx, nodes)
     return idx
 
+  @operation()
   def insert(self, sale):
         root, nodes = self.load_tree()
         if root == -1:
@@ -163,6 +172,7 @@ class AVLFile:
     else:
       return self._search(nodes[idx].right, sale_id, nodes)
 
+  @operation()
   def search(self, sale_id):
     root, nodes = self.load_tree()
     return self._search(root, sale_id, nodes)
@@ -174,6 +184,7 @@ class AVLFile:
     result.append(nodes[idx].sale)
     self._inorder(nodes[idx].right, nodes, result)
 
+  @operation()
   def rangeSearch(self, init_id, end_id):
     root, nodes = self.load_tree()
     result = []
@@ -222,6 +233,7 @@ class AVLFile:
       return self._left_rotate(idx, nodes)
     return idx
 
+  @operation()
   def remove(self, sale_id):
     root, nodes = self.load_tree()
     new_root = self._delete(root, sale_id, nodes)
@@ -2,36 +2,33 @@
 import seaborn as sns
 import struct
 import os
+import sys
 import time
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from record_schema import Schema
 
-VENTAS_FORMAT = "=i30sif10s"
-VENTAS_SIZE = struct.calcsize(VENTAS_FORMAT)
 
-def pack_sale(sale):
+SALE_SCHEMA = Schema([("id", "i"), ("product", "30s"), ("qty", "i"), ("price", "f"), ("date", "10s")], byteorder="=")
+VENTAS_FORMAT = SALE_SCHEMA.format
+VENTAS_SIZE = SALE_SCHEMA.size
 
-    product_bytes = sale["product"].ljust(30)[:30].encode("utf-8")
-    date_bytes = sale["date"].ljust(10)[:10].encode("utf-8")
-    return struct.pack(VENTAS_FORMAT, sale["id"], product_bytes, sale["qty"], sale["price"], date_bytes)
+def pack_sale(sale):
+    return SALE_SCHEMA.pack_dict(sale)
 
 def unpack_sale(data):
-
-    id_val, product_bytes, qty, price, date_bytes = struct.unpack(VENTAS_FORMAT, data)
-    return {
-        "id": id_val,
-        "product": product_bytes.decode("utf-8").rstrip("\x00").strip(),
-        "qty": qty,
-        "price": price,
-        "date": date_bytes.decode("utf-8").strip()
-    }
+    return SALE_SCHEMA.unpack_dict(data)
 
 ##########################################
 ### Implementación del Sequential File ###
 ##########################################
 
-FORMAT = 'i30sif10sii' # id = int, nombre = 30, cantidad = int, precio = float, fecha = 10, next = int, archive = int
-RECORD_SIZE = struct.calcsize(FORMAT)
+VENTA_SCHEMA = Schema([('id', 'i'), ('nombre', '30s'), ('cantidad', 'i'), ('precio', 'f'),
+                       ('fecha', '10s'), ('next', 'i'), ('archive', 'i')])
+FORMAT = VENTA_SCHEMA.format # id = int, nombre = 30, cantidad = int, precio = float, fecha = 10, next = int, archive = int
+RECORD_SIZE = VENTA_SCHEMA.size
+
 HEADER_SIZE = struct.calcsize("ii")
 
 class Venta:
@@ -48,15 +45,20 @@ class Venta:
         print(self.id, self.nombre, self.cantidad, self.precio, self.fecha, self.next, self.archive)
     
     def pack(self):
-        return struct.pack(FORMAT, self.id, self.nombre.encode(), self.cantidad, self.precio, self.fecha.encode(), self.next, self.archive)
+        return VENTA_SCHEMA.pack(self.id, self.nombre, self.cantidad, self.precio, self.fecha, self.next, self.archive)
+
+class VentaView(VENTA_SCHEMA.view("VentaRecord")):
+    # Vista perezosa de un registro leído: solo se decodifican los campos que se usan
+    # (la búsqueda binaria solo mira id) y pack() reescribe el registro modificado.
+    __slots__ = ()
+    print = Venta.print
 
-def readRecordFromFile(filename:str, pointer:int) -> Venta:
+def readRecordFromFile(filename:str, pointer:int) -> VentaView:
     with open(filename, "rb") as file:
         file.seek(pointer)
         record = file.read(RECORD_SIZE)
         assert(record)
-        id, nombre, cantidad, precio, fecha, next, archive = struct.unpack(FORMAT, record)
-        return Venta(id, nombre.decode().strip(), cantidad, precio, fecha.decode().strip(), next, archive)
+        return VentaView(record)
 
 def getNumberRecordsFile(filename:str) -> int:
     with open(filename, "rb") as file:
@@ -374,8 +376,9 @@ class SequentialFile:
 # Es importante la implementación con persistencia (memoria secundaria), ya que , los datos del árbol se conservan incluso después de que la aplicación se cierre o se reinicie. 
 # En un sistema real de bases de datos, los datos deben sobrevivir a un apagón o reinicio.
 
-AVL_NODE_FORMAT = "=i30sif10siii"
-AVL_NODE_SIZE = struct.calcsize(AVL_NODE_FORMAT)
+AVL_NODE_SCHEMA = SALE_SCHEMA.extend([("left", "i"), ("right", "i"), ("height", "i")])
+AVL_NODE_FORMAT = AVL_NODE_SCHEMA.format
+AVL_NODE_SIZE = AVL_NODE_SCHEMA.size
 AVL_HEADER_SIZE = 4
 
 #Con SALE_SIZE ya definido
@@ -388,17 +391,12 @@ class AVLNode:
         self.height = height
 
     def pack(self):
-        sale_data = pack_sale(self.sale)
-        extra = struct.pack("iii", self.left, self.right, self.height)
-        return sale_data + extra
+        return AVL_NODE_SCHEMA.pack_dict({**self.sale, "left": self.left, "right": self.right, "height": self.height})
 
     @staticmethod
     def unpack(data):
-        sale_data = data[:VENTAS_SIZE]
-        extra = data[VENTAS_SIZE:]
-        sale = unpack_sale(sale_data)
-        left, right, height = struct.unpack("iii", extra)
-        return AVLNode(sale, left, right, height)
+        sale = AVL_NODE_SCHEMA.unpack_dict(data)
+        return AVLNode(sale, sale.pop("left"), sale.pop("right"), sale.pop("height"))
 
 class AVLFile:
     def __init__(self, filename="sales_avl.dat"):
@@ -1,95 +1,272 @@
 import struct
 import os
-
-VENTAS_FORMAT = "=i30sif10s"
-
-VENTAS_SIZE = struct.calcsize(VENTAS_FORMAT)
+import sys
+import heapq
+import bisect
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from block_reader import scan_blocks
+from io_stats import operation, tracked_open
+from Seq_file_pack_unpack import SALE_SCHEMA, VENTAS_SIZE, pack_sale, unpack_sale
+from bloom_filter import BloomFilter
+
+RANGE_BLOCK_SIZE = 64 * 1024  # bytes por lectura al recorrer el archivo principal en rangeSearch
+WRITE_BUFFER_SIZE = 1024 * 1024  # bytes por escritura al reconstruir el archivo principal
+
+# ---------------------------------------------------------
+# Memtable (memtable=True): los insert van a una lista en memoria ordenada por id (con los
+# registros ya empaquetados, como quedarían en el archivo) en lugar del archivo auxiliar;
+# search / rangeSearch / load / remove la consultan primero. Al llegar a k registros se
+# vuelca en una sola pasada con rebuild() (merge con el archivo principal). close() vuelca
+# lo que quede.
+# Con log=True cada insert / remove de la memtable se agrega a main_filename + ".log"
+# (op + registro) antes de responder, y al abrir el archivo se reproduce: lo que estaba en
+# la memtable sobrevive a una caída del proceso. El log se vacía en cada rebuild().
+#
+# Filtro de Bloom opcional (bloom_filter.py, main_filename + ".bloom") sobre los ids activos,
+# con tasa de falsos positivos bloom_fp_rate (None, el valor por defecto, lo desactiva; ej.
+# bloom_fp_rate=FP_RATE): search() lo consulta primero y un id ausente se descarta sin leer
+# los archivos. Cada insert lo actualiza solo en memoria; se guarda en rebuild() y close(),
+# junto con los tamaños de ambos archivos: si al abrir no coinciden (caída entre dos
+# guardados), se reconstruye recorriéndolos. stats() devuelve sus contadores.
+# ---------------------------------------------------------
+LOG_INSERT = b"I"
+LOG_REMOVE = b"D"
+LOG_ENTRY_SIZE = 1 + VENTAS_SIZE
 
 
 class SequentialFile:
-  def __init__(self, main_filename="sales_main.dat", aux_filename="sales_aux.dat", k=10):
+  def __init__(self, main_filename="sales_main.dat", aux_filename="sales_aux.dat", k=10, memtable=False, log=False,
+               bloom_fp_rate=None):
     self.main_file = main_filename
     self.aux_file = aux_filename
     self.k =k
+    if log and not memtable:
+      raise ValueError("log=True requiere memtable=True")
+    self.memtable = [] if memtable else None  # registros empaquetados ordenados por id
+    self.memtable_ids = []  # ids de self.memtable, para bisect
+    self.log_file = main_filename + ".log" if log else None
+    self.log = None
 
     for fname, header_val in [(self.main_file, 0), (self.aux_file, 0)]:
       if not os.path.exists(fname) or os.path.getsize(fname) == 0:
-        with open(fname, "wb") as f:
+        with tracked_open(fname, "wb") as f:
          f.write(struct.pack("i", header_val))
 
+    self.bloom = None
+    if bloom_fp_rate is not None:
+      self.bloom = BloomFilter(main_filename + ".bloom", bloom_fp_rate)
+      if not self.bloom.loaded or self.bloom.stamp != self._data_stamp():
+        self._rebuild_bloom()
+
+    if self.log_file is not None:
+      self._replay_log()
+      self.log = tracked_open(self.log_file, "ab", buffering=0)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    self.close()
+
+  def close(self):
+    if self.memtable:
+      self.rebuild()
+    if self.log is not None:
+      self.log.close()
+      self.log = None
+    if self.bloom is not None:
+      self.bloom.save(self._data_stamp())
+
+  def stats(self):
+    return {'bloom': self.bloom.stats() if self.bloom is not None else None}
+
+  # -----------------------------------------------------
+  # Filtro de Bloom
+  # -----------------------------------------------------
+  def _data_stamp(self):
+    return os.path.getsize(self.main_file), os.path.getsize(self.aux_file)
+
+  def _bloom_capacity(self):
+    # Cota de ids activos hasta el próximo rebuild(): los de los archivos, la memtable y k más
+    memtable = len(self.memtable) if self.memtable else 0
+    return self._reader_header(self.main_file) + self._reader_header(self.aux_file) + memtable + self.k
+
+  def _rebuild_bloom(self):
+    self.bloom.reset(self._bloom_capacity())
+    for filename in [self.main_file, self.aux_file]:
+      for sale_id, _ in self._iter_raw(filename):
+        self.bloom.add(sale_id)
+    for sale_id in self.memtable_ids:
+      self.bloom.add(sale_id)
+    self.bloom.save(self._data_stamp())
+
+  # -----------------------------------------------------
+  # Memtable
+  # -----------------------------------------------------
+  def _replay_log(self):
+    if not os.path.exists(self.log_file):
+      return
+    with tracked_open(self.log_file, "rb") as f:
+      for _, block in scan_blocks(f, 0, None, LOG_ENTRY_SIZE):
+        for offset in range(0, len(block), LOG_ENTRY_SIZE):
+          record = block[offset + 1:offset + LOG_ENTRY_SIZE]
+          if block[offset:offset + 1] == LOG_INSERT:
+            self._memtable_insert(record)
+          else:
+            self._memtable_remove(struct.unpack_from("i", record)[0])
+
+  def _append_log(self, op, record):
+    if self.log is not None:
+      self.log.write(op + record)
+
+  def _memtable_insert(self, record):
+    sale_id = struct.unpack_from("i", record)[0]
+    i = bisect.bisect_right(self.memtable_ids, sale_id)
+    self.memtable_ids.insert(i, sale_id)
+    self.memtable.insert(i, record)
+    if self.bloom is not None:
+      self.bloom.add(sale_id)
+
+  def _memtable_find(self, sale_id):
+    i = bisect.bisect_left(self.memtable_ids, sale_id)
+    return i if i < len(self.memtable_ids) and self.memtable_ids[i] == sale_id else -1
+
+  def _memtable_remove(self, sale_id):
+    i = self._memtable_find(sale_id)
+    if i == -1:
+      return None
+    del self.memtable_ids[i]
+    return self.memtable.pop(i)
+
+  def _memtable_range(self, init_id, end_id):
+    return self.memtable[bisect.bisect_left(self.memtable_ids, init_id):bisect.bisect_right(self.memtable_ids, end_id)]
+
   def _reader_header(self, filename):
-    with open(filename, "rb") as f:
+    with tracked_open(filename, "rb") as f:
       f.seek(0)
       return struct.unpack("i", f.read(4))[0]
 
   def _write_header(self, filename, val):
-    with open(filename, "rb+") as f:
+    with tracked_open(filename, "rb+") as f:
       f.seek(0)
       f.write(struct.pack("i", val))
 
 
+  @operation()
   def load (self):
     records = []
     for filename in [self.main_file, self.aux_file]:
       header = self._reader_header(filename)
-      with open(filename, "rb") as f:
-        f.seek(4)
-        for _ in range(header):
-          data = f.read(VENTAS_SIZE)
-
-          if len(data) < VENTAS_SIZE:
-            break
-          sale = unpack_sale(data)
-
-          if sale["id"] != -1:
-            records.append(sale)
-
+      # Lectura por bloques grandes; los registros se desempaquetan sobre cada bloque
+      with tracked_open(filename, "rb") as f:
+        for _, block in scan_blocks(f, 4, header, VENTAS_SIZE):
+          for values in SALE_SCHEMA.iter_unpack(memoryview(block)):
+            if values[0] != -1:
+              records.append(dict(zip(SALE_SCHEMA.names, values)))
+
+    if self.memtable:
+      records.extend(unpack_sale(record) for record in self.memtable)
     records.sort(key=lambda s: s["id"])
     return records
 
+  @operation()
   def insert (self, sale):
+    if self.memtable is not None:
+      record = pack_sale(sale)
+      self._append_log(LOG_INSERT, record)
+      self._memtable_insert(record)
+      if len(self.memtable) >= self.k:
+        self.rebuild()
+      return
     aux_count = self._reader_header(self.aux_file)
 
-    with open(self.aux_file, "ab") as f:
+    with tracked_open(self.aux_file, "ab") as f:
       f.write(pack_sale(sale))
     self._write_header(self.aux_file, aux_count + 1)
+    if self.bloom is not None:
+      self.bloom.add(sale["id"])  # se guarda en rebuild() / close()
     if aux_count + 1 >= self.k:
       self.rebuild()
 
+  def _read_id(self, f, i):
+    f.seek(4 + i * VENTAS_SIZE)
+    return struct.unpack("i", f.read(4))[0]
+
+  def _lower_bound(self, f, count, sale_id):
+    # (posición, id) del primer registro activo del archivo principal (ordenado por id desde
+    # rebuild) con id >= sale_id, o (count, None) si no hay ninguno.
+    # Los eliminados (id == -1) no tienen orden: desde mid se avanza al primer registro
+    # activo de [mid, hi]; si no hay ninguno, la búsqueda sigue en la mitad izquierda.
+    lo, hi = 0, count - 1
+    found = (count, None)
+    while lo <= hi:
+      mid = (lo + hi) // 2
+      pos = mid
+      record_id = self._read_id(f, pos)
+      while record_id == -1 and pos < hi:
+        pos += 1
+        record_id = self._read_id(f, pos)
+      if record_id == -1:
+        hi = mid - 1
+      elif record_id < sale_id:
+        lo = pos + 1
+      else:
+        found = (pos, record_id)
+        hi = mid - 1
+    return found
+
+  @operation()
   def search(self, sale_id):
-
-    for filename in [self.main_file, self.aux_file]:
-      header = self._reader_header(filename)
-      with open(filename, "rb") as f:
-        f.seek(4)
-        for _ in range(header):
-          data = f.read(VENTAS_SIZE)
-          if len(data) < VENTAS_SIZE:
-            break
-          sale = unpack_sale(data)
-          if sale["id"] == sale_id and sale ["id"] != -1:
-            return sale
+    if sale_id == -1:
+      return None
+    if self.bloom is not None and not self.bloom.might_contain(sale_id):
+      return None
+    if self.memtable:
+      i = self._memtable_find(sale_id)
+      if i != -1:
+        return unpack_sale(self.memtable[i])
+    # Archivo principal: búsqueda binaria, O(log n) lecturas
+    header = self._reader_header(self.main_file)
+    with tracked_open(self.main_file, "rb") as f:
+      pos, record_id = self._lower_bound(f, header, sale_id)
+      if record_id == sale_id:
+        f.seek(4 + pos * VENTAS_SIZE)
+        return unpack_sale(f.read(VENTAS_SIZE))
+
+    # Archivo auxiliar: a lo más k registros sin orden
+    header = self._reader_header(self.aux_file)
+    with tracked_open(self.aux_file, "rb") as f:
+      for _, block in scan_blocks(f, 4, header, VENTAS_SIZE):
+        for values in SALE_SCHEMA.iter_unpack(memoryview(block)):
+          if values[0] == sale_id:
+            return dict(zip(SALE_SCHEMA.names, values))
+    if self.bloom is not None:
+      self.bloom.false_positive()
     return None
 
 
+  @operation()
   def remove(self, sale_id):
+    if self.memtable:
+      record = self._memtable_remove(sale_id)
+      if record is not None:
+        self._append_log(LOG_REMOVE, record)
+        return
     found = False
     for filename in [self.main_file, self.aux_file]:
       header = self._reader_header(filename)
-      with open(filename, "rb+") as f:
-        f.seek(4)
-        for i in range(header):
-          por_file = f.tell()
-          data = f.read(VENTAS_SIZE)
-          if len(data) < VENTAS_SIZE:
-            break
-          sale = unpack_sale(data)
-
-          if sale["id"] == sale_id:
-            sale["id"] = -1
-            f.seek(por_file)
-            f.write(pack_sale(sale))
-            found = True
+      with tracked_open(filename, "rb+") as f:
+        for first, block in scan_blocks(f, 4, header, VENTAS_SIZE):
+          for i, values in enumerate(SALE_SCHEMA.iter_unpack(memoryview(block)), first):
+            if values[0] == sale_id:
+              sale = dict(zip(SALE_SCHEMA.names, values))
+              sale["id"] = -1
+              f.seek(4 + i * VENTAS_SIZE)
+              f.write(pack_sale(sale))
+              found = True
+              break
+          if found:
             break
       if found:
         break
@@ -97,23 +274,159 @@ class SequentialFile:
       print("Registro no encontrado para eliminación")
 
 
-  def rangeSearch(self, init_id, end_id):
-    recs = self.load()
-    return [r for r in recs if init_id <= r["id"] <= end_id]
-
+  def _read_aux_range(self, init_id, end_id):
+    # Registros del archivo auxiliar (a lo más k) dentro del rango, ordenados por id
+    header = self._reader_header(self.aux_file)
+    records = []
+    with tracked_open(self.aux_file, "rb") as f:
+      for _, block in scan_blocks(f, 4, header, VENTAS_SIZE):
+        for values in SALE_SCHEMA.iter_unpack(memoryview(block)):
+          if values[0] != -1 and init_id <= values[0] <= end_id:
+            records.append(dict(zip(SALE_SCHEMA.names, values)))
+    records.sort(key=lambda s: s["id"])
+    return records
 
+  def _iter_main_range(self, init_id, end_id):
+    # Desde el primer id >= init_id (búsqueda binaria) hasta pasar end_id, por bloques
+    header = self._reader_header(self.main_file)
+    with tracked_open(self.main_file, "rb") as f:
+      start, _ = self._lower_bound(f, header, init_id)
+      for _, block in scan_blocks(f, 4 + start * VENTAS_SIZE, header - start, VENTAS_SIZE, RANGE_BLOCK_SIZE):
+        for values in SALE_SCHEMA.iter_unpack(memoryview(block)):
+          if values[0] == -1:
+            continue
+          if values[0] > end_id:
+            return
+          yield dict(zip(SALE_SCHEMA.names, values))
+
+  @operation()
+  def rangeSearch(self, init_id, end_id):
+    # Generador ordenado por id: mezcla el recorrido del archivo principal con los registros
+    # del auxiliar y de la memtable en el rango. La memoria es O(k) y el costo crece con el
+    # tamaño del resultado.
+    memtable = [unpack_sale(record) for record in self._memtable_range(init_id, end_id)] if self.memtable else []
+    yield from heapq.merge(self._iter_main_range(init_id, end_id), self._read_aux_range(init_id, end_id),
+                           memtable, key=lambda s: s["id"])
+
+
+  def _iter_raw(self, filename):
+    # (id, bytes del registro) de los registros activos, en el orden del archivo
+    header = self._reader_header(filename)
+    with tracked_open(filename, "rb") as f:
+      for _, block in scan_blocks(f, 4, header, VENTAS_SIZE):
+        for offset in range(0, len(block), VENTAS_SIZE):
+          record_id = struct.unpack_from("i", block, offset)[0]
+          if record_id != -1:
+            yield record_id, block[offset:offset + VENTAS_SIZE]
+
+  @operation()
   def rebuild(self):
-    all_records = self.load()
-    with open(self.main_file, "wb") as f:
-      f.write(struct.pack("i", len(all_records)))
-      for r in all_records:
-        f.write(pack_sale(r))
+    # Merge en dos vías sin cargar el archivo principal: el principal ya está ordenado, solo
+    # se ordenan los (a lo más k) registros del auxiliar. Los eliminados se descartan y el
+    # resultado se escribe en un archivo temporal que reemplaza al principal con os.replace.
+    # La memoria depende de k y del buffer de escritura, no del tamaño del archivo.
+    aux = sorted(self._iter_raw(self.aux_file), key=lambda r: r[0])
+    memtable = list(zip(self.memtable_ids, self.memtable)) if self.memtable else []
+    if self.bloom is not None:
+      self.bloom.reset(self._bloom_capacity())
+    tmp_filename = self.main_file + ".tmp"
+    count = 0
+    with tracked_open(tmp_filename, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+      f.write(struct.pack("i", 0))
+      buffer = []
+      for sale_id, record in heapq.merge(self._iter_raw(self.main_file), aux, memtable, key=lambda r: r[0]):
+        buffer.append(record)
+        if self.bloom is not None:
+          self.bloom.add(sale_id)
+        if len(buffer) * VENTAS_SIZE >= WRITE_BUFFER_SIZE:
+          f.write(b"".join(buffer))
+          count += len(buffer)
+          buffer = []
+      f.write(b"".join(buffer))
+      count += len(buffer)
+      f.seek(0)
+      f.write(struct.pack("i", count))
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_filename, self.main_file)
 
-    with open(self.aux_file, "wb") as f:
+    with tracked_open(self.aux_file, "wb") as f:
       f.write(struct.pack("i", 0))
+    if self.memtable is not None:
+      self.memtable = []
+      self.memtable_ids = []
+    if self.log is not None:
+      self.log.truncate(0)
+    if self.bloom is not None:
+      self.bloom.save(self._data_stamp())
 
     print("Reconstrucción del archivo principal completada.")
 
+def remove_files(main_filename, aux_filename):
+  for fname in [main_filename, aux_filename, main_filename + ".log", main_filename + ".bloom"]:
+    if os.path.exists(fname):
+      os.remove(fname)
+
+
+def make_sale(i):
+  return {"id": i, "product": f"Producto_{i}", "qty": (i % 10) + 1, "price": 100.0 + i, "date": "2025-03-30"}
+
+
+def test_memtable_log():
+  print("=== TEST: memtable + log ===")
+  main_filename, aux_filename = "test_log_main.dat", "test_log_aux.dat"
+  remove_files(main_filename, aux_filename)
+  seq_file = SequentialFile(main_filename, aux_filename, k=10, memtable=True, log=True)
+  for i in [5, 1, 4, 2, 3]:
+    seq_file.insert(make_sale(i))
+  seq_file.remove(4)
+  # Caída: la memtable no se vuelca (sin close()), solo queda el log
+  seq_file.log.close()
+  assert seq_file._reader_header(main_filename) == 0 and seq_file._reader_header(aux_filename) == 0
+
+  seq_file = SequentialFile(main_filename, aux_filename, k=10, memtable=True, log=True)
+  assert seq_file.memtable_ids == [1, 2, 3, 5]
+  assert seq_file.search(3) == make_sale(3) and seq_file.search(4) is None
+  assert [sale["id"] for sale in seq_file.rangeSearch(2, 5)] == [2, 3, 5]
+  # Al llegar a k registros se vuelca al archivo principal y el log queda vacío
+  for i in range(6, 12):
+    seq_file.insert(make_sale(i))
+  assert seq_file.memtable == [] and os.path.getsize(main_filename + ".log") == 0
+  assert seq_file._reader_header(main_filename) == 10
+  seq_file.close()
+  with SequentialFile(main_filename, aux_filename, k=10, memtable=True, log=True) as seq_file:
+    assert [sale["id"] for sale in seq_file.load()] == [1, 2, 3, 5, 6, 7, 8, 9, 10, 11]
+  remove_files(main_filename, aux_filename)
+  print("Test memtable + log completado.\n")
+
+
+def test_bloom():
+  print("=== TEST: filtro de Bloom ===")
+  main_filename, aux_filename = "test_bloom_main.dat", "test_bloom_aux.dat"
+  remove_files(main_filename, aux_filename)
+  # Sin bloom_fp_rate no hay filtro ni sidecar
+  with SequentialFile(main_filename, aux_filename, k=5) as seq_file:
+    assert seq_file.bloom is None
+  assert not os.path.exists(main_filename + ".bloom")
+
+  seq_file = SequentialFile(main_filename, aux_filename, k=5, bloom_fp_rate=0.01)
+  for i in range(1, 8):
+    seq_file.insert(make_sale(i))  # el rebuild en el 5to guarda el filtro
+  # Caída sin close(): los inserts 6 y 7 no están en el .bloom guardado
+  seq_file = SequentialFile(main_filename, aux_filename, k=5, bloom_fp_rate=0.01)
+  assert seq_file.bloom.stamp == seq_file._data_stamp()  # se reconstruyó al abrir
+  assert all(seq_file.bloom.might_contain(i) for i in range(1, 8))
+  assert seq_file.search(7) == make_sale(7)
+  assert all(seq_file.search(i) is None for i in range(100, 200))
+  stats = seq_file.stats()['bloom']
+  assert stats['negatives'] + stats['false_positives'] == 100
+  seq_file.close()
+  with SequentialFile(main_filename, aux_filename, k=5, bloom_fp_rate=0.01) as seq_file:
+    assert seq_file.bloom.loaded and seq_file.bloom.items == 7
+  remove_files(main_filename, aux_filename)
+  print("Test filtro de Bloom completado.\n")
+
+
 if __name__ == "__main__":
     test_sales = []
     for i in range(1, 21):
@@ -152,3 +465,5 @@ if __name__ == "__main__":
     for rec in records:
         print(rec)
 
+    test_memtable_log()
+    test_bloom()
@@ -1,25 +1,21 @@
-import struct
+import os
+import sys
 
-VENTAS_FORMAT = "=i30sif10s"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from record_schema import Schema
 
-VENTAS_SIZE = struct.calcsize(VENTAS_FORMAT)
+SALE_SCHEMA = Schema([("id", "i"), ("product", "30s"), ("qty", "i"), ("price", "f"), ("date", "10s")], byteorder="=")
 
-def pack_sale(sale):
-  product_bytes = sale["product"].ljust(30)[:30].encode("utf-8")
+VENTAS_FORMAT = SALE_SCHEMA.format
+
+VENTAS_SIZE = SALE_SCHEMA.size
 
-  date_bytes = sale["date"].ljust(10)[:10].encode("utf-8")
-  return struct.pack(VENTAS_FORMAT, sale["id"], product_bytes, sale["qty"], sale["price"], date_bytes)
+def pack_sale(sale):
+  return SALE_SCHEMA.pack_dict(sale)
 
 
 def unpack_sale(data):
-  id_val, product_bytes, qty, price, date_bytes = struct.unpack(VENTAS_FORMAT, data)
-  return {
-      "id": id_val,
-      "product": product_bytes.decode("utf-8").rstrip("\x00"),
-      "qty": qty,
-      "price": price,
-      "date": date_bytes.decode("utf-8").strip()
-  }
+  return SALE_SCHEMA.unpack_dict(data)
 
 if __name__ == "__main__":
 
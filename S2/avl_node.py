@@ -1,11 +1,18 @@
 import struct
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from record_schema import Schema
+from io_stats import operation, tracked_open
 
 class VentaAVL:
     # Formato: id (int), nombre (30 bytes), cantidad (int), precio (float),
     # fecha (10 bytes), left (int), right (int), height (int)
-    FORMAT = 'i30sif10siii'
-    RECORD_SIZE = struct.calcsize(FORMAT)
+    SCHEMA = Schema([('id_venta', 'i'), ('nombre', '30s'), ('cantidad', 'i'), ('precio', 'f'),
+                     ('fecha', '10s'), ('left', 'i'), ('right', 'i'), ('height', 'i')])
+    FORMAT = SCHEMA.format
+    RECORD_SIZE = SCHEMA.size
     
     def __init__(self, id_venta=-1, nombre="", cantidad=0, precio=0.0, fecha="",
                  left=-1, right=-1, height=0):
@@ -19,19 +26,17 @@ class VentaAVL:
         self.height = height
         
     def pack(self) -> bytes:
-        # Utilice ljust para llenar espacios en blanco, igual que usar encode y demás.
-        nombre_p = self.nombre.encode('utf-8')[:30].ljust(30, b' ')
-        fecha_p = self.fecha.encode('utf-8')[:10].ljust(10, b' ')
-        return struct.pack(self.FORMAT, self.id_venta, nombre_p, self.cantidad, 
-                           self.precio, fecha_p, self.left, self.right, self.height)
+        # El esquema se encarga del encode y del padding con espacios de los strings.
+        return self.SCHEMA.pack(self.id_venta, self.nombre, self.cantidad,
+                                self.precio, self.fecha, self.left, self.right, self.height)
     
     def unpack(self, data: bytes):
-        datos = struct.unpack(self.FORMAT, data)
+        datos = self.SCHEMA.unpack(data)  # Los strings ya vienen sin los espacios de relleno
         self.id_venta = datos[0]
-        self.nombre = datos[1].decode('utf-8').strip()  # Se eliminan los espacios en blanco
+        self.nombre = datos[1]
         self.cantidad = datos[2]
         self.precio = round(datos[3], 2)
-        self.fecha = datos[4].decode('utf-8').strip()
+        self.fecha = datos[4]
         self.left = datos[5]
         self.right = datos[6]
         self.height = datos[7]
@@ -41,6 +46,12 @@ class VentaAVL:
                 f"Precio: {self.precio}, Fecha: {self.fecha}, Left: {self.left}, "
                 f"Right: {self.right}, Height: {self.height}")
 
+class VentaAVLView(VentaAVL.SCHEMA.view("VentaAVLRecord", {'precio': lambda precio: round(precio, 2)})):
+    # Vista perezosa de un nodo leído del archivo (mismos atributos que VentaAVL):
+    # get_node() no decodifica nombre/fecha si solo se recorren id_venta, left, right y height.
+    __slots__ = ()
+    __str__ = VentaAVL.__str__
+
 class AVLArchivo:
     HEADER_FORMAT = 'i'
     HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
@@ -49,43 +60,41 @@ class AVLArchivo:
         self.filename = filename
         # Si el archivo no existe se crea con la cabecera (raíz = -1: árbol vacío)
         if not os.path.exists(self.filename):
-            with open(self.filename, 'wb') as f:
+            with tracked_open(self.filename, 'wb') as f:
                 self.root = -1
                 f.write(struct.pack(self.HEADER_FORMAT, self.root))
         else:
-            with open(self.filename, 'rb') as f:
+            with tracked_open(self.filename, 'rb') as f:
                 header = f.read(self.HEADER_SIZE)
                 if header:
                     self.root = struct.unpack(self.HEADER_FORMAT, header)[0]
                 else:
                     self.root = -1
     
-    def get_node(self, pos: int) -> VentaAVL | None:
+    def get_node(self, pos: int) -> VentaAVLView | None:
         if pos < 0:
             return None
-        with open(self.filename, 'rb') as f:
+        with tracked_open(self.filename, 'rb') as f:
             f.seek(self.HEADER_SIZE + pos * VentaAVL.RECORD_SIZE)
             data = f.read(VentaAVL.RECORD_SIZE)
             if not data:
                 return None
-            nodo = VentaAVL()
-            nodo.unpack(data)
-            return nodo
+            return VentaAVLView(data)
     
     def write_node(self, pos: int, nodo: VentaAVL):
-        with open(self.filename, 'r+b') as f:
+        with tracked_open(self.filename, 'r+b') as f:
             f.seek(self.HEADER_SIZE + pos * VentaAVL.RECORD_SIZE)
             f.write(nodo.pack())
             
     def append_node(self, nodo: VentaAVL) -> int:
-        with open(self.filename, 'ab') as f:
+        with tracked_open(self.filename, 'ab') as f:
             pos = (f.tell() - self.HEADER_SIZE) // VentaAVL.RECORD_SIZE
             f.write(nodo.pack())
             return pos
         
     def update_header(self, root: int):
         self.root = root
-        with open(self.filename, 'r+b') as f:
+        with tracked_open(self.filename, 'r+b') as f:
             f.seek(0)
             f.write(struct.pack(self.HEADER_FORMAT, root))
     
@@ -179,6 +188,7 @@ class AVLArchivo:
         pos = self.rebalance(pos)
         return pos
     
+    @operation()
     def insert(self, nuevo: VentaAVL):
 
         if self.root == -1:
@@ -199,6 +209,7 @@ class AVLArchivo:
         else:
             return self._search_recursive(nodo.right, id_venta)
     
+    @operation()
     def search(self, id_venta: int) -> VentaAVL | None:
         pos = self._search_recursive(self.root, id_venta)
         if pos == -1:
@@ -242,6 +253,7 @@ class AVLArchivo:
         pos = self.rebalance(pos)
         return pos
         
+    @operation()
     def delete(self, id_venta: int):
         """
         Elimina un nodo (por ID) y reestructura el árbol AVL.
@@ -260,6 +272,7 @@ class AVLArchivo:
         if nodo.right != -1:
             self._range_inorder(nodo.right, id_min, id_max, resultados)
     
+    @operation()
     def range_search(self, id_min: int, id_max: int) -> list[VentaAVL]:
         resultados = []
         self._range_inorder(self.root, id_min, id_max, resultados)
@@ -0,0 +1,224 @@
+import contextlib
+import io
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from block_reader import scan_blocks
+from Seq_file_methods import SequentialFile
+from Seq_file_pack_unpack import SALE_SCHEMA, VENTAS_SIZE
+
+# ---------------------------------------------------------
+# Benchmarks de S2. Se ejecutan con: python benchmarks.py [nombre ...]
+# Salvo "bloom", se miden sin filtro de Bloom (bloom_fp_rate=None) para aislar cada cambio.
+# ---------------------------------------------------------
+CHUNK = 100000  # registros por escritura al generar archivos
+
+
+def write_main_file(filename, records, deleted=0.0, seed=0):
+    # Archivo principal ya ordenado (como lo deja rebuild) con ids pares 0, 2, 4, ...
+    # 'deleted' es la fracción de registros marcados como eliminados (id == -1)
+    rng = random.Random(seed)
+    with open(filename, "wb") as f:
+        f.write(struct.pack("i", records))
+        for start in range(0, records, CHUNK):
+            f.write(SALE_SCHEMA.pack_many(
+                (-1 if deleted and rng.random() < deleted else 2 * i, f"Producto_{i}", 1 + i % 10, 100.0, "2025-03-30")
+                for i in range(start, min(start + CHUNK, records))))
+
+
+def linear_search(filename, sale_id):
+    # Recorrido completo del archivo principal (la búsqueda anterior a la binaria)
+    with open(filename, "rb") as f:
+        count = struct.unpack("i", f.read(4))[0]
+        for _, block in scan_blocks(f, 4, count, VENTAS_SIZE):
+            for values in SALE_SCHEMA.iter_unpack(memoryview(block), decode=False):
+                if values[0] == sale_id:
+                    return values
+    return None
+
+
+# ---------------------------------------------------------
+# search() por id en el archivo principal: búsqueda binaria vs recorrido completo.
+# Mitad de las búsquedas son ids existentes y mitad ids impares (no existen). La columna
+# "eliminados" repite la búsqueda binaria con un 10% de registros marcados con id == -1.
+# ---------------------------------------------------------
+def bench_search(sizes=(10 ** 5, 10 ** 6, 10 ** 7), lookups=2000, linear_lookups=5):
+    print("=== BENCH: search() en el archivo principal ===")
+    directory = tempfile.mkdtemp()
+    main, aux = os.path.join(directory, "main.dat"), os.path.join(directory, "aux.dat")
+    print(f"{'registros':>10} {'binaria µs':>12} {'eliminados µs':>14} {'lineal µs':>12}")
+    for records in sizes:
+        rng = random.Random(records)
+        queries = [rng.randrange(2 * records) for _ in range(lookups)]
+        results = []
+        for deleted in (0.0, 0.1):
+            write_main_file(main, records, deleted)
+            seq_file = SequentialFile(main, aux, bloom_fp_rate=None)
+            start = time.perf_counter()
+            found = sum(seq_file.search(sale_id) is not None for sale_id in queries)
+            results.append((time.perf_counter() - start) / lookups * 1e6)
+            if not deleted:
+                assert found == sum(sale_id % 2 == 0 for sale_id in queries)
+        start = time.perf_counter()
+        for sale_id in queries[:linear_lookups]:
+            linear_search(main, sale_id)
+        linear = (time.perf_counter() - start) / linear_lookups * 1e6
+        print(f"{records:>10} {results[0]:>12.1f} {results[1]:>14.1f} {linear:>12.1f}")
+        os.remove(main)
+        os.remove(aux)
+    os.rmdir(directory)
+
+
+# ---------------------------------------------------------
+# rangeSearch() de rangos angostos (width ids): generador con búsqueda binaria del inicio
+# vs load() completo + filtro (la versión anterior).
+# ---------------------------------------------------------
+def bench_range(sizes=(10 ** 5, 10 ** 6), width=200, queries=200, load_queries=2):
+    print("=== BENCH: rangeSearch() ===")
+    directory = tempfile.mkdtemp()
+    main, aux = os.path.join(directory, "main.dat"), os.path.join(directory, "aux.dat")
+    print(f"{'registros':>10} {'generador µs':>14} {'load+filtro µs':>16}")
+    for records in sizes:
+        rng = random.Random(records)
+        write_main_file(main, records, 0.1)
+        seq_file = SequentialFile(main, aux, bloom_fp_rate=None)
+        starts = [rng.randrange(2 * records) for _ in range(queries)]
+        start = time.perf_counter()
+        for init_id in starts:
+            for _ in seq_file.rangeSearch(init_id, init_id + width):
+                pass
+        streamed = (time.perf_counter() - start) / queries * 1e6
+        start = time.perf_counter()
+        for init_id in starts[:load_queries]:
+            [r for r in seq_file.load() if init_id <= r["id"] <= init_id + width]
+        loaded = (time.perf_counter() - start) / load_queries * 1e6
+        print(f"{records:>10} {streamed:>14.1f} {loaded:>16.1f}")
+        os.remove(main)
+        os.remove(aux)
+    os.rmdir(directory)
+
+
+# ---------------------------------------------------------
+# rebuild() con k registros en el auxiliar y 10% de eliminados en el principal: tiempo y pico
+# de memoria (tracemalloc) del merge en dos vías vs load() + reescritura completa.
+# ---------------------------------------------------------
+def load_rebuild(seq_file):
+    # Versión anterior de rebuild(): todo el archivo en memoria
+    all_records = seq_file.load()
+    with open(seq_file.main_file, "wb") as f:
+        f.write(struct.pack("i", len(all_records)))
+        f.write(SALE_SCHEMA.pack_many([r[name] for name in SALE_SCHEMA.names] for r in all_records))
+    with open(seq_file.aux_file, "wb") as f:
+        f.write(struct.pack("i", 0))
+
+
+def bench_rebuild(sizes=(10 ** 5, 10 ** 6), k=100):
+    print("=== BENCH: rebuild() ===")
+    directory = tempfile.mkdtemp()
+    main, aux = os.path.join(directory, "main.dat"), os.path.join(directory, "aux.dat")
+    print(f"{'registros':>10} {'merge s':>9} {'merge MiB':>10} {'load s':>9} {'load MiB':>10}")
+    for records in sizes:
+        row = []
+        for method in (SequentialFile.rebuild, load_rebuild):
+            write_main_file(main, records, 0.1)
+            seq_file = SequentialFile(main, aux, k=k + 1, bloom_fp_rate=None)
+            for i in range(k):
+                seq_file.insert({"id": 2 * i + 1, "product": "Nuevo", "qty": 1, "price": 1.0, "date": "2025-03-30"})
+            tracemalloc.start()
+            start = time.perf_counter()
+            method(seq_file)
+            row.append(time.perf_counter() - start)
+            row.append(tracemalloc.get_traced_memory()[1] / 2 ** 20)
+            tracemalloc.stop()
+        print(f"{records:>10} {row[0]:>9.2f} {row[1]:>10.1f} {row[2]:>9.2f} {row[3]:>10.1f}")
+        os.remove(main)
+        os.remove(aux)
+    os.rmdir(directory)
+
+
+# ---------------------------------------------------------
+# insert() de ids al azar: archivo auxiliar vs memtable (con y sin log). "insert" mide solo
+# las inserciones (k mayor que la cantidad, sin vuelcos); "con vuelcos" incluye los rebuild()
+# que dispara cada modo al llegar a k, sobre un archivo principal de 'preload' registros.
+# ---------------------------------------------------------
+def bench_insert(inserts=20000, k=2000, preload=10 ** 5):
+    print("=== BENCH: insert() ===")
+    directory = tempfile.mkdtemp()
+    main, aux = os.path.join(directory, "main.dat"), os.path.join(directory, "aux.dat")
+    ids = random.Random(0).sample(range(2 * preload), inserts)
+    print(f"{'modo':>16} {'insert/s':>10} {'con vuelcos/s':>14}")
+    for label, options in (("auxiliar", {}), ("memtable", {"memtable": True}),
+                           ("memtable + log", {"memtable": True, "log": True})):
+        rates = []
+        for flush_k in (inserts + 1, k):
+            write_main_file(main, preload)
+            with contextlib.redirect_stdout(io.StringIO()):  # rebuild() imprime un mensaje por vuelco
+                seq_file = SequentialFile(main, aux, k=flush_k, bloom_fp_rate=None, **options)
+                start = time.perf_counter()
+                for sale_id in ids:
+                    seq_file.insert({"id": sale_id, "product": "Nuevo", "qty": 1, "price": 1.0, "date": "2025-03-30"})
+                rates.append(inserts / (time.perf_counter() - start))
+                seq_file.close()
+                seq_file.rebuild()
+            assert seq_file._reader_header(main) == preload + inserts
+            os.remove(main)
+            os.remove(aux)
+            if os.path.exists(main + ".log"):
+                os.remove(main + ".log")
+        print(f"{label:>16} {rates[0]:>10.0f} {rates[1]:>14.0f}")
+    os.rmdir(directory)
+
+
+# ---------------------------------------------------------
+# search() con mayoría de ids ausentes (misses): sin filtro vs filtro de Bloom con distintas
+# tasas de falsos positivos. El archivo auxiliar tiene k - 1 registros, que cada miss sin
+# filtro recorre completo.
+# ---------------------------------------------------------
+def bench_bloom(records=10 ** 6, k=1000, lookups=5000, miss_ratio=0.9, fp_rates=(None, 0.1, 0.01, 0.001)):
+    print("=== BENCH: search() con filtro de Bloom ===")
+    directory = tempfile.mkdtemp()
+    main, aux = os.path.join(directory, "main.dat"), os.path.join(directory, "aux.dat")
+    write_main_file(main, records)
+    seq_file = SequentialFile(main, aux, k=k, bloom_fp_rate=None)
+    for i in range(k - 1):
+        seq_file.insert({"id": 2 * records + 2 * i, "product": "Nuevo", "qty": 1, "price": 1.0, "date": "2025-03-30"})
+    rng = random.Random(0)
+    # ids pares existen (principal o auxiliar), impares no
+    queries = [2 * rng.randrange(records + k - 1) + (rng.random() < miss_ratio) for _ in range(lookups)]
+    print(f"{'fp_rate':>8} {'búsquedas/s':>12} {'fp observado':>13} {'KiB filtro':>11}")
+    for fp_rate in fp_rates:
+        if os.path.exists(main + ".bloom"):
+            os.remove(main + ".bloom")
+        seq_file = SequentialFile(main, aux, k=k, bloom_fp_rate=fp_rate)
+        start = time.perf_counter()
+        found = sum(seq_file.search(sale_id) is not None for sale_id in queries)
+        rate = lookups / (time.perf_counter() - start)
+        assert found == sum(sale_id % 2 == 0 for sale_id in queries)
+        stats = seq_file.stats()['bloom']
+        if stats is None:
+            print(f"{'-':>8} {rate:>12.0f} {'-':>13} {'-':>11}")
+        else:
+            print(f"{fp_rate:>8} {rate:>12.0f} {stats['observed_fp_rate']:>13.4f} {stats['bits'] / 8 / 1024:>11.0f}")
+    for filename in (main, aux, main + ".bloom"):
+        os.remove(filename)
+    os.rmdir(directory)
+
+
+BENCHMARKS = {
+    "search": bench_search,
+    "range": bench_range,
+    "rebuild": bench_rebuild,
+    "insert": bench_insert,
+    "bloom": bench_bloom,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,168 @@
+import hashlib
+import math
+import os
+import struct
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from io_stats import tracked_open
+
+# ---------------------------------------------------------
+# Filtro de Bloom persistente sobre los ids activos de un archivo secuencial (sidecar
+# <archivo principal>.bloom). Si might_contain(id) es False el id seguro no está y la
+# búsqueda termina sin leer los archivos; si es True puede ser un falso positivo.
+#
+# Archivo: header BLOOM_HEADER_FORMAT (bits, funciones hash, tasa de falsos positivos
+# configurada, ids agregados, sello del archivo de datos) seguido del arreglo de bits.
+# Las k posiciones de un id salen de dos hashes de blake2b (h1 + i * h2, double hashing).
+#
+# El sello (por ejemplo los tamaños del principal y del auxiliar) se guarda con save(): si
+# al abrir no coincide con el de los archivos de datos, estos cambiaron sin actualizar el
+# filtro (caída entre la escritura del registro y save()) y el dueño debe reconstruirlo.
+# Los ids eliminados no se pueden quitar: quedan como falsos positivos hasta la siguiente
+# reconstrucción.
+# ---------------------------------------------------------
+BLOOM_HEADER_FORMAT = "=QIdQqq"
+BLOOM_HEADER_SIZE = struct.calcsize(BLOOM_HEADER_FORMAT)
+FP_RATE = 0.01
+MIN_CAPACITY = 64
+
+
+def optimal_parameters(capacity, fp_rate):
+    # (bits, funciones hash) para 'capacity' ids con tasa de falsos positivos fp_rate
+    capacity = max(capacity, MIN_CAPACITY)
+    bits = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    def __init__(self, filename, fp_rate=FP_RATE, capacity=MIN_CAPACITY):
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate debe estar entre 0 y 1")
+        self.filename = filename
+        self.fp_rate = fp_rate
+        self.checks = 0
+        self.negatives = 0
+        self.false_positives = 0
+        self.stamp = None
+        self.loaded = os.path.exists(filename) and os.path.getsize(filename) >= BLOOM_HEADER_SIZE
+        if self.loaded:
+            with tracked_open(filename, "rb") as f:
+                self.bits, self.hashes, stored_fp_rate, self.items, *stamp = struct.unpack(
+                    BLOOM_HEADER_FORMAT, f.read(BLOOM_HEADER_SIZE))
+                self.array = bytearray(f.read())
+            self.stamp = tuple(stamp)
+            self.dirty = set()  # bytes del arreglo modificados desde el último save()
+            # Con otra tasa configurada (o un arreglo truncado) se empieza de nuevo
+            self.loaded = stored_fp_rate == fp_rate and len(self.array) == (self.bits + 7) // 8
+        if not self.loaded:
+            self.reset(capacity)
+
+    def reset(self, capacity):
+        # Filtro vacío dimensionado para 'capacity' ids con la tasa configurada
+        self.bits, self.hashes = optimal_parameters(capacity, self.fp_rate)
+        self.array = bytearray((self.bits + 7) // 8)
+        self.items = 0
+        self.dirty = None  # None: save() reescribe el archivo completo
+
+    def _positions(self, key):
+        data = key.to_bytes(8, "little", signed=True) if isinstance(key, int) else str(key).encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        h1, h2 = struct.unpack("=QQ", digest)
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            byte = position >> 3
+            self.array[byte] |= 1 << (position & 7)
+            if self.dirty is not None:
+                self.dirty.add(byte)
+        self.items += 1
+
+    def might_contain(self, key):
+        self.checks += 1
+        array = self.array
+        for position in self._positions(key):
+            if not array[position >> 3] & (1 << (position & 7)):
+                self.negatives += 1
+                return False
+        return True
+
+    __contains__ = might_contain
+
+    def false_positive(self):
+        # El dueño avisa que un might_contain() True terminó en "no encontrado"
+        self.false_positives += 1
+
+    def save(self, stamp=(0, 0)):
+        self.stamp = tuple(stamp)
+        header = struct.pack(BLOOM_HEADER_FORMAT, self.bits, self.hashes, self.fp_rate, self.items, *self.stamp)
+        if self.dirty is None or not os.path.exists(self.filename):
+            tmp_filename = self.filename + ".tmp"
+            with tracked_open(tmp_filename, "wb") as f:
+                f.write(header)
+                f.write(self.array)
+            os.replace(tmp_filename, self.filename)
+        else:
+            with tracked_open(self.filename, "rb+") as f:
+                for byte in sorted(self.dirty):
+                    f.seek(BLOOM_HEADER_SIZE + byte)
+                    f.write(self.array[byte:byte + 1])
+                f.seek(0)
+                f.write(header)
+        self.dirty = set()
+
+    def estimated_fp_rate(self):
+        # (1 - e^(-k n / m))^k para los ids agregados
+        return (1 - math.exp(-self.hashes * self.items / self.bits)) ** self.hashes
+
+    def stats(self):
+        absent = self.negatives + self.false_positives  # búsquedas de ids que no estaban
+        return {
+            'bits': self.bits,
+            'hashes': self.hashes,
+            'items': self.items,
+            'fp_rate': self.fp_rate,
+            'estimated_fp_rate': self.estimated_fp_rate(),
+            'fill_ratio': int.from_bytes(self.array, "little").bit_count() / self.bits,
+            'checks': self.checks,
+            'negatives': self.negatives,
+            'false_positives': self.false_positives,
+            'observed_fp_rate': self.false_positives / absent if absent else 0.0,
+        }
+
+
+def test_bloom_filter():
+    print("=== TEST: BloomFilter ===")
+    import tempfile
+    filename = os.path.join(tempfile.mkdtemp(), "data.bloom")
+    bloom = BloomFilter(filename, 0.01, capacity=2000)
+    for key in range(0, 2000, 2):
+        bloom.add(key)
+    assert all(bloom.might_contain(key) for key in range(0, 2000, 2))  # sin falsos negativos
+    absent = sum(bloom.might_contain(key) for key in range(1, 2000, 2))
+    assert absent < 1000 * 0.05
+    bloom.save((10, 20))
+
+    # Se recarga con el sello guardado; lo agregado después se guarda solo por bytes modificados
+    bloom = BloomFilter(filename, 0.01)
+    assert bloom.loaded and bloom.stamp == (10, 20) and bloom.items == 1000
+    bloom.add(2001)
+    assert bloom.dirty
+    bloom.save((11, 20))
+    bloom = BloomFilter(filename, 0.01)
+    assert bloom.stamp == (11, 20) and bloom.items == 1001
+    assert all(bloom.might_contain(key) for key in list(range(0, 2000, 2)) + [2001])
+    print(bloom.stats())
+
+    # Con otra tasa configurada el filtro guardado no sirve y se empieza vacío
+    bloom = BloomFilter(filename, 0.001)
+    assert not bloom.loaded and bloom.items == 0
+    os.remove(filename)
+    os.rmdir(os.path.dirname(filename))
+    print("Test BloomFilter completado.\n")
+
+
+if __name__ == "__main__":
+    test_bloom_filter()
@@ -1,5 +1,11 @@
 import struct
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from record_schema import Schema
+from io_stats import operation, tracked_open
+from bloom_filter import BloomFilter
 
 class Venta:
     def __init__(self, id, nombre, cantidad, precio, fecha, next = -1, archive = 1):
@@ -15,33 +21,47 @@ class Venta:
         print(self.id, self.nombre, self.cantidad, self.precio, self.fecha, self.next, self.archive)
     
     def pack(self):
-        return struct.pack(FORMAT, self.id, self.nombre.encode(), self.cantidad, self.precio, self.fecha.encode(), self.next, self.archive)
+        return VENTA_SCHEMA.pack(self.id, self.nombre, self.cantidad, self.precio, self.fecha, self.next, self.archive)
+
+VENTA_SCHEMA = Schema([('id', 'i'), ('nombre', '30s'), ('cantidad', 'i'), ('precio', 'f'),
+                       ('fecha', '10s'), ('next', 'i'), ('archive', 'i')])
+FORMAT = VENTA_SCHEMA.format # id = int, nombre = 30, cantidad = int, precio = float, fecha = 10, next = int, archive = int
+RECORD_SIZE = VENTA_SCHEMA.size
+
+class VentaView(VENTA_SCHEMA.view("VentaRecord")):
+    # Vista perezosa de un registro leído: solo se decodifican los campos que se usan
+    # (la búsqueda binaria solo mira id) y pack() reescribe el registro modificado.
+    __slots__ = ()
+    print = Venta.print
 
-FORMAT = 'i30sif10sii' # id = int, nombre = 30, cantidad = int, precio = float, fecha = 10, next = int, archive = int
-RECORD_SIZE = struct.calcsize(FORMAT)
 HEADER_SIZE = struct.calcsize("ii")
 
-def readRecordFromFile(filename:str, pointer:int) -> Venta:
-    with open(filename, "rb") as file:
+def readRecordFromFile(filename:str, pointer:int) -> VentaView:
+    with tracked_open(filename, "rb") as file:
         file.seek(pointer)
         record = file.read(RECORD_SIZE)
         assert(record)
-        id, nombre, cantidad, precio, fecha, next, archive = struct.unpack(FORMAT, record)
-        return Venta(id, nombre.decode().strip(), cantidad, precio, fecha.decode().strip(), next, archive)
+        return VentaView(record)
 
 def getNumberRecordsFile(filename:str) -> int:
-    with open(filename, "rb") as file:
+    with tracked_open(filename, "rb") as file:
         file.seek(0, 2)
         return file.tell()//RECORD_SIZE # Retorna numero de registros en el archivo
 
+# Filtro de Bloom opcional (bloom_filter.py, filename + ".bloom") sobre los ids activos, con
+# tasa de falsos positivos bloom_fp_rate (None, el valor por defecto, lo desactiva; ej.
+# bloom_fp_rate=FP_RATE): search() lo consulta primero y un id ausente se descarta sin leer
+# los archivos. Cada insert lo actualiza solo en memoria; se guarda en joinFiles() y close().
+# Si al abrir el sello guardado no coincide con los tamaños de los archivos (caída entre dos
+# guardados), se reconstruye recorriendo la lista de registros. stats() devuelve sus contadores.
 class SequentialFile:
-    def __init__(self, filename, auxfile):
+    def __init__(self, filename, auxfile, bloom_fp_rate=None):
         self.filename = filename
         self.auxfile = auxfile
         if not os.path.exists(self.filename):
             self._initialize_file() # if archive doesn't exists
         else:
-            with open(self.filename, "rb+") as file:
+            with tracked_open(self.filename, "rb+") as file:
                 file.seek(0,2)
                 if(file.tell == 0): # if archive is empty
                     self._initialize_file()
@@ -49,16 +69,60 @@ class SequentialFile:
         if not os.path.exists(self.auxfile):
             self._initialize_auxfile() # if archive doesn't exists
 
+        self.bloom = None
+        if bloom_fp_rate is not None:
+            self.bloom = BloomFilter(self.filename + ".bloom", bloom_fp_rate)
+            if not self.bloom.loaded or self.bloom.stamp != self._data_stamp():
+                self._rebuild_bloom()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self.bloom is not None:
+            self.bloom.save(self._data_stamp())
+
+    def stats(self):
+        return {'bloom': self.bloom.stats() if self.bloom is not None else None}
+
+    def _data_stamp(self):
+        return os.path.getsize(self.filename), os.path.getsize(self.auxfile)
+
+    def _bloom_capacity(self):
+        # Cota de ids activos hasta el próximo joinFiles(): los de ambos archivos más los
+        # que entran al auxiliar antes de que 2^numAux supere al principal
+        numFile = getNumberRecordsFile(self.filename)
+        return numFile + getNumberRecordsFile(self.auxfile) + numFile.bit_length() + 1
+
+    def _iter_live(self):
+        # Registros activos en orden, siguiendo los punteros desde el header
+        [next, archive] = self._read_header_file()
+        while(next != -1):
+            [filename, header] = self._getArchiveInfo(archive)
+            record:Venta = readRecordFromFile(filename, header + next * RECORD_SIZE)
+            yield record
+            next = record.next
+            archive = record.archive
+
+    def _rebuild_bloom(self):
+        self.bloom.reset(self._bloom_capacity())
+        for record in self._iter_live():
+            self.bloom.add(record.id)
+        self.bloom.save(self._data_stamp())
+
     def _initialize_file(self):
-        with open(self.filename, "wb") as file:
+        with tracked_open(self.filename, "wb") as file:
             file.write(struct.pack("ii", -1, 1))
 
     def _initialize_auxfile(self):
-        with open(self.auxfile, "wb") as file:
+        with tracked_open(self.auxfile, "wb") as file:
             file.seek(0,2)
     
     def _read_header_file(self):
-        with open(self.filename, "rb") as file:
+        with tracked_open(self.filename, "rb") as file:
             next, archive = struct.unpack("ii", file.read(HEADER_SIZE))
             return [next, archive]
     
@@ -101,12 +165,15 @@ class SequentialFile:
         return [filename, header]
         
 
+    @operation()
     def joinFiles(self):
         [next, archive] = self._read_header_file()
-        with open("new_" + self.filename, "x") as file:
+        if self.bloom is not None:
+            self.bloom.reset(self._bloom_capacity())
+        with tracked_open("new_" + self.filename, "x") as file:
             print("file has been created")
         
-        with open("new_" + self.filename, "rb+") as file:
+        with tracked_open("new_" + self.filename, "rb+") as file:
             print("writing on new file...")
             file.write(struct.pack("ii", 0,0)) # header
             cont = 1 # count records, used for assign pointer
@@ -114,6 +181,8 @@ class SequentialFile:
             while(next != -1):
                 [filename, header] = self._getArchiveInfo(archive)
                 record:Venta = readRecordFromFile(filename, header + next * RECORD_SIZE)
+                if self.bloom is not None:
+                    self.bloom.add(record.id)
                 archive = record.archive # file of next record
                 next = record.next
                 record.archive = 0
@@ -123,10 +192,13 @@ class SequentialFile:
                 cont+=1
         
         os.remove(self.filename) # delete old filename
-        open(self.auxfile, "wb").close() # clear aux file
+        tracked_open(self.auxfile, "wb").close() # clear aux file
         os.rename("new_" + self.filename, self.filename) # rename new file
+        if self.bloom is not None:
+            self.bloom.save(self._data_stamp())
                 
 
+    @operation()
     def insert(self, venta:Venta):
         res = self._binarySearchInFile(venta.id) # search the correct position
         numAux = getNumberRecordsFile(self.auxfile)
@@ -142,11 +214,11 @@ class SequentialFile:
                     return
             
             print(f"writing new record with id: {venta.id} in auxfile")
-            with open(self.filename, "rb+") as file:
+            with tracked_open(self.filename, "rb+") as file:
                 file.seek(0)
                 file.write(struct.pack("ii", numAux, 1))
             
-            with open(self.auxfile, "rb+") as file:
+            with tracked_open(self.auxfile, "rb+") as file:
                 file.seek(0,2)
                 file.write(venta.pack())
         else:
@@ -165,11 +237,11 @@ class SequentialFile:
                 record.next = numAux # posicion de la nueva venta
                 record.archive = 1
                 print(f"found record with id: {record.id} in principal file at position: {pointer_record}")
-                with open(self.filename, "rb+") as file:
+                with tracked_open(self.filename, "rb+") as file:
                     file.seek(HEADER_SIZE + pointer_record * RECORD_SIZE)
                     file.write(record.pack()) # write record with new next pointer on filename
 
-                with open(self.auxfile, "rb+") as file:
+                with tracked_open(self.auxfile, "rb+") as file:
                     file.seek(0,2)
                     file.write(venta.pack()) # write venta on auxfile
             else:
@@ -199,15 +271,18 @@ class SequentialFile:
                 cur_record.archive = 1
 
                 print(f"writing new record with id: {venta.id} in auxfile")
-                with open(self.auxfile, "rb+") as file:
+                with tracked_open(self.auxfile, "rb+") as file:
                     file.seek(0,2)
                     file.write(venta.pack()) # write venta on auxfile
 
                 [filename, header] = self._getArchiveInfo(archive_record)
-                with open(filename, "rb+") as file:
+                with tracked_open(filename, "rb+") as file:
                     file.seek(header + pointer_record * RECORD_SIZE)
                     file.write(cur_record.pack()) # write venta on filename
 
+        if self.bloom is not None:
+            self.bloom.add(venta.id)  # se guarda en joinFiles() / close()
+
         numAux = getNumberRecordsFile(self.auxfile)
         numFile = getNumberRecordsFile(self.filename)
         if(pow(2, numAux) > numFile):
@@ -215,13 +290,19 @@ class SequentialFile:
             self.joinFiles()
 
 
+    @operation()
     def search(self, key:str):
+        if self.bloom is not None and not self.bloom.might_contain(key):
+            print(f"record with id: {key} not found")
+            return
         res = self._binarySearchInFile(key)
         if (res == -1):
             [next, archive] = self._read_header_file()
             assert(archive == 1)
             if(next == -1):
                 print("auxfile is empty, record not found")
+                if self.bloom is not None:
+                    self.bloom.false_positive()
                 return
             record:Venta = readRecordFromFile(self.auxfile, next * RECORD_SIZE)
             if(record.id == key):
@@ -246,7 +327,10 @@ class SequentialFile:
             pointer += RECORD_SIZE
         
         print(f"record with id: {key} not found")
+        if self.bloom is not None:
+            self.bloom.false_positive()
     
+    @operation()
     def remove(self, key:str):
         res = self._binaryRemoveInFile(key)
         res_archive = 0
@@ -260,12 +344,12 @@ class SequentialFile:
             record:Venta = readRecordFromFile(filename, header + next * RECORD_SIZE)
             if(record.id == key):
                 print(f"record with id: {record.id} was found on auxfile")
-                with open(self.filename, "rb+") as file:
+                with tracked_open(self.filename, "rb+") as file:
                     file.seek(0)
                     print(f"rewriting header with new next pointer: {record.next}")
                     file.write(struct.pack("ii", record.next, record.archive))
                 
-                with open(self.auxfile, "rb+") as file:
+                with tracked_open(self.auxfile, "rb+") as file:
                     file.seek(res * RECORD_SIZE)
                     record.next = -2
                     print(f"deleting record with id: {record.id}")
@@ -283,14 +367,14 @@ class SequentialFile:
             next_record = readRecordFromFile(self.filename, HEADER_SIZE + next *RECORD_SIZE)
             if(next_record.id == key):
                 print(f"record with id: {next_record.id} was found on principal file")
-                with open(self.filename, "rb+") as file:
+                with tracked_open(self.filename, "rb+") as file:
                     file.seek(HEADER_SIZE + record.next * RECORD_SIZE)
                     print(f"deleting record with id: {next_record.id}")
                     record.next = next_record.next
                     next_record.next = -2
                     file.write(next_record.pack())
 
-                with open(filename_ini, "rb+") as file:
+                with tracked_open(filename_ini, "rb+") as file:
                     file.seek(header_ini + res * RECORD_SIZE)
                     print(f"rewriting record before with id: {record.next} to new next pointer: {record.next}")
                     record.archive = next_record.archive
@@ -325,7 +409,7 @@ class SequentialFile:
         next_record = readRecordFromFile(next_filename, next_header + cur_record.next * RECORD_SIZE)
 
         assert(next_record.id == key)
-        with open(next_filename, "rb+") as file:
+        with tracked_open(next_filename, "rb+") as file:
             file.seek(next_header + cur_record.next * RECORD_SIZE)
             cur_record.next = next_record.next
             next_record.next = -2
@@ -333,7 +417,7 @@ class SequentialFile:
             file.write(next_record.pack())
 
         cur_record.archive = next_record.archive
-        with open(filename, "rb+") as file:
+        with tracked_open(filename, "rb+") as file:
             file.seek(header + cur_pointer * RECORD_SIZE)
             print(f"rewriting record before with id: {cur_record.id} to new next pointer: {cur_record.next}")
             file.write(cur_record.pack())
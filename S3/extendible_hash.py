@@ -1,17 +1,22 @@
 import struct
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from record_schema import Schema
+from block_reader import scan_blocks
+from io_stats import operation, tracked_open
 
 GLOBAL_DEPTH = 8
 BUCKET_CAPACITY = 3
 HEADER_FORMAT = "ii"
 
-BUCKET_FORMAT = f"{GLOBAL_DEPTH}sii" + ("i" * BUCKET_CAPACITY) + "i"
-BUCKET_SIZE = struct.calcsize(BUCKET_FORMAT)
+BUCKET_SCHEMA = Schema([("identifier", f"{GLOBAL_DEPTH}s"), ("local_depth", "i"), ("size", "i")]
+                       + [(f"record{i}", "i") for i in range(BUCKET_CAPACITY)] + [("overflow", "i")])
+BUCKET_FORMAT = BUCKET_SCHEMA.format
+BUCKET_SIZE = BUCKET_SCHEMA.size
 HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
 
-def pad_str(s, length):
-    return s.encode('utf-8')[:length].ljust(length, b' ')
-
 def hash_function(key):
     return key
 
@@ -67,15 +72,13 @@ class Bucket:
         self.overflow = -1
 
     def pack(self):
-        id_bytes = pad_str(self.identifier, GLOBAL_DEPTH)
         recs = self.records + [0]*(self.capacity - self.size)
-        return struct.pack(BUCKET_FORMAT, id_bytes, self.local_depth, self.size, *recs, self.overflow)
+        return BUCKET_SCHEMA.pack(self.identifier, self.local_depth, self.size, *recs, self.overflow)
 
     @classmethod
     def unpack(cls, data):
-        unpacked = struct.unpack(BUCKET_FORMAT, data)
-        id_bytes = unpacked[0]
-        identifier = id_bytes.decode('utf-8').strip()
+        unpacked = BUCKET_SCHEMA.unpack(data)
+        identifier = unpacked[0]
         local_depth = unpacked[1]
         size = unpacked[2]
         recs = list(unpacked[3:3+BUCKET_CAPACITY])
@@ -92,8 +95,9 @@ class DiskStorage:
     filename = "hash_file.dat"
 
     @staticmethod
+    @operation()
     def initialize_file(global_depth, initial_num_buckets):
-        with open(DiskStorage.filename, "wb") as f:
+        with tracked_open(DiskStorage.filename, "wb") as f:
             f.write(struct.pack(HEADER_FORMAT, global_depth, initial_num_buckets))
 
             bucket0 = Bucket("0", 1, BUCKET_CAPACITY)
@@ -102,35 +106,48 @@ class DiskStorage:
             f.write(bucket1.pack())
 
     @staticmethod
+    @operation()
     def read_header():
-        with open(DiskStorage.filename, "rb") as f:
+        with tracked_open(DiskStorage.filename, "rb") as f:
             header_data = f.read(HEADER_SIZE)
             global_depth, num_buckets = struct.unpack(HEADER_FORMAT, header_data)
             return global_depth, num_buckets
 
     @staticmethod
+    @operation()
     def write_header(global_depth, num_buckets):
-        with open(DiskStorage.filename, "r+b") as f:
+        with tracked_open(DiskStorage.filename, "r+b") as f:
             f.seek(0)
             f.write(struct.pack(HEADER_FORMAT, global_depth, num_buckets))
 
     @staticmethod
+    @operation()
     def read_bucket(pos):
-        with open(DiskStorage.filename, "rb") as f:
+        with tracked_open(DiskStorage.filename, "rb") as f:
             f.seek(HEADER_SIZE + pos * BUCKET_SIZE)
             data = f.read(BUCKET_SIZE)
             return Bucket.unpack(data)
 
     @staticmethod
+    def iter_buckets(num_buckets):
+        # Recorrido secuencial de todos los buckets con lecturas por bloques
+        with tracked_open(DiskStorage.filename, "rb") as f:
+            for _, block in scan_blocks(f, HEADER_SIZE, num_buckets, BUCKET_SIZE):
+                for start in range(0, len(block), BUCKET_SIZE):
+                    yield Bucket.unpack(block[start:start + BUCKET_SIZE])
+
+    @staticmethod
+    @operation()
     def write_bucket(bucket, pos):
-        with open(DiskStorage.filename, "r+b") as f:
+        with tracked_open(DiskStorage.filename, "r+b") as f:
             f.seek(HEADER_SIZE + pos * BUCKET_SIZE)
             f.write(bucket.pack())
 
     @staticmethod
+    @operation()
     def append_bucket(bucket):
         _, num_buckets = DiskStorage.read_header()
-        with open(DiskStorage.filename, "r+b") as f:
+        with tracked_open(DiskStorage.filename, "r+b") as f:
             f.seek(0, os.SEEK_END)
             pos = num_buckets
             f.write(bucket.pack())
@@ -139,6 +156,7 @@ class DiskStorage:
 
 
 class ExtendibleHash:
+    @operation("ExtendibleHash.open")
     def __init__(self):
         if not os.path.exists(DiskStorage.filename):
             DiskStorage.initialize_file(GLOBAL_DEPTH, 2)
@@ -147,8 +165,7 @@ class ExtendibleHash:
         else:
             self.global_depth, num_buckets = DiskStorage.read_header()
             self.directory = {}
-            for pos in range(num_buckets):
-                bucket = DiskStorage.read_bucket(pos)
+            for pos, bucket in enumerate(DiskStorage.iter_buckets(num_buckets)):
                 if bucket.identifier not in self.directory:
                     self.directory[bucket.identifier] = pos
 
@@ -196,6 +213,7 @@ class ExtendibleHash:
                 bucket0.insert(key)
         self.update_directory_after_split(bucket, bucket0, bucket1)
 
+    @operation()
     def insert(self, key):
         bucket = self.get_bucket(key)
         bstr = binary_hash(key)
@@ -227,12 +245,14 @@ class ExtendibleHash:
                 current.insert(key)
                 DiskStorage.write_bucket(current, current_pos)
 
+    @operation()
     def search(self, key):
         bucket = self.get_bucket(key)
         if bucket:
             return bucket.search(key)
         return False
 
+    @operation()
     def delete(self, key):
         bucket = self.get_bucket(key)
         if bucket:
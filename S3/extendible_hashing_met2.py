@@ -1,5 +1,9 @@
 import os
 import pickle
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from io_stats import operation, tracked_open
 
 GLOBAL_DEPTH = 8       
 BUCKET_CAPACITY = 3    
@@ -91,12 +95,14 @@ class ExtendibleHashTree:
             self.save()
 
     @staticmethod
+    @operation()
     def load_tree(filename: str):
-        with open(filename, "rb") as f:
+        with tracked_open(filename, "rb") as f:
             return pickle.load(f)
 
+    @operation()
     def save(self):
-        with open(self.filename, "wb") as f:
+        with tracked_open(self.filename, "wb") as f:
             pickle.dump(self, f)
 
     # Función auxiliar para descender en el árbol según los bits de la clave.
@@ -111,6 +117,7 @@ class ExtendibleHashTree:
             return self.descend_tree(bits, idx + 1, node.right_child)
 
     # Inserta una clave en el árbol
+    @operation()
     def insert(self, key: int) -> None:
         bits = get_binary_key(key, self.global_depth)
         leaf_node = self.descend_tree(bits, 0, self.root)
@@ -181,6 +188,7 @@ class ExtendibleHashTree:
 
         self.save()
 
+    @operation()
     def search(self, key: int) -> bool:
         bits = get_binary_key(key, self.global_depth)
         leaf_node = self.descend_tree(bits, 0, self.root)
@@ -188,6 +196,7 @@ class ExtendibleHashTree:
             return leaf_node.bucket.search(key)
         return False
 
+    @operation()
     def delete(self, key: int) -> bool:
         bits = get_binary_key(key, self.global_depth)
         leaf_node = self.descend_tree(bits, 0, self.root)
@@ -0,0 +1,306 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ---------------------------------------------------------
+# Instrumentación de I/O por operación lógica para las estructuras de S1, S2 y S3.
+#
+# - @operation() marca un método público (add, search, remove, ...) como operación lógica:
+#   se cuentan sus llamadas y su latencia (histograma en potencias de 2 de microsegundos).
+# - Todo el I/O que ocurre mientras corre la operación (opens, seeks, reads, writes y bytes)
+#   se le atribuye. Si una operación llama a otra (readRecord -> get) cuenta la de afuera.
+#   En un generador (rangeSearch) se mide solo el tiempo dentro del generador, no el del
+#   código que consume los resultados.
+# - Los archivos se abren con tracked_open() (mismo uso que open()) y las lecturas/escrituras
+#   posicionadas (pread/pwrite) se informan con record_io().
+# - stats() devuelve una copia de los contadores; profile() mide solo un bloque de llamadas:
+#       with io_stats.profile() as p:
+#           db.add(alumno)
+#       print(p.stats())
+# Desactivado (el default, o IO_STATS=0) el costo es una comparación por llamada: los métodos
+# no se envuelven en nada más y tracked_open() devuelve el archivo de open() sin tocar.
+# IO_STATS=1 en el entorno lo activa desde el inicio.
+# ---------------------------------------------------------
+COUNTERS = ('calls', 'opens', 'seeks', 'reads', 'writes', 'bytes_read', 'bytes_written')
+NO_OPERATION = "(fuera de una operación)"
+
+
+class IOStats:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.operations = {}  # nombre -> {contador: valor, 'latency': {potencia de 2 en µs: llamadas}}
+        self.local = threading.local()  # operación en curso del hilo
+
+    def entry(self, name):
+        entry = self.operations.get(name)
+        if entry is None:
+            entry = self.operations[name] = dict.fromkeys(COUNTERS, 0)
+            entry['latency'] = {}
+            entry['total_us'] = 0.0
+            entry['max_us'] = 0.0
+        return entry
+
+    def add(self, counter, amount=1):
+        name = getattr(self.local, 'operation', None) or NO_OPERATION
+        with self.lock:
+            self.entry(name)[counter] += amount
+
+    def finish(self, name, elapsed_us):
+        bucket = 1 << max(0, int(elapsed_us)).bit_length()  # límite superior del bucket
+        with self.lock:
+            entry = self.entry(name)
+            entry['calls'] += 1
+            entry['total_us'] += elapsed_us
+            entry['max_us'] = max(entry['max_us'], elapsed_us)
+            entry['latency'][bucket] = entry['latency'].get(bucket, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            result = {}
+            for name, entry in self.operations.items():
+                result[name] = dict(entry, latency=dict(sorted(entry['latency'].items())))
+                result[name]['mean_us'] = entry['total_us'] / entry['calls'] if entry['calls'] else 0.0
+            return result
+
+    def merge(self, operations):
+        with self.lock:
+            for name, other in operations.items():
+                entry = self.entry(name)
+                for counter in COUNTERS:
+                    entry[counter] += other[counter]
+                entry['total_us'] += other['total_us']
+                entry['max_us'] = max(entry['max_us'], other['max_us'])
+                for bucket, count in other['latency'].items():
+                    entry['latency'][bucket] = entry['latency'].get(bucket, 0) + count
+
+
+STATS = IOStats()
+STATS.enabled = os.environ.get("IO_STATS", "0") not in ("", "0")
+
+
+def enable():
+    STATS.enabled = True
+
+
+def disable():
+    STATS.enabled = False
+
+
+def reset():
+    with STATS.lock:
+        STATS.operations = {}
+
+
+def stats():
+    return STATS.snapshot()
+
+
+def operation(name=None):
+    # Decorador de métodos: 'name' por defecto es Clase.método
+    def decorator(method):
+        label = name or method.__qualname__
+        if inspect.isgeneratorfunction(method):
+            return generator_operation(method, label)
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if not STATS.enabled or getattr(STATS.local, 'operation', None) is not None:
+                return method(*args, **kwargs)
+            STATS.local.operation = label
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                STATS.local.operation = None
+                STATS.finish(label, (time.perf_counter() - start) * 1e6)
+        return wrapper
+    return decorator
+
+
+def generator_operation(method, label):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not STATS.enabled:
+            yield from method(*args, **kwargs)
+            return
+        generator = method(*args, **kwargs)
+        elapsed = 0.0
+        own = False  # algún paso corrió fuera de otra operación
+        try:
+            while True:
+                outer = getattr(STATS.local, 'operation', None)
+                if outer is None:
+                    STATS.local.operation = label
+                    own = True
+                start = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                    if outer is None:
+                        STATS.local.operation = None
+                yield item
+        finally:
+            generator.close()
+            if own:
+                STATS.finish(label, elapsed * 1e6)
+    return wrapper
+
+
+def record_io(kind, size):
+    # kind: 'read' o 'write' (lecturas/escrituras posicionadas que no pasan por el archivo)
+    if STATS.enabled:
+        STATS.add(kind + 's')
+        STATS.add('bytes_' + ('read' if kind == 'read' else 'written'), size)
+
+
+class TrackedFile:
+    # Envoltorio de un archivo abierto que cuenta seeks, reads, writes y bytes
+    __slots__ = ('file',)
+
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+
+    def __iter__(self):
+        return iter(self.file)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def read(self, *args):
+        data = self.file.read(*args)
+        record_io('read', len(data))
+        return data
+
+    def readinto(self, buffer):
+        size = self.file.readinto(buffer)
+        record_io('read', size or 0)
+        return size
+
+    def write(self, data):
+        size = self.file.write(data)
+        record_io('write', len(data))
+        return size
+
+    def seek(self, *args):
+        if STATS.enabled:
+            STATS.add('seeks')
+        return self.file.seek(*args)
+
+
+def raw_file(file):
+    # Archivo sin el envoltorio TrackedFile, para quien informa su E/S con record_io
+    return file.file if isinstance(file, TrackedFile) else file
+
+
+def tracked_open(*args, **kwargs):
+    file = open(*args, **kwargs)
+    if not STATS.enabled:
+        return file
+    STATS.add('opens')
+    return TrackedFile(file)
+
+
+class Profile:
+    def __init__(self):
+        self.operations = {}
+
+    def stats(self):
+        return self.operations
+
+
+@contextmanager
+def profile():
+    # Activa la instrumentación solo dentro del bloque y guarda lo medido en el objeto devuelto.
+    # Si ya estaba activa, lo medido también se suma a los contadores globales.
+    was_enabled, previous = STATS.enabled, STATS.operations
+    with STATS.lock:
+        STATS.operations = {}
+    STATS.enabled = True
+    result = Profile()
+    try:
+        yield result
+    finally:
+        result.operations = STATS.snapshot()
+        with STATS.lock:
+            STATS.operations = previous
+        STATS.enabled = was_enabled
+        if was_enabled:
+            STATS.merge(result.operations)
+
+
+def format_stats(operations=None):
+    # Tabla legible de stats() (o de Profile.stats())
+    operations = stats() if operations is None else operations
+    lines = [f"{'operación':<32}{'llamadas':>9}{'opens':>7}{'seeks':>7}{'reads':>7}{'writes':>7}"
+             f"{'B leídos':>11}{'B escritos':>11}{'media µs':>10}{'máx µs':>10}"]
+    for name, entry in sorted(operations.items()):
+        lines.append(f"{name:<32}{entry['calls']:>9}{entry['opens']:>7}{entry['seeks']:>7}{entry['reads']:>7}"
+                     f"{entry['writes']:>7}{entry['bytes_read']:>11}{entry['bytes_written']:>11}"
+                     f"{entry['mean_us']:>10.1f}{entry['max_us']:>10.1f}")
+    return "\n".join(lines)
+
+
+def test_profile():
+    print("=== TEST: io_stats ===")
+    import tempfile
+
+    class Demo:
+        def __init__(self, filename):
+            self.filename = filename
+
+        @operation()
+        def read_all(self):
+            with tracked_open(self.filename, "rb") as f:
+                f.seek(0)
+                return f.read()
+
+        @operation()
+        def read_twice(self):
+            # Operación anidada: lo que hace read_all se cuenta en read_twice
+            return self.read_all() + self.read_all()
+
+        @operation()
+        def chunks(self):
+            with tracked_open(self.filename, "rb") as f:
+                while True:
+                    chunk = f.read(4)
+                    if not chunk:
+                        return
+                    yield chunk
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(b"0123456789")
+    demo = Demo(f.name)
+    was_enabled = STATS.enabled
+    with profile() as result:
+        assert demo.read_all() == b"0123456789"
+        demo.read_twice()
+        assert b"".join(demo.chunks()) == b"0123456789"
+    assert STATS.enabled == was_enabled
+    operations = result.stats()
+    print(format_stats(operations))
+    read_all = operations['test_profile.<locals>.Demo.read_all']
+    assert (read_all['calls'], read_all['opens'], read_all['seeks'], read_all['reads'], read_all['bytes_read']) == (1, 1, 1, 1, 10)
+    read_twice = operations['test_profile.<locals>.Demo.read_twice']
+    assert (read_twice['calls'], read_twice['opens'], read_twice['reads'], read_twice['bytes_read']) == (1, 2, 2, 20)
+    chunks = operations['test_profile.<locals>.Demo.chunks']
+    assert (chunks['calls'], chunks['reads'], chunks['bytes_read']) == (1, 4, 10)  # 3 lecturas con datos y el EOF
+    os.remove(f.name)
+    print("Test io_stats completado.\n")
+
+
+if __name__ == "__main__":
+    test_profile()
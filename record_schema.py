@@ -0,0 +1,198 @@
+import struct
+
+# ---------------------------------------------------------
+# Codec de registros de tamaño fijo a partir de un esquema declarativo.
+# Cada esquema se compila una sola vez en un struct.Struct (el formato no se vuelve a
+# parsear en cada llamada) y concentra el padding de los strings:
+#   - al empaquetar: encode('utf-8'), se corta al tamaño del campo y se rellena con espacios
+#   - al desempaquetar: se quitan los espacios y los '\x00' del final
+# Ej: Schema([('id', 'i'), ('nombre', '30s'), ('precio', 'f')])
+# ---------------------------------------------------------
+
+
+def encode_str(value, size, pad=b' '):
+    return value.encode('utf-8')[:size].ljust(size, pad)
+
+
+def decode_str(data):
+    # errors='ignore' por si el corte a 'size' bytes partió un carácter multibyte
+    return data.decode('utf-8', 'ignore').rstrip(' \x00')
+
+
+NOT_DECODED = object()  # marca de campo todavía no decodificado en una RecordView
+
+
+class RecordView:
+    # Base de las vistas generadas por Schema.view(): el registro se guarda tal como se leyó
+    # y cada campo se decodifica recién al accederlo (el resultado queda cacheado).
+    # Asignar un campo marca la vista como modificada (dirty) y pack() la vuelve a empaquetar.
+    __slots__ = ('_data', '_values', 'dirty')
+    schema = None
+
+    def __init__(self, data):
+        self._data = data
+        self._values = [NOT_DECODED] * len(self.schema.names)
+        self.dirty = False
+
+    @classmethod
+    def from_values(cls, *values):
+        view = cls(None)
+        view._values = list(values)
+        view.dirty = True
+        return view
+
+    def values(self):
+        return [getattr(self, name) for name in self.schema.names]
+
+    def pack(self):
+        if not self.dirty:
+            return bytes(self._data[:self.schema.size])
+        # Los campos que no se leyeron se reempaquetan con sus bytes originales
+        values = [self.schema.get(self._data, name, decode=False) if value is NOT_DECODED else value
+                  for name, value in zip(self.schema.names, self._values)]
+        return self.schema.pack(*values)
+
+
+def field_property(i, name, decoder):
+    def getter(self):
+        value = self._values[i]
+        if value is NOT_DECODED:
+            value = self.schema.get(self._data, name)
+            if decoder is not None:
+                value = decoder(value)
+            self._values[i] = value
+        return value
+
+    def setter(self, value):
+        self._values[i] = value
+        self.dirty = True
+
+    return property(getter, setter)
+
+
+class Schema:
+    def __init__(self, fields, byteorder='', pad=b' '):
+        self.fields = list(fields)
+        self.names = [name for name, _ in self.fields]
+        self.codes = [code for _, code in self.fields]
+        self.byteorder = byteorder
+        self.format = byteorder + ''.join(self.codes)
+        self.struct = struct.Struct(self.format)
+        self.size = self.struct.size
+        self.pad = pad
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # Tamaño de cada campo string (None si no es string) y posiciones de los strings
+        self.string_sizes = [int(code[:-1] or 1) if code.endswith('s') else None for code in self.codes]
+        self.strings = [i for i, size in enumerate(self.string_sizes) if size is not None]
+        # Offset de cada campo dentro del registro (con el padding del formato) y un Struct
+        # por campo para leer uno solo sin desempaquetar todo el registro
+        self.offsets = [struct.calcsize(byteorder + ''.join(self.codes[:i + 1])) - struct.calcsize(byteorder + code)
+                        for i, code in enumerate(self.codes)]
+        order = '=' if byteorder in ('', '@') else byteorder
+        self.field_structs = [struct.Struct(order + code) for code in self.codes]
+
+    def extend(self, fields):
+        # Nuevo esquema con campos adicionales al final (ej: nextDel en FreeList)
+        return Schema(self.fields + list(fields), self.byteorder, self.pad)
+
+    def view(self, name, decoders=None):
+        # Clase RecordView con una propiedad por campo; decoders = {campo: función} se aplica
+        # al valor decodificado (ej: redondear un float)
+        decoders = decoders or {}
+        namespace = {'__slots__': (), 'schema': self}
+        for i, field in enumerate(self.names):
+            namespace[field] = field_property(i, field, decoders.get(field))
+        return type(name, (RecordView,), namespace)
+
+    def encode(self, values):
+        # Lista lista para struct: los str se codifican con padding, los bytes se dejan igual
+        values = list(values)
+        for i in self.strings:
+            if isinstance(values[i], str):
+                values[i] = encode_str(values[i], self.string_sizes[i], self.pad)
+        return values
+
+    def encode_field(self, name, value):
+        i = self.index[name]
+        return encode_str(value, self.string_sizes[i], self.pad) if self.string_sizes[i] and isinstance(value, str) else value
+
+    def decode(self, values):
+        values = list(values)
+        for i in self.strings:
+            values[i] = decode_str(values[i])
+        return values
+
+    def pack(self, *values):
+        return self.struct.pack(*self.encode(values))
+
+    def pack_into(self, buffer, offset, *values):
+        self.struct.pack_into(buffer, offset, *self.encode(values))
+
+    def pack_many(self, rows):
+        # Empaqueta varios registros en un único buffer reservado de antemano
+        rows = list(rows)
+        buffer = bytearray(len(rows) * self.size)
+        for i, row in enumerate(rows):
+            self.struct.pack_into(buffer, i * self.size, *self.encode(row))
+        return buffer
+
+    def pack_dict(self, record):
+        # Registro como diccionario {campo: valor} (ej: las ventas de S2)
+        return self.pack(*(record[name] for name in self.names))
+
+    def unpack_dict(self, data):
+        return dict(zip(self.names, self.unpack(data)))
+
+    def unpack(self, data, decode=True):
+        values = self.struct.unpack(data)
+        return self.decode(values) if decode else values
+
+    def unpack_from(self, buffer, offset=0, decode=True):
+        values = self.struct.unpack_from(buffer, offset)
+        return self.decode(values) if decode else values
+
+    def iter_unpack(self, buffer, decode=True):
+        # Con decode=False los strings quedan como bytes y se decodifican solo si se necesitan
+        for values in self.struct.iter_unpack(buffer):
+            yield self.decode(values) if decode else values
+
+    def get(self, buffer, name, offset=0, decode=True):
+        # Lee un solo campo del registro que empieza en 'offset'
+        i = self.index[name]
+        value = self.field_structs[i].unpack_from(buffer, offset + self.offsets[i])[0]
+        return decode_str(value) if decode and self.string_sizes[i] else value
+
+
+def test_schema():
+    print("=== TEST: record_schema ===")
+    schema = Schema([('id', 'i'), ('nombre', '6s'), ('precio', 'f'), ('cantidad', 'i')])
+    data = schema.pack(1, "Arroz", 2.5, 3)
+    assert len(data) == schema.size
+    assert schema.unpack(data) == [1, "Arroz", 2.5, 3]
+    assert schema.unpack(data, decode=False)[1] == b"Arroz "  # padding con espacios
+    # Strings más largos que el campo se cortan; un corte en medio de un carácter se ignora
+    assert schema.unpack(schema.pack(2, "Azúcares", 1.0, 0))[1] == "Azúca"
+    # Un campo se lee sin desempaquetar el resto (con el padding del formato nativo)
+    assert schema.get(data, 'precio') == 2.5 and schema.get(data, 'cantidad') == 3
+    assert schema.get(data, 'nombre', decode=False) == schema.encode_field('nombre', "Arroz")
+    rows = [(i, f"p{i}", i / 2, i * 10) for i in range(5)]
+    buffer = schema.pack_many(rows)
+    assert [tuple(values) for values in schema.iter_unpack(buffer)] == rows
+    assert [schema.get(buffer, 'cantidad', offset=i * schema.size) for i in range(5)] == [i * 10 for i in range(5)]
+    record = {'id': 7, 'nombre': "Pan", 'precio': 0.5, 'cantidad': 2}
+    assert schema.unpack_dict(schema.pack_dict(record)) == record
+    # Vistas: decodifican al acceder y reempaquetan solo si se modificaron
+    View = schema.view("Producto", {'precio': lambda value: round(value, 1)})
+    view = View(data)
+    assert view.pack() == data
+    assert (view.nombre, view.precio) == ("Arroz", 2.5)
+    view.cantidad = 9
+    assert view.dirty and schema.unpack(view.pack()) == [1, "Arroz", 2.5, 9]
+    assert View.from_values(3, "Sal", 1.5, 4).pack() == schema.pack(3, "Sal", 1.5, 4)
+    extended = schema.extend([('nextDel', 'i')])
+    assert extended.unpack(extended.pack(1, "Arroz", 2.5, 3, -2))[:4] == schema.unpack(data)
+    print("Test record_schema completado.\n")
+
+
+if __name__ == "__main__":
+    test_schema()